@@ -0,0 +1,30 @@
+"""
+ASGI config for serialbox project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``.  Serve it with any ASGI server, for example::
+
+    uvicorn asgi:application --workers 10
+
+Django 3.1 and later awaits the async allocation view
+(``/allocate-async/``) so each worker process can keep many allocations in
+flight.  Older versions of Django have no ASGI handler; the WSGI
+application is adapted instead and every view, the async allocation view
+included, runs to completion in a worker thread.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+if django.VERSION >= (3, 0):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+else:
+    from asgiref.wsgi import WsgiToAsgi
+    from django.core.wsgi import get_wsgi_application
+
+    application = WsgiToAsgi(get_wsgi_application())
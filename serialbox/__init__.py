@@ -17,3 +17,5 @@ __author__ = 'Rob Magee'
 __license__ = 'GPL Affero Version 3'
 __copyright__ = 'Copyright 2018 SerialLab, CORP'
 VERSION = __version__
+
+default_app_config = 'serialbox.apps.PoolsConfig'
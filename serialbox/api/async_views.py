@@ -0,0 +1,93 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import django
+from asgiref.sync import async_to_sync
+from django.db import close_old_connections
+from rest_framework.response import Response
+
+from serialbox import serialbox_settings as settings, timing
+from serialbox.api.views import Allocation, AllocateView
+
+logger = logging.getLogger(__name__)
+
+#: The threads the blocking steps of async allocations run on.
+executor = ThreadPoolExecutor(max_workers=settings.ASYNC_ALLOCATION_THREADS)
+
+
+def _call(func, *args):
+    # executor threads never see request_finished, so drop connections
+    # that are too old or broken before each step
+    close_old_connections()
+    return func(*args)
+
+
+async def run(func, *args):
+    '''
+    Runs the blocking function on the allocation executor and awaits its
+    result.
+    '''
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, partial(_call, func, *args))
+
+
+async def allocate(request, pool=None, size=None, region=None):
+    '''
+    Allocates numbers exactly like the AllocateView, with the same
+    authentication, permissions, options and response formats, without
+    holding a worker for the whole request.  Authentication, the pool and
+    region lookups, the allocation itself, the response rule and rendering
+    are each awaited on the allocation executor, so one process can keep
+    as many allocations in flight as it has connections for.
+    '''
+    view = AllocateView()
+    view.args = ()
+    view.kwargs = {'pool': pool, 'size': size, 'region': region}
+    request = view.initialize_request(request)
+    view.request = request
+    view.headers = view.default_response_headers
+    timing.get_timings(request)
+    try:
+        await run(view.initial, request)
+        allocation = Allocation(request, pool, size, region)
+        await run(allocation.lookup)
+        await run(allocation.allocate)
+        response = allocation.get_streamed_response()
+        if response is None:
+            response = Response(await run(allocation.get_data,
+                                          request.accepted_renderer.format))
+        timing.finish(request, response)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    response = view.finalize_response(request, response)
+    if isinstance(response, Response):
+        await run(response.render)
+    return response
+
+
+if django.VERSION >= (3, 1):
+    allocate_view = allocate
+else:
+    # Django only awaits views from 3.1 on, older versions run the
+    # allocation to completion in the calling worker
+    allocate_view = async_to_sync(allocate)
@@ -23,7 +23,8 @@ from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
-from serialbox import models
+from serialbox import discovery, gs1, models
+from serialbox.encoding import is_plain
 from serialbox.api import errors
 
 
@@ -111,6 +112,7 @@ class PoolDetailSerializer(six.with_metaclass(PoolSerializerMeta,
     class Meta(object):
         model = models.Pool
         fields = '__all__'
+        read_only_fields = ('remaining',)
 
 
 class PoolSerializer(six.with_metaclass(PoolSerializerMeta,
@@ -126,10 +128,23 @@ class PoolSerializer(six.with_metaclass(PoolSerializerMeta,
         slug_field='machine_name',
         required=False
     )
+    active_regions = serializers.SerializerMethodField()
 
     class Meta(object):
         model = models.Pool
         fields = '__all__'
+        read_only_fields = ('remaining',)
+
+    def get_active_regions(self, obj):
+        '''
+        The number of active regions in the pool.  Uses the
+        active_region_count annotation of the pool API queryset when it is
+        there.
+        '''
+        count = getattr(obj, 'active_region_count', None)
+        if count is None:
+            count = len(discovery.get_all_regions_by_pool(obj))
+        return count
 
 
 class PoolHyperlinkedSerializer(six.with_metaclass(PoolSerializerMeta,
@@ -146,6 +161,18 @@ class PoolHyperlinkedSerializer(six.with_metaclass(PoolSerializerMeta,
         lookup_field='machine_name',
     )
 
+
+class PoolCapacitySerializer(serializers.ModelSerializer):
+    '''
+    Returns the remaining capacity of a pool.
+    '''
+
+    class Meta(object):
+        model = models.Pool
+        fields = ('machine_name', 'remaining')
+        read_only_fields = fields
+
+
 class ResponseRuleSerializer(serializers.ModelSerializer):
     '''
     Default serializer for the ResponseRule model.
@@ -153,7 +180,36 @@ class ResponseRuleSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.ResponseRule
         fields = '__all__'
-        
+
+
+class EncodingSerializer(serializers.Serializer):
+    '''
+    The encoding options of an allocation request.
+    '''
+    encoding = serializers.ChoiceField(
+        choices=[choice for choice, label in
+                 models.Response.ENCODING_CHOICES],
+        default='decimal')
+    width = serializers.IntegerField(min_value=1, max_value=64,
+                                     required=False)
+    gs1 = serializers.ChoiceField(choices=gs1.FORMATS, required=False)
+
+    def validate(self, attrs):
+        if attrs.get('gs1') in ('sscc', 'sscc-urn') and not is_plain(
+                attrs['encoding'], attrs.get('width')):
+            raise serializers.ValidationError(
+                {'gs1': _('SSCC serial references are always decimal, the '
+                          'encoding and width options can not be used.')})
+        return attrs
+
+
+class AllocationRequestSerializer(EncodingSerializer):
+    '''
+    A single entry of a batch allocation request.
+    '''
+    pool = serializers.CharField(max_length=100)
+    size = serializers.IntegerField(min_value=1)
+    region = serializers.CharField(max_length=100, required=False)
 
 
 class ResponseSerializer(serializers.ModelSerializer):
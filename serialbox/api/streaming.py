@@ -0,0 +1,148 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import json
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+
+from serialbox.encoding import encode_many, is_plain
+from serialbox.response.templates import render
+
+#: The number of numbers written per chunk of a streamed response.
+CHUNK_SIZE = 1000
+
+
+def _chunks(numbers, encoding=None, width=None, gs1=None):
+    '''
+    Yields lists of up to CHUNK_SIZE numbers as text in the encoding, or
+    as GS1 identifiers if a serialbox.gs1.GS1Formatter is supplied.
+    '''
+    numbers = iter(numbers)
+    while True:
+        chunk = list(islice(numbers, CHUNK_SIZE))
+        if not chunk:
+            return
+        if gs1:
+            yield gs1.format_many(chunk, encoding, width)
+        elif is_plain(encoding, width):
+            yield list(map(str, chunk))
+        else:
+            yield encode_many(chunk, encoding, width)
+
+
+def _json_chunks(numbers, encoding=None, width=None, gs1=None):
+    '''
+    Yields lists of up to CHUNK_SIZE numbers as JSON values.  Plain
+    numbers are JSON numbers, encoded numbers, GS1 identifiers and the
+    text values of list regions are JSON strings.
+    '''
+    numbers = iter(numbers)
+    while True:
+        values = list(islice(numbers, CHUNK_SIZE))
+        if not values:
+            return
+        chunk = next(_chunks(values, encoding, width, gs1))
+        if gs1 or not is_plain(encoding, width) or \
+                isinstance(values[0], str):
+            chunk = list(map(json.dumps, chunk))
+        yield chunk
+
+
+def stream_json(numbers, encoding=None, width=None, gs1=None):
+    '''
+    Yields the numbers as a JSON array.  Encoded numbers are strings.
+    '''
+    yield '['
+    first = True
+    for chunk in _json_chunks(numbers, encoding, width, gs1):
+        yield ('' if first else ',') + ','.join(chunk)
+        first = False
+    yield ']'
+
+
+def stream_csv(numbers, encoding=None, width=None, gs1=None):
+    '''
+    Yields the numbers as a single column CSV file with a header row.
+    '''
+    yield 'number\r\n'
+    for chunk in _chunks(numbers, encoding, width, gs1):
+        yield '\r\n'.join(chunk) + '\r\n'
+
+
+def stream_lines(numbers, encoding=None, width=None, gs1=None):
+    '''
+    Yields the numbers one per line, each line a JSON value.
+    '''
+    for chunk in _json_chunks(numbers, encoding, width, gs1):
+        yield '\n'.join(chunk) + '\n'
+
+
+#: Streaming formats by the value of the `stream` query parameter.
+STREAM_FORMATS = {
+    'json': (stream_json, 'application/json'),
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_lines, 'application/x-ndjson'),
+}
+
+
+def get_streaming_response(response, stream_format):
+    '''
+    Returns a StreamingHttpResponse that writes the numbers of the
+    allocation Response in the requested format as they are produced.
+    The rest of the allocation response is returned in headers.
+
+    :param response: The serialbox.models.Response of the allocation.
+    :param stream_format: One of the keys of STREAM_FORMATS.
+    '''
+    stream, content_type = STREAM_FORMATS[stream_format]
+    ret = StreamingHttpResponse(
+        stream(response.iter_numbers(), response.encoding, response.width,
+               response.gs1),
+        content_type=content_type)
+    return _set_headers(ret, response)
+
+
+def get_template_response(response, response_template, template):
+    '''
+    Returns a StreamingHttpResponse that renders the compiled template of a
+    ResponseTemplate for the allocation Response as the numbers are
+    produced.  The rest of the allocation response is returned in headers.
+
+    :param response: The serialbox.models.Response of the allocation.
+    :param response_template: The serialbox.models.ResponseTemplate.
+    :param template: The compiled jinja2 Template of the ResponseTemplate.
+    '''
+    chunks = _chunks(response.iter_numbers(), response.encoding,
+                     response.width, response.gs1)
+    ret = StreamingHttpResponse(render(template, response, chunks),
+                                content_type=response_template.content_type)
+    return _set_headers(ret, response)
+
+
+def _set_headers(ret, response):
+    '''
+    Returns the values of the allocation Response as X-Serialbox headers.
+    '''
+    ret['X-Serialbox-Pool'] = response.pool
+    ret['X-Serialbox-Region'] = response.region
+    ret['X-Serialbox-Type'] = response.type
+    ret['X-Serialbox-Encoding'] = response.encoding
+    ret['X-Serialbox-Fulfilled'] = str(response.fulfilled).lower()
+    ret['X-Serialbox-Size-Granted'] = str(response.size_granted)
+    return ret
@@ -17,7 +17,7 @@
     along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
 '''
 from django.conf.urls import url
-from serialbox.api import views, viewsets
+from serialbox.api import async_views, views, viewsets
 
 import importlib
 from django.apps import apps as django_apps
@@ -38,6 +38,9 @@ urlpatterns = [
     url(r'^pool-form/(?P<machine_name>[0-9a-zA-Z_\-]{1,100})/$',
         viewsets.pool_form,
         name='pool-form'),
+    url(r'^pool-capacity/(?P<machine_name>[0-9a-zA-Z_\-]{1,100})/$',
+        views.PoolCapacityView.as_view(),
+        name='pool-capacity'),
     #####regions#####
     url(r'^sequential-regions/$',
         viewsets.sequential_region_list,
@@ -60,6 +63,14 @@ urlpatterns = [
         name='allocate'),
     url(r'^allocate/(?P<pool>[0-9a-zA-Z]{1,100})/(?P<size>[\d]{1,19})/$',
         views.AllocateView.as_view(), name='allocate-numbers'),
+    url(r'^allocate-async/(?P<pool>[0-9a-zA-Z]{1,100})/'
+        r'(?P<size>[\d]{1,19})/$',
+        async_views.allocate_view, name='allocate-numbers-async'),
+    url(r'^allocate-batch/$',
+        views.BatchAllocateView.as_view(),
+        name='allocate-batch'),
+    #####metrics#####
+    url(r'^metrics/$', views.MetricsView.as_view(), name='metrics'),
 ]
 
 urlpatterns += viewpatterns
@@ -18,8 +18,11 @@
 '''
 import logging
 
+from django.db import transaction
+from django.http import HttpResponse
 from django.utils.translation import gettext_lazy as _
 
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import BasePermission
 from rest_framework.reverse import reverse
 from rest_framework.response import Response
@@ -27,11 +30,19 @@ from rest_framework.request import Request
 from rest_framework.throttling import UserRateThrottle
 from rest_framework import generics, views
 
+from serialbox import timing
 from serialbox.api import serializers as sb_serializers
-from serialbox.discovery import get_generator
+from serialbox.api.streaming import STREAM_FORMATS, \
+    get_streaming_response, get_template_response
+from serialbox.discovery import get_generator, get_generator_by_region, \
+    get_gs1_configuration, get_pool, get_regions_by_pools, get_response_rule
+from serialbox.gs1 import GS1Formatter, SGTIN_FORMATS
+from serialbox.generators import errors as generator_errors
+from serialbox.generators.leasing import leases
 from serialbox.flavor_packs import FlavorSaver
+from serialbox.response.templates import get_response_template
 from serialbox.rules.steps import execute_rule_inline
-from serialbox.models import ResponseRule
+from serialbox.models import Pool
 from rest_framework.permissions import IsAuthenticated
 
 from quartet_capture.models import Task as DBTask, TaskParameter
@@ -39,6 +50,24 @@ from quartet_capture.models import Task as DBTask, TaskParameter
 logger = logging.getLogger(__name__)
 
 
+def get_gs1_formatter(pool, gs1_format):
+    '''
+    Returns a GS1Formatter for the GS1 configuration of the pool.  Raises
+    a validation error if the pool can not be formatted as requested, so
+    call it before any numbers are allocated.
+    '''
+    configuration = get_gs1_configuration(pool)
+    if not configuration:
+        raise ValidationError(
+            {'gs1': _('The pool %s has no GS1 configuration.') %
+             pool.machine_name})
+    if gs1_format in SGTIN_FORMATS and not configuration.item_reference:
+        raise ValidationError(
+            {'gs1': _('The GS1 configuration of pool %s has no item '
+                      'reference.') % pool.machine_name})
+    return GS1Formatter(configuration, gs1_format)
+
+
 class AllocationPermission(BasePermission):
     """
     Checks to see if users have the right to allocate numbers.
@@ -76,7 +105,9 @@ class APIRoot(views.APIView):
         'sequential-region-list',
         'sequential-region-create',
         'response-rules',
-        'allocate']
+        'allocate',
+        'allocate-batch',
+        'metrics']
 
     def __init__(self, **kwargs):
         views.APIView.__init__(self, **kwargs)
@@ -108,6 +139,43 @@ class DetailViewBase(generics.RetrieveAPIView):
     throttle_classes = (UserRateThrottle,)
 
 
+class PoolCapacityView(generics.RetrieveAPIView):
+    '''
+    ## Description
+
+    Returns the number of numbers remaining in the active regions of a
+    pool.  The value is a running counter kept on the pool, so this is a
+    single row lookup no matter how many regions the pool has.
+
+    ## Response Example
+
+    ```
+    {
+    "machine_name": "utpool1",
+    "remaining": 99990
+    }
+    ```
+    '''
+    permission_classes = (IsAuthenticated,)
+    queryset = Pool.objects.all()
+    serializer_class = sb_serializers.PoolCapacitySerializer
+    lookup_field = 'machine_name'
+
+
+class MetricsView(views.APIView):
+    '''
+    Returns the allocation stage duration histograms of the worker process
+    that serves the request in the Prometheus text format.  Histograms are
+    only recorded when the STAGE_TIMING setting is on.
+    '''
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request):
+        return HttpResponse(timing.histograms.export(),
+                            content_type='text/plain; version=0.0.4; '
+                                         'charset=utf-8')
+
+
 class AllocateView(views.APIView):
     '''
     ## Description
@@ -195,6 +263,38 @@ class AllocateView(views.APIView):
         * decimal - 0 through 9
     * __region__: The *machine name* of the region that handled the response
     via the Pool specified in the request.
+
+    ### Encoding
+    Add an `encoding` query parameter of `decimal` (the default), `hex` or
+    `base-36` to receive the numbers in that base, and a `width` to left pad
+    every number with zeros to that many characters.  Sequential responses
+    encode their first and last numbers the same way.
+
+    ### GS1 Identifiers
+    Add a `gs1` query parameter of `sgtin-urn`, `sgtin-element`, `sscc` or
+    `sscc-urn` to receive every number as a GS1 identifier built from the
+    GS1 configuration of the pool, for example
+    `urn:epc:id:sgtin:0614141.812345.400` or `106141411234567897`.  Check
+    digits are included where the format has them and sequential ranges
+    are expanded into every identifier of the range.  SSCC serial
+    references are zero padded decimal numbers, so `sscc` and `sscc-urn`
+    can not be combined with the `encoding` and `width` options.
+
+    ### Response Templates
+    Add a `template` query parameter with the name of one of the pool's
+    Response Templates to have the response rendered by that Jinja2
+    template.  The rendered template is streamed with the template's
+    content type and the other response values are returned in the same
+    headers as a streamed response.  Response rules are not applied.
+
+    ### Streaming
+    Add a `stream` query parameter of `json`, `csv` or `ndjson` to have every
+    number written out as it is produced instead of building the response
+    in memory.  Sequential ranges are expanded into their individual
+    numbers.  The other response values are returned in the
+    `X-Serialbox-Pool`, `X-Serialbox-Region`, `X-Serialbox-Type`,
+    `X-Serialbox-Fulfilled` and `X-Serialbox-Size-Granted` headers and
+    response rules are not applied.
     '''
     permission_classes = (IsAuthenticated, AllocationPermission)
     serializer_class = sb_serializers.ResponseSerializer
@@ -205,84 +305,222 @@ class AllocateView(views.APIView):
         # generating an error.  Probably want a better approach
         if pool and size:
             logger.debug('Request received for pool %s and region %s.')
-            # convert the size parameter to an integer
-            size = int(size)
-
-            generator = get_generator(pool)
-            # pass the request off to the generator
-            response = generator.get_response(request, size,
-                                              pool, region)
-            response_rule = None
-            try:
-                content_type = request.accepted_renderer.format
-                response_rule = ResponseRule.objects.get(
-                    content_type=content_type,
-                    pool=generator.pool
-                )
-            except ResponseRule.DoesNotExist:
-                logger.info("No response rules for content type %s and "
-                            "pool %s", request.accepted_renderer.format,
-                            generator.pool)
-
-            if not response_rule:
-                serializer = sb_serializers.ResponseSerializer(response)
-                ret = serializer.data
-            else:
-                # get the response rule that matches the content
-                logger.debug('looking for a responserule with format %s '
-                             'for pool %s.', format,
-                             generator.pool.readable_name)
-                db_task = self._set_task_parameters(pool, region,
-                                                    response_rule, size,
-                                                    request)
-                try:
-                    number_list = response.get_number_list()
-                    rule = execute_rule_inline(number_list, db_task)
-                    ret = rule.data
-                    db_task.STATUS = "FINISHED"
-                    db_task.save()
-                except ResponseRule.DoesNotExist:
-                    db_task.status = 'ERROR'
-                    db_task.save()
-                    logger.exception('Could not find a response rule for this '
-                                     'format. Falling back to default return '
-                                     'value')
-                    raise
+            timing.get_timings(request)
+            allocation = Allocation(request, pool, size, region)
+            allocation.lookup()
+            allocation.allocate()
+            streamed = allocation.get_streamed_response()
+            if streamed:
+                return timing.finish(request, streamed)
+            ret = allocation.get_data(request.accepted_renderer.format)
+            return timing.finish(request, Response(ret))
         return Response(ret)
 
-    def _set_task_parameters(self, pool, region, response_rule, size, request):
+
+class Allocation(object):
+    '''
+    The steps of a single allocation request, shared by the AllocateView
+    and the async allocation view (see serialbox.api.async_views).  Each
+    step is a plain blocking call so the async view can run the steps
+    that touch the database on its thread pool and await them.
+    '''
+
+    def __init__(self, request, pool, size, region=None):
+        '''
+        Validates the query parameters of the request.  Nothing is looked
+        up or allocated yet.
+        '''
+        self.request = request
+        self.pool = pool
+        # convert the size parameter to an integer
+        self.size = int(size)
+        self.region = region
+        self.stream_format = request.query_params.get('stream')
+        if self.stream_format and self.stream_format not in STREAM_FORMATS:
+            raise ValidationError(
+                {'stream': _('Unknown stream format %s, use one of: '
+                             '%s.') % (self.stream_format,
+                                       ', '.join(sorted(STREAM_FORMATS)))})
+        options = sb_serializers.EncodingSerializer(
+            data=request.query_params)
+        options.is_valid(raise_exception=True)
+        self.options = options.validated_data
+        self.gs1_format = self.options.pop('gs1', None)
+        self.template_name = request.query_params.get('template')
+        if self.template_name and self.stream_format:
+            raise ValidationError(
+                {'template': _('Template responses are always streamed, '
+                               'the stream option can not be used.')})
+        self.formatter = None
+        self.response_template = self.template = None
+
+    def lookup(self):
+        '''
+        Looks up the pool, its generator and any GS1 configuration or
+        response template the request asked for.
+        '''
+        with timing.stage(self.request, 'lookup'):
+            self.generator = get_generator(self.pool)
+        if self.gs1_format:
+            self.formatter = get_gs1_formatter(get_pool(self.pool),
+                                               self.gs1_format)
+        if self.template_name:
+            self.response_template, self.template = get_response_template(
+                get_pool(self.pool), self.template_name)
+
+    def allocate(self):
+        '''
+        Allocates the numbers.
+        :return: The serialbox.models.Response of the allocation.
+        '''
+        # pass the request off to the generator
+        self.response = self.generator.get_response(
+            self.request, self.size, self.pool, self.region, **self.options)
+        self.response.gs1 = self.formatter
+        return self.response
+
+    def get_streamed_response(self):
+        '''
+        Returns the streamed or template response the request asked for, if
+        any.
+        '''
+        if self.stream_format:
+            return get_streaming_response(self.response, self.stream_format)
+        if self.template:
+            return get_template_response(self.response,
+                                         self.response_template,
+                                         self.template)
+        return None
+
+    def get_data(self, content_type):
+        '''
+        Returns the response data for the renderer format, running the
+        pool's response rule for the format if it has one.
+        '''
+        # get the response rule that matches the content
+        with timing.stage(self.request, 'response_rule_lookup'):
+            response_rule = get_response_rule(self.generator.pool,
+                                              content_type)
+        if not response_rule:
+            logger.info("No response rules for content type %s and "
+                        "pool %s", content_type, self.generator.pool)
+            serializer = sb_serializers.ResponseSerializer(self.response)
+            return serializer.data
+        with timing.stage(self.request, 'response_rule'):
+            db_task = self._set_task_parameters(response_rule)
+            try:
+                number_list = self.response.get_number_list()
+                rule = execute_rule_inline(number_list, db_task,
+                                           save_task=False)
+                return rule.data
+            finally:
+                # the task is written once with its final status
+                db_task.save()
+
+    def _set_task_parameters(self, response_rule):
+        '''
+        Creates the task that runs the response rule along with all of its
+        parameters in a single insert.
+        '''
         db_task = DBTask.objects.create(
             rule=response_rule.rule,
-            status='FINISHED'
-        )
-        TaskParameter.objects.create(
-            name='source',
-            value='serialbox-allocate',
-            task=db_task
+            status=DBTask.STATUS.RUNNING
         )
-        TaskParameter.objects.create(
-            name='pool',
-            value=pool,
-            task=db_task
-        )
-        TaskParameter.objects.create(
-            name='size',
-            value=str(size),
-            task=db_task
-        )
-        if region:
-            TaskParameter.objects.create(
-                name='region',
-                value=region,
-                task=db_task
-            )
-        query_values = request.query_params.dict()
-        if len(query_values) > 0:
-            for k, v in query_values.items():
-                TaskParameter.objects.create(
-                    name=k,
-                    value=v,
-                    task=db_task
-                )
-
+        parameters = [
+            ('source', 'serialbox-allocate'),
+            ('pool', self.pool),
+            ('size', str(self.size)),
+        ]
+        if self.region:
+            parameters.append(('region', self.region))
+        parameters += self.request.query_params.dict().items()
+        TaskParameter.objects.bulk_create([
+            TaskParameter(name=name, value=value, task=db_task)
+            for name, value in parameters
+        ])
         return db_task
+
+
+class BatchAllocateView(views.APIView):
+    '''
+    ## Description
+
+    Allocates numbers from any number of pools in a single request and a
+    single database transaction.  If any allocation in the batch fails,
+    none of the numbers in the batch are allocated.
+
+    ## Usage
+    POST a list of allocation requests.  The `region` value is optional
+    and, if omitted, the next active region of the pool is used.  The
+    `encoding`, `width` and `gs1` options of the allocate API may be given
+    per entry.
+
+    ```
+    [
+        {"pool": "itempool", "size": 100},
+        {"pool": "casepool", "size": 10},
+        {"pool": "palletpool", "size": 1, "region": "palletregion2"}
+    ]
+    ```
+
+    The response is a list with one allocation response per request, in
+    the same order and in the same format as the allocate API.  Response
+    rules are not executed for batch allocations.
+    '''
+    permission_classes = (IsAuthenticated, AllocationPermission)
+    serializer_class = sb_serializers.AllocationRequestSerializer
+
+    def post(self, request: Request):
+        serializer = sb_serializers.AllocationRequestSerializer(
+            data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        entries = serializer.validated_data
+        pools = {
+            pool.machine_name: pool for pool in Pool.objects.filter(
+                machine_name__in=[entry['pool'] for entry in entries],
+                active=True)
+        }
+        regions = get_regions_by_pools(pools.values())
+        generators = {}
+        responses = []
+        with transaction.atomic(), leases.suspend():
+            for entry in entries:
+                try:
+                    pool = pools[entry['pool']]
+                except KeyError:
+                    raise generator_errors.PoolNotFoundException()
+                pool_regions = regions[pool.pk]
+                region = self._get_region(pool, pool_regions,
+                                          entry.get('region'))
+                generator = generators.get(region.__class__)
+                if not generator:
+                    generator = get_generator_by_region(region)
+                    generators[region.__class__] = generator
+                formatter = None
+                if entry.get('gs1'):
+                    formatter = get_gs1_formatter(pool, entry['gs1'])
+                response = generator.allocate(
+                    request, entry['size'], pool, region,
+                    entry['encoding'], entry.get('width'))
+                response.gs1 = formatter
+                responses.append(response)
+                if not region.active:
+                    pool_regions.remove(region)
+        serializer = sb_serializers.ResponseSerializer(responses, many=True)
+        return Response(serializer.data)
+
+    def _get_region(self, pool, pool_regions, machine_name=None):
+        '''
+        Returns the region with the supplied machine name or the active
+        region with the lowest order from the list of pool regions.
+        '''
+        if not machine_name:
+            if not pool_regions:
+                raise NotFound('SerialBox could not find any active regions '
+                               'for the pool with machine name %s.' %
+                               pool.machine_name)
+            return pool_regions[0]
+        for region in pool_regions:
+            if region.machine_name == machine_name:
+                return region
+        raise generator_errors.RegionNotFoundException()
@@ -20,7 +20,7 @@ from django.utils.translation import ugettext as _
 
 from rest_framework import renderers
 
-from serialbox import models, viewsets
+from serialbox import discovery, models, viewsets
 from serialbox.api import serializers
 from rest_framework.decorators import detail_route, action
 from rest_framework.response import Response
@@ -76,6 +76,20 @@ class PoolViewSet(viewsets.SerialBoxModelViewSet, FormMixin):
     queryset = models.Pool.objects.all()
     lookup_field = 'machine_name'
 
+    def get_queryset(self):
+        '''
+        Prefetches the regions of every Region model the serializer renders,
+        flavor pack regions included, and annotates the active region count
+        so a page of pools costs the same number of queries regardless of
+        its size.
+        '''
+        fields = self.get_serializer_class()._declared_fields
+        relations = [relation for relation in
+                     discovery.get_region_relations() if relation in fields]
+        return discovery.annotate_active_region_count(
+            super(PoolViewSet, self).get_queryset().prefetch_related(
+                *relations))
+
     def get_serializer_class(self):
         '''
         Return a different serializer depending on the client request.
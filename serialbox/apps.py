@@ -28,4 +28,30 @@ class PoolsConfig(AppConfig):
         self.name = app_name
 
     def ready(self):
-        pass
+        from django.db.models.signals import pre_save, post_save, \
+            post_delete
+        from django.test.signals import setting_changed
+        from serialbox import capacity, discovery
+        from serialbox.generators import registry
+        from serialbox.rules import steps
+        from quartet_capture.models import Rule, RuleParameter, Step, \
+            StepParameter
+        from serialbox.models import GS1Configuration, Pool, ResponseRule
+        for model in [Pool, GS1Configuration] + discovery.get_all_regions():
+            post_save.connect(discovery.invalidate_pool_cache, model)
+            post_delete.connect(discovery.invalidate_pool_cache, model)
+        for model in discovery.get_all_regions():
+            pre_save.connect(capacity.region_pre_save, model)
+            post_save.connect(capacity.region_post_save, model)
+            post_delete.connect(capacity.region_post_delete, model)
+            post_save.connect(discovery.update_region_names, model)
+            post_delete.connect(discovery.discard_region_name, model)
+        post_save.connect(discovery.invalidate_response_rule_cache,
+                          ResponseRule)
+        for model in (ResponseRule, Pool, Rule):
+            post_delete.connect(discovery.invalidate_response_rule_cache,
+                                model)
+        for model in (Rule, RuleParameter, Step, StepParameter):
+            post_save.connect(steps.invalidate_rule_cache, model)
+            post_delete.connect(steps.invalidate_rule_cache, model)
+        setting_changed.connect(registry.reload_settings)
@@ -0,0 +1,139 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import os
+import atexit
+import logging
+import threading
+
+from django.db import connection, transaction
+
+from serialbox import serialbox_settings as settings
+from serialbox.models import Response
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseRecorder(object):
+    '''
+    Persists the Response of every allocation as an audit trail.
+
+    In the default `async` mode responses are queued in memory once the
+    allocating transaction commits.  A background thread writes the queue
+    with a single bulk_create every RESPONSE_AUDIT_FLUSH_INTERVAL seconds
+    and the request that fills the queue to RESPONSE_AUDIT_BATCH_SIZE
+    records writes it inline, so the queue stays bounded even where the
+    thread never gets to run.  Anything still queued is written when the
+    process exits.  Each record keeps the time of its allocation as its
+    created_date.  In `sync`
+    mode each response is inserted right away inside the allocating
+    transaction, which is what the tests use.  See the
+    RESPONSE_AUDIT_MODE setting.
+    '''
+
+    def __init__(self):
+        self._queue = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = os.getpid()
+
+    def record(self, response):
+        '''
+        Records the response according to the RESPONSE_AUDIT_MODE setting.
+        '''
+        mode = settings.RESPONSE_AUDIT_MODE
+        if mode == 'sync':
+            Response.objects.bulk_create([response])
+        elif mode == 'async':
+            # numbers from a rolled back transaction were never granted
+            transaction.on_commit(lambda: self._enqueue(response))
+
+    def flush(self):
+        '''
+        Writes every queued response and returns how many were written.
+        Records that can not be written are logged and dropped rather than
+        held in memory indefinitely.
+        '''
+        with self._lock:
+            batch, self._queue = self._queue, []
+        if not batch:
+            return 0
+        try:
+            Response.objects.bulk_create(
+                batch, batch_size=settings.RESPONSE_AUDIT_BATCH_SIZE)
+        except Exception:
+            logger.exception('Could not write %s response audit records.',
+                             len(batch))
+            return 0
+        logger.debug('Wrote %s response audit records.', len(batch))
+        return len(batch)
+
+    def shutdown(self):
+        '''
+        Stops the background thread and writes anything left in the queue.
+        '''
+        self._stopping = True
+        thread = self._thread
+        if thread and self._pid == os.getpid():
+            self._wakeup.set()
+            thread.join(settings.RESPONSE_AUDIT_FLUSH_INTERVAL + 5)
+        self.flush()
+
+    def _enqueue(self, response):
+        self._check_pid()
+        with self._lock:
+            self._queue.append(response)
+            full = len(self._queue) >= settings.RESPONSE_AUDIT_BATCH_SIZE
+            if self._thread is None:
+                self._start()
+        if full:
+            self.flush()
+
+    def _start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='serialbox-response-audit',
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(settings.RESPONSE_AUDIT_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                # the thread's connection is not managed by the request
+                # cycle, so do not leave it open between flushes
+                connection.close()
+
+    def _check_pid(self):
+        '''
+        Responses queued before a fork are written by the parent process;
+        the child starts with an empty queue and its own thread.
+        '''
+        if self._pid != os.getpid():
+            self._queue = []
+            self._thread = None
+            self._pid = os.getpid()
+
+
+recorder = ResponseRecorder()
+atexit.register(recorder.shutdown)
@@ -0,0 +1,127 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import json
+import math
+import os
+import platform
+import time
+
+import django
+from django.db import connection
+from django.test import RequestFactory
+
+#: The baseline that ships with SerialBox.
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def percentile(values, percent):
+    '''
+    Returns the nearest-rank percentile of the sorted values.
+    '''
+    if not values:
+        return 0.0
+    index = max(int(math.ceil(percent / 100.0 * len(values))) - 1, 0)
+    return values[index]
+
+
+def run_scenario(scenario, iterations=None):
+    '''
+    Sets up the scenario, runs it a tenth of its iterations to warm the
+    caches and then times each of its iterations.  Returns a dictionary of
+    the p50 and p99 latencies, in milliseconds, and the allocations granted
+    and numbers allocated per second.
+    '''
+    iterations = iterations or scenario.iterations
+    warmup = max(iterations // 10, 1)
+    scenario.setup(iterations + warmup)
+    request = RequestFactory().get('/allocate/%s/%s/' % (
+        scenario.machine_name, scenario.size))
+    latencies = []
+    numbers = 0
+    try:
+        for i in range(warmup):
+            scenario.run(request)
+        started = time.perf_counter()
+        for i in range(iterations):
+            before = time.perf_counter()
+            numbers += scenario.run(request)
+            latencies.append(time.perf_counter() - before)
+        elapsed = time.perf_counter() - started
+    finally:
+        scenario.teardown()
+    latencies.sort()
+    return {
+        'size': scenario.size,
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 4),
+        'grants_per_second': round(iterations / elapsed, 2),
+        'numbers_per_second': round(numbers / elapsed, 2),
+    }
+
+
+def run(scenarios, iterations=None):
+    '''
+    Runs each scenario and returns the results with the environment they
+    were measured in.
+    '''
+    return {
+        'environment': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'scenarios': {scenario.name: run_scenario(scenario, iterations)
+                      for scenario in scenarios},
+    }
+
+
+def compare(results, baseline, tolerance):
+    '''
+    Compares the results with a baseline and returns a message for each
+    scenario whose p50 or p99 latency is more than `tolerance` (a fraction)
+    above the baseline or whose grants per second are more than
+    `tolerance` below it.  Scenarios missing from either are skipped.
+    '''
+    failures = []
+    for name, result in sorted(results['scenarios'].items()):
+        expected = baseline['scenarios'].get(name)
+        if not expected:
+            continue
+        for key in ('p50_ms', 'p99_ms'):
+            limit = expected[key] * (1 + tolerance)
+            if result[key] > limit:
+                failures.append('%s: %s of %s exceeds %s' % (
+                    name, key, result[key], round(limit, 4)))
+        limit = expected['grants_per_second'] / (1 + tolerance)
+        if result['grants_per_second'] < limit:
+            failures.append('%s: grants_per_second of %s is below %s' % (
+                name, result['grants_per_second'], round(limit, 2)))
+    return failures
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def dump(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
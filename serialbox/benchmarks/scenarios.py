@@ -0,0 +1,178 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import os
+import tempfile
+from abc import ABCMeta, abstractmethod
+
+import six
+
+from django.contrib.auth.models import User
+from quartet_capture.models import Rule, Step
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from serialbox import listfiles
+from serialbox.api.views import AllocateView
+from serialbox.discovery import get_generator_by_region_model
+from serialbox.models import ListRegion, Pool, RandomizedRegion, \
+    ResponseRule, SequentialRegion
+
+
+@six.add_metaclass(ABCMeta)
+class Scenario(object):
+    '''
+    A benchmark scenario.  `setup` creates the pool the scenario allocates
+    from and `run` makes one allocation of `size` numbers and returns the
+    number of numbers granted.
+    '''
+    region_model = SequentialRegion
+    regions = 1
+
+    def __init__(self, name, size, iterations):
+        self.name = name
+        self.size = size
+        self.iterations = iterations
+        self.machine_name = 'bench%s' % name.replace('-', '')
+
+    def setup(self, total):
+        '''
+        Creates the pool and regions with room for `total` allocations.
+        '''
+        self.pool = Pool.objects.create(readable_name=self.machine_name,
+                                        machine_name=self.machine_name,
+                                        request_threshold=10 ** 9)
+        for order in range(1, self.regions + 1):
+            self.create_region(order, total)
+
+    def create_region(self, order, total):
+        start = (order - 1) * 10 ** 12 + 1
+        SequentialRegion.objects.create(
+            readable_name='%s %s' % (self.machine_name, order),
+            machine_name='%sr%s' % (self.machine_name, order),
+            order=order, start=start, end=start + 10 ** 12 - 1,
+            pool=self.pool)
+
+    @abstractmethod
+    def run(self, request):
+        '''
+        Makes one allocation and returns the number of numbers granted.
+        '''
+        pass
+
+    def teardown(self):
+        pass
+
+
+class GeneratorScenario(Scenario):
+    '''
+    Allocates with the region's generator, as the AllocateView would after
+    it has found the generator.
+    '''
+
+    def run(self, request):
+        generator = get_generator_by_region_model(self.region_model)
+        return generator.get_response(request, self.size,
+                                      self.machine_name).size_granted
+
+
+class ManyRegionScenario(GeneratorScenario):
+    '''
+    Allocates from a pool with many active regions.
+    '''
+    regions = 200
+
+
+class RandomizedScenario(GeneratorScenario):
+    region_model = RandomizedRegion
+
+    def create_region(self, order, total):
+        RandomizedRegion.objects.create(
+            readable_name=self.machine_name, machine_name=self.machine_name,
+            order=order, min=1, max=10 ** 12, pool=self.pool)
+
+
+class ListScenario(GeneratorScenario):
+    region_model = ListRegion
+
+    def create_region(self, order, total):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'bench.sbl')
+        listfiles.write_list_file(
+            path, ('SN%012d' % i for i in range(total * self.size)), 14)
+        ListRegion.objects.create(
+            readable_name=self.machine_name, machine_name=self.machine_name,
+            order=order, file_path=path, pool=self.pool)
+
+    def teardown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+
+class ViewScenario(Scenario):
+    '''
+    Allocates through the AllocateView with a JSON response.
+    '''
+
+    def setup(self, total):
+        super(ViewScenario, self).setup(total)
+        self.view = AllocateView.as_view()
+        self.user, created = User.objects.get_or_create(
+            username='serialbox-benchmark', is_superuser=True)
+        self.factory = APIRequestFactory()
+
+    def run(self, request):
+        request = self.factory.get('/allocate/%s/%s/' % (self.machine_name,
+                                                         self.size),
+                                   {'format': 'json'})
+        force_authenticate(request, user=self.user)
+        response = self.view(request, pool=self.machine_name,
+                             size=str(self.size))
+        response.render()
+        if response.status_code != 200:
+            raise AssertionError('%s returned %s: %s' % (
+                self.name, response.status_code, response.content))
+        return self.size
+
+
+class ResponseRuleScenario(ViewScenario):
+    '''
+    Allocates through the AllocateView with a JSON response rule.
+    '''
+
+    def setup(self, total):
+        super(ResponseRuleScenario, self).setup(total)
+        rule = Rule.objects.create(name=self.machine_name)
+        Step.objects.create(name='count', rule=rule, order=1,
+                            step_class='serialbox.benchmarks.steps.CountStep')
+        ResponseRule.objects.create(pool=self.pool, rule=rule,
+                                    content_type='json')
+
+
+#: Every benchmark scenario, in the order they are run.
+SCENARIOS = [
+    GeneratorScenario('sequential-1', 1, 500),
+    GeneratorScenario('sequential-50000', 50000, 500),
+    ManyRegionScenario('sequential-many-regions-1', 1, 500),
+    RandomizedScenario('random-1', 1, 500),
+    RandomizedScenario('random-10000', 10000, 100),
+    ListScenario('list-1', 1, 500),
+    ListScenario('list-10000', 10000, 100),
+    ViewScenario('view-json-100', 100, 300),
+    ResponseRuleScenario('view-rule-100', 100, 300),
+]
@@ -0,0 +1,320 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import ast
+import base64
+import bisect
+import http.client
+import json
+import multiprocessing
+import time
+from urllib.parse import urlsplit
+
+from django.db import OperationalError, connection, connections
+from django.http import HttpRequest
+from rest_framework.exceptions import APIException
+
+from serialbox import audit, discovery
+from serialbox.benchmarks.runner import percentile
+from serialbox.generators.leasing import leases
+from serialbox.models import Pool, SequentialRegion, SkippedRange
+
+
+class LockWaitTimer(object):
+    '''
+    A database execute wrapper that counts the writes and row locks that
+    took at least `threshold` seconds, which under contention is time spent
+    waiting on a lock held by another process.
+    '''
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.waits = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold and self._is_locking(sql):
+                self.waits += 1
+                self.seconds += elapsed
+
+    def _is_locking(self, sql):
+        sql = sql.lstrip().upper()
+        return sql.startswith(('UPDATE', 'INSERT', 'DELETE')) or \
+            'FOR UPDATE' in sql
+
+
+class StressRequest(HttpRequest):
+    '''
+    The request the allocating processes pass to the generators.  Marks
+    their audit records as coming from the harness, without depending on
+    ALLOWED_HOSTS.
+    '''
+
+    def get_host(self):
+        return 'stress_allocate'
+
+
+def get_intervals(response_type, numbers):
+    '''
+    Returns the numbers of an allocation as a list of inclusive
+    (first, last) intervals.  Sequential allocations are one or more
+    ranges, any other allocation is a list of single numbers.
+    '''
+    if response_type != 'sequential':
+        return [(number, number) for number in numbers]
+    if numbers and isinstance(numbers[0], (list, tuple)):
+        return [(first, last) for first, last in numbers]
+    return [(numbers[0], numbers[-1])] if numbers else []
+
+
+def sweep(intervals):
+    '''
+    Sorts the intervals and sweeps them once.  Returns a list of the
+    (first, last) intervals where two or more intervals overlap and the
+    union of the intervals as a sorted list of disjoint intervals.
+    '''
+    overlaps = []
+    merged = []
+    # list region numbers are strings, sort them after the integers
+    for first, last in sorted(intervals, key=lambda interval: (
+            isinstance(interval[0], str), interval)):
+        if merged and type(first) is type(merged[-1][1]) and \
+                first <= merged[-1][1]:
+            overlaps.append((first, min(last, merged[-1][1])))
+            if last > merged[-1][1]:
+                merged[-1] = (merged[-1][0], last)
+        elif merged and isinstance(first, int) and first == merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return overlaps, merged
+
+
+def find_gaps(merged, first, last):
+    '''
+    Returns the (first, last) intervals between `first` and `last` that
+    are not covered by the sorted, disjoint `merged` intervals.
+    '''
+    gaps = []
+    start = first
+    i = max(bisect.bisect_right(merged, (first, float('inf'))) - 1, 0)
+    for low, high in merged[i:]:
+        if low > last:
+            break
+        if high < start:
+            continue
+        if low > start:
+            gaps.append((start, low - 1))
+        start = high + 1
+        if start > last:
+            return gaps
+    if start <= last:
+        gaps.append((start, last))
+    return gaps
+
+
+def allocate_locally(options, size):
+    '''
+    Returns an allocation function that calls Generator.get_response in
+    this process.
+    '''
+    request = StressRequest()
+
+    def allocate():
+        generator = discovery.get_generator(options['pool'])
+        response = generator.get_response(request, size, options['pool'])
+        return response.type, response.number_list
+
+    return allocate
+
+
+def allocate_remotely(options, size):
+    '''
+    Returns an allocation function that GETs the allocate API url.
+    Server errors raise an OperationalError so they are retried.
+    '''
+    parts = urlsplit(options['url'])
+    path = parts.path + '?' + (parts.query + '&' if parts.query else '') + \
+        'format=json'
+    connection_class = http.client.HTTPSConnection \
+        if parts.scheme == 'https' else http.client.HTTPConnection
+    headers = {}
+    if options.get('username'):
+        credentials = '%s:%s' % (options['username'],
+                                 options.get('password') or '')
+        headers['Authorization'] = 'Basic %s' % base64.b64encode(
+            credentials.encode()).decode()
+    state = {'connection': None}
+
+    def allocate():
+        if state['connection'] is None:
+            state['connection'] = connection_class(parts.netloc, timeout=60)
+        try:
+            state['connection'].request('GET', path, headers=headers)
+            response = state['connection'].getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            state['connection'].close()
+            state['connection'] = None
+            raise OperationalError(str(e))
+        if response.status >= 500:
+            raise OperationalError(body.decode(errors='replace'))
+        if response.status != 200:
+            raise APIException(body.decode(errors='replace'))
+        data = json.loads(body.decode())
+        return data['type'], ast.literal_eval(data['numbers'])
+
+    return allocate
+
+
+def work(options):
+    '''
+    Allocates from the pool for `duration` seconds and returns the
+    intervals granted and the counts of the worker.  Runs in a child
+    process.
+    '''
+    size = options['size']
+    if options.get('url'):
+        allocate = allocate_remotely(options, size)
+    else:
+        allocate = allocate_locally(options, size)
+    timer = LockWaitTimer(options['lock_wait'])
+    result = {'intervals': [], 'latencies': [], 'allocations': 0,
+              'numbers': 0, 'retries': 0, 'failures': 0, 'errors': []}
+    deadline = time.perf_counter() + options['duration']
+    with connection.execute_wrapper(timer):
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                for attempt in range(options['retries'] + 1):
+                    try:
+                        response_type, numbers = allocate()
+                        break
+                    except OperationalError:
+                        # lock timeouts, serialization failures and
+                        # server errors
+                        if attempt == options['retries']:
+                            raise
+                        result['retries'] += 1
+                result['latencies'].append(time.perf_counter() - started)
+                intervals = get_intervals(response_type, numbers)
+                result['intervals'].extend(intervals)
+                result['allocations'] += 1
+                result['numbers'] += sum(
+                    last - first + 1 if isinstance(first, int) else 1
+                    for first, last in intervals)
+        except (APIException, OperationalError) as e:
+            # an exhausted pool or too many retries ends the worker
+            result['failures'] += 1
+            result['errors'].append(str(e))
+        finally:
+            leases.release_all()
+            audit.recorder.flush()
+    connection.close()
+    result['lock_waits'] = timer.waits
+    result['lock_wait_seconds'] = timer.seconds
+    return result
+
+
+def intervals_in(merged, first, last):
+    '''
+    Returns the integer intervals of the sorted, disjoint `merged`
+    intervals that touch [first, last].
+    '''
+    return [(low, high) for low, high in merged
+            if isinstance(low, int) and low <= last and high >= first]
+
+
+def get_sequential_states(pool):
+    '''
+    Returns the machine name and state of each active sequential region of
+    the pool by primary key.
+    '''
+    return {pk: (machine_name, state)
+            for pk, machine_name, state in SequentialRegion.objects.filter(
+                pool=pool, active=True).values_list('pk', 'machine_name',
+                                                    'state')}
+
+
+def run(pool, processes=4, duration=10.0, size=1, url=None, username=None,
+        password=None, retries=5, lock_wait=0.01):
+    '''
+    Starts `processes` child processes that allocate `size` numbers at a
+    time from the pool, through Generator.get_response or, if a `url` is
+    supplied, through the allocate API, for `duration` seconds.  Sweeps
+    every granted interval for overlaps and, for the pool's sequential
+    regions, for numbers the regions handed out that nobody received and
+    that are not recorded as skipped.
+    :return: A dictionary of the results.
+    '''
+    pool = Pool.objects.get(machine_name=pool)
+    before = get_sequential_states(pool)
+    options = {'pool': pool.machine_name, 'size': size, 'url': url,
+               'username': username, 'password': password,
+               'duration': duration, 'retries': retries,
+               'lock_wait': lock_wait}
+    # the children must not share the parent's database connections
+    connections.close_all()
+    started = time.perf_counter()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes) as workers:
+        results = workers.map(work, [options] * processes)
+    elapsed = time.perf_counter() - started
+    intervals = [interval for result in results
+                 for interval in result['intervals']]
+    latencies = sorted(latency for result in results
+                       for latency in result['latencies'])
+    overlaps, merged = sweep(intervals)
+    gaps = []
+    after = SequentialRegion.objects.filter(pk__in=before)
+    for region in after:
+        machine_name, first = before[region.pk]
+        last = region.state - 1
+        if last < first:
+            continue
+        skipped = SkippedRange.objects.filter(
+            region=machine_name, first__lte=last, last__gte=first
+        ).values_list('first', 'last')
+        covered = sweep(intervals_in(merged, first, last) +
+                        list(skipped))[1]
+        gaps.extend(find_gaps(covered, first, last))
+    allocations = sum(result['allocations'] for result in results)
+    return {
+        'pool': pool.machine_name,
+        'processes': processes,
+        'duration': round(elapsed, 3),
+        'allocations': allocations,
+        'numbers': sum(result['numbers'] for result in results),
+        'grants_per_second': round(allocations / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 4),
+        'retries': sum(result['retries'] for result in results),
+        'lock_waits': sum(result['lock_waits'] for result in results),
+        'lock_wait_seconds': round(sum(
+            result['lock_wait_seconds'] for result in results), 4),
+        'failures': sum(result['failures'] for result in results),
+        'errors': [error for result in results
+                   for error in result['errors']],
+        'overlaps': overlaps,
+        'gaps': gaps,
+    }
@@ -0,0 +1,95 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import logging
+import threading
+
+from django.core.cache import caches
+from django.db import transaction
+
+from serialbox import serialbox_settings as settings
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCache(object):
+    '''
+    A process-local dictionary for metadata that rarely changes.  Every
+    lookup compares the local generation with a counter kept in the Django
+    cache named by the METADATA_CACHE_ALIAS setting; when another process
+    invalidates the cache the counter changes and the local entries are
+    dropped.  The cache is disabled when METADATA_CACHE_ALIAS is not set.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.key = 'serialbox:%s:generation' % name
+        self._data = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(settings.METADATA_CACHE_ALIAS)
+
+    def get(self, key, default=None):
+        '''
+        Returns the locally cached value for the key if the generation has
+        not changed since it was stored.
+        '''
+        if not self.enabled:
+            return default
+        generation = self._get_generation()
+        with self._lock:
+            if generation != self._generation:
+                self._data = {}
+                self._generation = generation
+            return self._data.get(key, default)
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = value
+
+    def invalidate(self):
+        '''
+        Drops the local entries right away and bumps the shared generation
+        once the current transaction commits, so other processes do not
+        reload the old values before the change is visible to them.
+        '''
+        with self._lock:
+            self._data = {}
+        if self.enabled:
+            transaction.on_commit(self._bump_generation)
+
+    def _get_generation(self):
+        cache = caches[settings.METADATA_CACHE_ALIAS]
+        generation = cache.get(self.key)
+        if generation is None:
+            cache.add(self.key, 1, timeout=None)
+            generation = cache.get(self.key)
+        return generation
+
+    def _bump_generation(self):
+        cache = caches[settings.METADATA_CACHE_ALIAS]
+        try:
+            cache.incr(self.key)
+        except ValueError:
+            cache.add(self.key, 1, timeout=None)
+        logger.debug('Invalidated the %s cache.', self.name)
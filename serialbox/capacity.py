@@ -0,0 +1,105 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import logging
+
+from django.db import transaction
+from django.db.models import F
+
+from serialbox.models import Pool
+
+logger = logging.getLogger(__name__)
+
+
+def get_remaining(pool):
+    '''
+    Returns the number of numbers remaining in the active regions of the
+    pool from the pool's running counter.  The counter is read from the
+    database since pool instances may be cached.
+    '''
+    return Pool.objects.values_list('remaining', flat=True).get(pk=pool.pk)
+
+
+def adjust(pool_id, delta):
+    '''
+    Adds the delta to the remaining counter of the pool.  Call this inside
+    the transaction that changed the region state.
+    '''
+    if pool_id and delta:
+        Pool.objects.filter(pk=pool_id).update(
+            remaining=F('remaining') + delta)
+
+
+def rebuild(pools=None):
+    '''
+    Recalculates the remaining counter of each pool from its active
+    regions.  Rebuilds every pool if none are supplied.
+    '''
+    from serialbox.discovery import get_total_pool_size
+    pools = pools if pools is not None else Pool.objects.all()
+    for pool in pools:
+        with transaction.atomic():
+            # lock the pool row first so allocations that commit while the
+            # regions are being summed are applied on top of the new value
+            list(Pool.objects.select_for_update().filter(pk=pool.pk))
+            pool.remaining = get_total_pool_size(pool)
+            Pool.objects.filter(pk=pool.pk).update(remaining=pool.remaining)
+        logger.debug('Rebuilt pool %s with %s remaining.', pool,
+                     pool.remaining)
+
+
+def _contribution(region):
+    '''
+    The amount a region adds to the remaining counter of its pool.
+    '''
+    if not region.active or not region.pool_id:
+        return 0
+    return max(region.remaining or 0, 0)
+
+
+def region_pre_save(sender, instance, **kwargs):
+    '''
+    Remembers what the stored version of the region contributed to its
+    pool before it is changed.
+    '''
+    previous = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).first()
+    instance._capacity_before = (previous.pool_id, _contribution(previous)) \
+        if previous else (None, 0)
+
+
+def region_post_save(sender, instance, **kwargs):
+    '''
+    Applies the difference between the old and new contribution of the
+    region to the pool counters.
+    '''
+    pool_id, before = getattr(instance, '_capacity_before', (None, 0))
+    after = _contribution(instance)
+    if pool_id == instance.pool_id:
+        adjust(pool_id, after - before)
+    else:
+        adjust(pool_id, -before)
+        adjust(instance.pool_id, after)
+
+
+def region_post_delete(sender, instance, **kwargs):
+    '''
+    Removes a deleted region's remaining numbers from its pool.
+    '''
+    adjust(instance.pool_id, -_contribution(instance))
@@ -17,11 +17,100 @@
     along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
+import threading
+from functools import lru_cache
+
 from django.apps import apps
+from django.db.models import Count, IntegerField, OuterRef, Subquery, \
+    Value
+from django.db.models.functions import Coalesce
 from django.utils.translation import ugettext as _
 from rest_framework.exceptions import NotFound
-from serialbox.models import Region, Pool, SequentialRegion
+from serialbox.caching import GenerationCache
+from serialbox.models import Region, GS1Configuration, ListRegion, Pool, \
+    RandomizedRegion, ResponseRule, SequentialRegion
 from serialbox.flavor_packs import FlavorSaver
+from serialbox.generators.registry import registry
+
+#: The generators of the Region models that ship with SerialBox.  Flavor
+#: pack regions are looked up through their flavor pack.
+GENERATORS = {
+    SequentialRegion: 'serialbox.generators.sequential.SequentialGenerator',
+    RandomizedRegion: 'serialbox.generators.randomized.RandomizedGenerator',
+    ListRegion: 'serialbox.generators.list.ListGenerator',
+}
+
+#: Pools by machine name and the active regions of each pool.
+pool_cache = GenerationCache('pools')
+
+#: ResponseRule primary keys, or False for none, by pool and format.
+response_rule_cache = GenerationCache('response_rules')
+
+
+class RegionNameRegistry(object):
+    '''
+    Maps region machine names to the (Region model, primary key) of the
+    region so a region can be fetched by name with a single primary key
+    query instead of one query per Region model.
+
+    Entries are only hints: the region is always fetched by both primary
+    key and machine name, so an entry made stale by another process (a
+    rename or a delete and re-create) just misses and is looked up again.
+    Region saves and deletes in this process update the entries directly.
+    '''
+
+    def __init__(self):
+        self._refs = {}
+        self._lock = threading.Lock()
+
+    def get(self, machine_name):
+        '''
+        Returns the Region instance with the machine name or None.
+        '''
+        ref = self._refs.get(machine_name)
+        if ref:
+            model, pk = ref
+            ret = model.objects.filter(pk=pk,
+                                       machine_name=machine_name).first()
+            if ret:
+                return ret
+            self.discard(machine_name)
+        return self._load(machine_name)
+
+    def _load(self, machine_name):
+        region_models = get_all_regions()
+        if len(region_models) == 1:
+            ret = region_models[0].objects.filter(
+                machine_name=machine_name).first()
+        else:
+            querysets = [
+                model.objects.filter(machine_name=machine_name).annotate(
+                    region_type=Value(index, output_field=IntegerField())
+                ).values_list('region_type', 'pk')
+                for index, model in enumerate(region_models)
+            ]
+            refs = list(querysets[0].union(*querysets[1:], all=True)[:1])
+            ret = region_models[refs[0][0]].objects.filter(
+                pk=refs[0][1]).first() if refs else None
+        if ret:
+            self.add(ret)
+        return ret
+
+    def add(self, region):
+        with self._lock:
+            self._refs[region.machine_name] = (region.__class__, region.pk)
+
+    def discard(self, machine_name):
+        with self._lock:
+            self._refs.pop(machine_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._refs = {}
+
+
+#: Region models and primary keys by region machine name.
+region_names = RegionNameRegistry()
 
 
 def get_all_regions():
@@ -29,11 +118,15 @@ def get_all_regions():
     Returns all of the current models that inherit from
     serialbox.models.Region
     from all of the currently registered
-    Django apps.
+    Django apps.  The list is only built once per process.
     '''
+    return list(_get_region_models())
+
+
+@lru_cache(maxsize=None)
+def _get_region_models():
     models = apps.get_models()  # get all the region models
-    region_models = [model for model in models if issubclass(model, Region)]
-    return region_models
+    return tuple(model for model in models if issubclass(model, Region))
 
 
 def get_all_regions_by_pool(pool, only_active=True):
@@ -51,13 +144,65 @@ def get_all_regions_by_pool(pool, only_active=True):
         kwargs['active'] = True
     for region in region_models:
         #: :type region: Region
-        qs = region.objects.filter(**kwargs).order_by('order')
-        if qs.count() > 0:
-            ret += list(qs)
+        ret += list(region.objects.filter(**kwargs).order_by('order'))
 
     return ret
 
 
+def get_active_region_refs(pool, limit=None):
+    '''
+    Returns a list of (Region model, primary key) tuples for the active
+    regions of the pool, lowest order first, using a single UNION query
+    across every Region model.
+
+    :param pool: The pool to return region references for.
+    :param limit: The maximum number of references to return.
+    '''
+    region_models = get_all_regions()
+    querysets = [
+        model.objects.filter(pool=pool, active=True).annotate(
+            region_type=Value(index, output_field=IntegerField())
+        ).values_list('region_type', 'pk', 'order')
+        for index, model in enumerate(region_models)
+    ]
+    qs = querysets[0]
+    if len(querysets) > 1:
+        qs = qs.union(*querysets[1:], all=True)
+    qs = qs.order_by('order')
+    if limit:
+        qs = qs[:limit]
+    return [(region_models[region_type], pk) for region_type, pk, order in qs]
+
+
+def get_region_relations():
+    '''
+    Returns the names of the reverse relations from Pool to each Region
+    model, for example `sequentialregion_set`.
+    '''
+    return [model._meta.get_field('pool').remote_field.get_accessor_name()
+            for model in get_all_regions()]
+
+
+def annotate_active_region_count(queryset):
+    '''
+    Annotates each Pool in the queryset with `active_region_count`, the
+    number of active regions of every Region model in the pool, using one
+    correlated subquery per Region model rather than joins, which would
+    multiply the rows of each model by the others.
+    '''
+    counts = [
+        Coalesce(Subquery(
+            model.objects.filter(pool=OuterRef('pk'), active=True).order_by(
+            ).values('pool').annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField()), Value(0))
+        for model in get_all_regions()
+    ]
+    total = counts[0]
+    for count in counts[1:]:
+        total = total + count
+    return queryset.annotate(active_region_count=total)
+
+
 def get_total_pool_size(pool):
     '''
     Takes the sum of all `remaining` values of each `Region` in a pool and
@@ -74,37 +219,196 @@ def get_region(pool):
     '''
     Gets the first active Region model in a pool with the lowest order
     number.  Raises an HTTP 404 Not Found if there are no regions.
+
+    When the metadata cache is enabled only the region row itself is
+    fetched; the ordered list of active regions comes from the cache.
     '''
-    ret = None
+    if pool_cache.enabled:
+        refs = get_region_refs(pool)
+        ret = _get_first_active_region(pool, refs)
+        if not ret and refs:
+            # the cached regions were deactivated or deleted by another
+            # process, reload them once
+            pool_cache.invalidate()
+            ret = _get_first_active_region(pool, get_region_refs(pool))
+        if not ret:
+            raise NotFound('SerialBox could not find any active regions '
+                           'for the pool with machine name %s.' %
+                           pool.machine_name)
+        return ret
     region_models = get_all_regions()
-
-    for region in region_models:
-        #: :type region: Region
-        qs = region.objects.filter(pool=pool, active=True).order_by('order')
-        if qs.count() > 0:
-            if not ret:
-                ret = qs[0]
-            else:
-                if qs[0].order < ret.order:
-                    ret = qs[0]
+    if len(region_models) == 1:
+        ret = region_models[0].objects.filter(
+            pool=pool, active=True).order_by('order').first()
+    else:
+        ret = _get_first_active_region(
+            pool, get_active_region_refs(pool, limit=1))
     if not ret:
         raise NotFound('SerialBox could not find any active regions for the '
                        'pool with machine name %s.' % pool.machine_name)
     return ret
 
 
+def _get_first_active_region(pool, refs):
+    '''
+    Fetches the first region in the list of region references that is
+    still active.
+    '''
+    for model, pk in refs:
+        ret = model.objects.filter(pk=pk, active=True).first()
+        if ret:
+            ret.pool = pool
+            return ret
+    return None
+
+
+def get_region_refs(pool):
+    '''
+    Returns a list of (Region model, primary key) tuples for the active
+    regions of the pool, lowest order first.  Served from the metadata
+    cache when it is enabled.
+    '''
+    key = ('regions', pool.pk)
+    ret = pool_cache.get(key)
+    if ret is None:
+        ret = get_active_region_refs(pool)
+        pool_cache.set(key, ret)
+    return ret
+
+
+def get_pool(machine_name):
+    '''
+    Returns the active Pool with the supplied machine name or None if there
+    is no such Pool.  Served from the metadata cache when it is enabled.
+    '''
+    key = ('pool', machine_name)
+    ret = pool_cache.get(key)
+    if ret is None:
+        ret = Pool.objects.filter(machine_name=machine_name,
+                                  active=True).first()
+        if ret:
+            pool_cache.set(key, ret)
+    return ret
+
+
+def get_response_rule(pool, content_type):
+    '''
+    Returns the ResponseRule, with its rule, for the pool and renderer
+    format or None if the pool has no rule for the format.  When the
+    metadata cache is enabled the outcome of the lookup is cached, misses
+    included, so pools without response rules cost no query at all.
+    '''
+    key = (pool.pk, content_type)
+    rule_id = response_rule_cache.get(key)
+    if rule_id is False:
+        return None
+    queryset = ResponseRule.objects.select_related('rule')
+    if rule_id is None:
+        ret = queryset.filter(content_type=content_type, pool=pool).first()
+        response_rule_cache.set(key, ret.pk if ret else False)
+    else:
+        ret = queryset.filter(pk=rule_id).first()
+        if not ret:
+            response_rule_cache.invalidate()
+    return ret
+
+
+def get_gs1_configuration(pool):
+    '''
+    Returns the GS1Configuration of the pool or None.  Served from the
+    metadata cache when it is enabled, misses included.
+    '''
+    key = ('gs1', pool.pk)
+    ret = pool_cache.get(key)
+    if ret is None:
+        ret = GS1Configuration.objects.filter(pool=pool).first() or False
+        pool_cache.set(key, ret)
+    return ret or None
+
+
+def get_regions_by_pools(pools):
+    '''
+    Returns a dictionary of pool primary keys to the list of active
+    Regions of each pool, lowest order first.  Issues one query per
+    Region model regardless of the number of pools supplied.
+
+    :param pools: The pools to return regions for.
+    '''
+    ret = {pool.pk: [] for pool in pools}
+    for region in get_all_regions():
+        qs = region.objects.filter(pool__in=pools, active=True)
+        for instance in qs:
+            ret[instance.pool_id].append(instance)
+    for regions in ret.values():
+        regions.sort(key=lambda instance: instance.order)
+    return ret
+
+
 def get_generator(pool_machine_name):
-    try:
-        pool = Pool.objects.get(machine_name=pool_machine_name, active=True)
-    except Pool.DoesNotExist:
+    pool = get_pool(pool_machine_name)
+    if not pool:
         raise NotFound(
             _('SerialBox could not fine any active pools with the '
               'machine name of %s.' %
               pool_machine_name))
+    if pool_cache.enabled:
+        refs = get_region_refs(pool)
+        if not refs:
+            raise NotFound('SerialBox could not find any active regions for '
+                           'the pool with machine name %s.' %
+                           pool.machine_name)
+        return get_generator_by_region_model(refs[0][0])
     region = get_region(pool)
-    if not isinstance(region, SequentialRegion) and region:
-        ret = FlavorSaver.get_generator_by_region(region)
-    else:
-        from serialbox.generators.sequential import SequentialGenerator
-        ret = SequentialGenerator()
-    return ret
+    return get_generator_by_region(region)
+
+
+def get_generator_by_region(region):
+    '''
+    Returns a Generator instance that can generate numbers for the
+    supplied Region.
+    '''
+    return get_generator_by_region_model(region.__class__)
+
+
+def get_generator_by_region_model(region_model):
+    '''
+    Returns a Generator instance that can generate numbers for Regions of
+    the supplied Region model.
+    '''
+    for model, generator in GENERATORS.items():
+        if issubclass(region_model, model):
+            return registry.get_class(generator)()
+    return FlavorSaver.get_generator_by_region_model(region_model)
+
+
+def update_region_names(sender, instance, **kwargs):
+    '''
+    Signal receiver that keeps the region name registry current when a
+    Region is saved.  Renamed regions leave a stale entry behind under the
+    old name, which misses and is discarded on its next lookup.
+    '''
+    region_names.add(instance)
+
+
+def discard_region_name(sender, instance, **kwargs):
+    '''
+    Signal receiver that drops a deleted Region from the region name
+    registry.
+    '''
+    region_names.discard(instance.machine_name)
+
+
+def invalidate_response_rule_cache(sender, **kwargs):
+    '''
+    Signal receiver that drops the cached response rule lookups when a
+    ResponseRule, or a Pool or Rule it may refer to, changes.
+    '''
+    response_rule_cache.invalidate()
+
+
+def invalidate_pool_cache(sender, **kwargs):
+    '''
+    Signal receiver that drops the cached pool and region metadata when a
+    Pool, Region or GS1Configuration is saved or deleted.
+    '''
+    pool_cache.invalidate()
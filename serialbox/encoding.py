@@ -0,0 +1,135 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from numbers import Integral
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+#: The number base of each Response encoding.
+BASES = {
+    'decimal': 10,
+    'hex': 16,
+    'base-36': 36,
+}
+
+#: Lists shorter than this are converted in python, numpy's setup cost is
+#: not worth it for a handful of numbers.
+VECTOR_THRESHOLD = 64
+
+if numpy is not None:
+    _DIGIT_BYTES = numpy.frombuffer(DIGITS.encode('ascii'), dtype=numpy.uint8)
+
+
+def is_plain(encoding, width=None):
+    '''
+    Returns True if numbers in the encoding are just their decimal string.
+    '''
+    return encoding in (None, 'decimal') and not width
+
+
+def encode(number, encoding='decimal', width=None):
+    '''
+    Returns the number as text in the encoding, left padded with zeros to
+    at least `width` characters.  Numbers that need more characters than
+    `width` are never truncated.  Raises a ValueError if the number is not
+    an integer.
+    '''
+    if not isinstance(number, Integral) or isinstance(number, bool):
+        raise ValueError('%r is not an integer.' % (number,))
+    base = BASES[encoding]
+    if base == 10:
+        ret = str(number)
+    elif base == 16:
+        ret = format(number, 'X')
+    else:
+        if number < 0:
+            return '-' + encode(-number, encoding, width)
+        digits = []
+        while True:
+            number, digit = divmod(number, base)
+            digits.append(DIGITS[digit])
+            if not number:
+                break
+        ret = ''.join(reversed(digits))
+    return ret.zfill(width) if width else ret
+
+
+def encode_many(numbers, encoding='decimal', width=None):
+    '''
+    Returns a list with each of the numbers encoded as by `encode`.  Large
+    lists of non-negative 64 bit integers are converted with vectorised
+    numpy arithmetic when numpy is installed.  Raises a ValueError if any
+    of the numbers is not an integer, numeric strings are not converted.
+    '''
+    if numpy is not None and len(numbers) >= VECTOR_THRESHOLD:
+        # no dtype, numpy would parse strings and truncate floats; anything
+        # but a flat integer array is left to encode to check
+        values = numpy.asarray(numbers)
+        if values.ndim == 1 and values.dtype.kind in 'iu' and \
+                values.min() >= 0:
+            return _encode_vector(values, BASES[encoding], width)
+    return [encode(number, encoding, width) for number in numbers]
+
+
+def _encode_vector(values, base, width):
+    '''
+    Writes every value into one (count, digits) byte matrix, one digit
+    column at a time, then slices the rows out of a single ascii string.
+    '''
+    largest = int(values.max())
+    digits = 1
+    while base ** digits <= largest:
+        digits += 1
+    columns = max(digits, width or 0)
+    matrix = numpy.empty((len(values), columns), dtype=numpy.uint8)
+    remaining = values.copy()
+    for column in range(columns - 1, -1, -1):
+        remaining, matrix[:, column] = numpy.divmod(remaining, base)
+    text = _DIGIT_BYTES[matrix].tobytes().decode('ascii')
+    ret = [text[i:i + columns] for i in range(0, len(text), columns)]
+    if width is None or digits > width:
+        # rows were padded to the widest number, strip back to `width`
+        minimum = width or 1
+        ret = [row.lstrip('0').zfill(minimum) for row in ret]
+    return ret
+
+
+def encode_number_list(number_list, encoding='decimal', width=None):
+    '''
+    Encodes the number list of a Response, including the nested
+    [first, last] ranges of spilled over sequential responses.
+    '''
+    if is_plain(encoding, width) or not number_list:
+        return number_list
+    if isinstance(number_list[0], (list, tuple)):
+        return [encode_many(numbers, encoding, width)
+                for numbers in number_list]
+    return encode_many(number_list, encoding, width)
+
+
+def decode(text, encoding='decimal'):
+    '''
+    Returns the integer value of an encoded number.  Padding zeros are
+    ignored.  Useful to verify a response against the region it came from.
+    '''
+    return int(text, BASES[encoding])
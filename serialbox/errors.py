@@ -32,3 +32,14 @@ class RegionBoundaryException(APIException):
                             'start and end values of another region within '
                             'the same pool. '
                             'Check your region configurations.')
+
+
+class GS1FormatException(APIException):
+    '''
+    Thrown when allocated numbers can not be formatted as the requested
+    GS1 identifier, for example a serial reference too long for the
+    pool's company prefix.
+    '''
+    status_code = HTTP_400_BAD_REQUEST
+    default_detail = _('The numbers could not be formatted as GS1 '
+                       'identifiers.')
@@ -1,13 +1,14 @@
 
 
 import six
-import importlib
 import logging
 
 from django.apps import AppConfig, apps
 
 from abc import ABCMeta, abstractproperty
 
+from serialbox.generators.registry import registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -69,21 +70,22 @@ class FlavorSaver(object):
 
     @classmethod
     def get_generator_by_region(cls, region):
+        return cls.get_generator_by_region_model(region.__class__)
+
+    @classmethod
+    def get_generator_by_region_model(cls, region_model):
         # get the region's app if it is not a native serialbox region
-        flavor_pack = cls.get_flavorpack_by_region(cls, region)
+        flavor_pack = cls.get_flavorpack_by_region(cls, region_model)
         # get the generator class name
         try:
-            qualname = region.__module__ + "." + region.__class__.__name__
+            qualname = region_model.__module__ + "." + region_model.__name__
             generator = flavor_pack.generators[qualname]
         except KeyError:
-            raise cls.GeneratorNotFoundError('The generator with name % '
+            raise cls.GeneratorNotFoundError('The generator with name %s '
                                              'could not be found.' % qualname)
         # instantiate the generator and return
         logger.debug('Attempting to instantiate an instance of %s', generator)
-        gen = generator.rsplit('.', 1)
-        mod = importlib.import_module(gen[0])
-        gencls = getattr(mod, gen[1])
-        return gencls()
+        return registry.get_class(generator)()
 
     @classmethod
     def get_api_urls(cls):
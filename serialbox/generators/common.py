@@ -21,10 +21,12 @@ from abc import ABCMeta, abstractmethod
 
 from django.db.models import Q
 
+from serialbox import audit, timing
 from serialbox.generators import logger, errors
-from serialbox.rules import get_preprocessing_rules, get_postprocessing_rules
+from serialbox.generators.registry import registry
 from serialbox.models import Pool, SequentialRegion, Response
-from serialbox.discovery import get_region
+from serialbox.discovery import get_region, get_pool
+from serialbox.utils import get_region_by_machine_name
 
 
 @six.add_metaclass(ABCMeta)
@@ -33,28 +35,54 @@ class Generator(object):
     Base class for all pool generators.
     '''
 
-    def get_response(self, request, size, pool, region=None):
+    def get_response(self, request, size, pool, region=None,
+                     encoding='decimal', width=None):
         '''
         First gets a Pool reference, then determines the proper region to
         use.  After that initial logic is complete, the generate function
         will be executed.  Will raise a Pool or Region DoesNotExist exception
-        if the requested Pool/Region can not be found.
-        '''
-        self.pool = self._get_pool(request, pool)
-        if region:
-            region = self._get_region(self.pool, region)
-        else:
-            region = get_region(self.pool)
+        if the requested Pool/Region can not be found.  The numbers of the
+        response are returned in the `encoding`, zero padded to `width`.
+        '''
+        with timing.stage(request, 'pool'):
+            self.pool = self._get_pool(request, pool)
+        timing.set_pool(request, self.pool.machine_name)
+        with timing.stage(request, 'region'):
+            if region:
+                region = self._get_region(self.pool, region)
+            else:
+                region = get_region(self.pool)
+        return self.allocate(request, size, self.pool, region, encoding,
+                             width)
+
+    def allocate(self, request, size, pool, region, encoding='decimal',
+                 width=None):
+        '''
+        Executes the pre-processing rules, generate function and
+        post-processing rules against a Pool and Region that have already
+        been looked up and returns the Response.
+        '''
+        self.pool = pool
         logger.debug('Using region %s', region)
         response = Response(region=str(region.machine_name),
-                            pool=str(region.pool.machine_name),
+                            pool=str(pool.machine_name),
                             size_granted=size, fulfilled=True,
-                            remote_host=request.get_host())
-        self._execute_pre_processing_rules(request, size, self.pool, region)
-        self.generate(request, response, region, size)
-        self._execute_post_processing_rules(request, response,
-                                            size, self.pool, region)
-        region.save()
+                            remote_host=request.get_host(),
+                            encoding=encoding)
+        response.width = width
+        timing.set_pool(request, pool.machine_name)
+        with timing.stage(request, 'preprocessing'):
+            self._execute_pre_processing_rules(request, size, pool, region)
+        with timing.stage(request, 'generate'):
+            self.generate(request, response, region, size)
+        with timing.stage(request, 'postprocessing'):
+            self._execute_post_processing_rules(request, response,
+                                                size, pool, region)
+        with timing.stage(request, 'save_region'):
+            self.save_region(region)
+        with timing.stage(request, 'audit'):
+            audit.recorder.record(response)
+        timing.flush(request)
         return response
 
     @abstractmethod
@@ -64,14 +92,18 @@ class Generator(object):
         '''
         raise NotImplementedError()
 
+    def save_region(self, region):
+        '''
+        Persists the region state after generation.  Override this if the
+        generate function writes the region state itself.
+        '''
+        region.save()
+
     def __init__(self):
-        # load pre and post processing rules from the configuration file
-        self.preprocessing_rules = \
-            get_preprocessing_rules(self,
-                                    self.get_settings_module())
-        self.postprocessing_rules = \
-            get_postprocessing_rules(self,
-                                     self.get_settings_module())
+        # the pre and post processing rules from the configuration file are
+        # loaded once per generator class
+        self.preprocessing_rules, self.postprocessing_rules = \
+            registry.get_rules(self)
 
     def get_settings_module(self):
         '''
@@ -87,28 +119,27 @@ class Generator(object):
         Returns a pool instance based on the machine name or primary key
         of the pool.  Override to provide custom behavior.
         '''
-        try:
-            kwargs = {"pk": pool} if isinstance(pool, int) else \
-                {"machine_name": pool}
-            kwargs['active'] = True
-            pool = Pool.objects.get(**kwargs)
-            return pool
-        except Pool.DoesNotExist:
+        if isinstance(pool, int):
+            try:
+                return Pool.objects.get(pk=pool, active=True)
+            except Pool.DoesNotExist:
+                raise errors.PoolNotFoundException
+        pool = get_pool(pool)
+        if not pool:
             raise errors.PoolNotFoundException
+        return pool
 
     def _get_region(self, pool_instance, region_id):
         '''
-        Returns a Region instance from the supplied pool_instance.  Cascades
-        through the different types of regions in the following order:
-            *    SequentialRegion
-            *    RandomRegion
-            *    ListRegion
-        '''
-        try:
-            SequentialRegion.objects.get(machine_name=region_id)
-        except SequentialRegion.DoesNotExist:
-            # TODO: cascade to other types of regions when implemented
-            raise
+        Returns the active Region instance with the supplied machine name
+        from the supplied pool_instance.  Any type of region, including
+        flavor pack regions, may be returned.
+        '''
+        region = get_region_by_machine_name(region_id)
+        if not region or region.pool_id != pool_instance.pk or \
+                not region.active:
+            raise errors.RegionNotFoundException()
+        return region
 
     def _determine_sequential_region(self, pool, size):
         '''
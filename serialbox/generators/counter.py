@@ -0,0 +1,100 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import logging
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from serialbox import capacity
+from serialbox.discovery import pool_cache
+from serialbox.generators import common, errors
+
+logger = logging.getLogger(__name__)
+
+
+class CounterGenerator(common.Generator):
+    '''
+    Base class for generators of regions that keep a `current` counter of
+    the positions they have issued and a `remaining` count, such as
+    RandomizedRegion and ListRegion.  Subclasses set `region_model` and
+    turn the positions returned by `_reserve` into numbers.
+    '''
+    region_model = None
+
+    def save_region(self, region):
+        '''
+        The counter was already written by the reservation.
+        '''
+        pass
+
+    def _reserve(self, response, region, size):
+        '''
+        Reserves `size` positions of the region's counter, or whatever is
+        left of the region if it can not cover the request.
+        :return: A tuple of the first position and the number granted.
+        '''
+        with transaction.atomic():
+            updated = self.region_model.objects.filter(
+                pk=region.pk,
+                active=True,
+                remaining__gte=size
+            ).update(current=F('current') + size,
+                     remaining=F('remaining') - size,
+                     modified_date=timezone.now())
+            if updated:
+                current, remaining = self.region_model.objects.values_list(
+                    'current', 'remaining').get(pk=region.pk)
+                region.current, region.remaining = current, remaining
+                capacity.adjust(region.pool_id, -size)
+                if not remaining:
+                    self._deactivate(region)
+                return current - size, size
+            return self._reserve_locked(response, region, size)
+
+    def _reserve_locked(self, response, region, size):
+        '''
+        Grants the rest of a region that can not fill the whole request.
+        '''
+        queryset = self.region_model.objects.filter(pk=region.pk)
+        if connection.features.has_select_for_update:
+            locked = queryset.select_for_update().get()
+        else:
+            queryset.update(current=F('current'))
+            locked = queryset.get()
+        if not locked.active or locked.remaining <= 0:
+            raise errors.NoRegionException()
+        if size > locked.remaining:
+            size = locked.remaining
+            response.fulfilled = False
+            response.size_granted = size
+        first = locked.current
+        region.current = first + size
+        region.remaining = locked.remaining - size
+        queryset.update(current=region.current, remaining=region.remaining,
+                        modified_date=timezone.now())
+        capacity.adjust(region.pool_id, -size)
+        if not region.remaining:
+            self._deactivate(region)
+        return first, size
+
+    def _deactivate(self, region):
+        region.active = False
+        self.region_model.objects.filter(pk=region.pk).update(active=False)
+        pool_cache.invalidate()
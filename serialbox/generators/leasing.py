@@ -0,0 +1,236 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from serialbox import capacity, serialbox_settings as settings
+from serialbox.models import SequentialRegion, SkippedRange
+
+logger = logging.getLogger(__name__)
+
+
+class Lease(object):
+    '''
+    A block of numbers reserved from a SequentialRegion that is handed
+    out from memory by a single worker process.
+    '''
+
+    def __init__(self, region, first, last, expires):
+        self.region_id = region.pk
+        self.region = region.machine_name
+        self.pool_id = region.pool_id
+        self.pool = region.pool.machine_name if region.pool else ''
+        self.next = first
+        self.last = last
+        self.expires = expires
+
+    @property
+    def remaining(self):
+        return self.last - self.next + 1
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def take(self, size):
+        '''
+        Returns the first number of the next `size` numbers in the lease.
+        '''
+        first = self.next
+        self.next += size
+        return first
+
+
+class LeaseManager(object):
+    '''
+    Keeps one lease per SequentialRegion for the current process.  Leases
+    are reserved with the same conditional UPDATE the SequentialGenerator
+    uses so they never overlap with other workers or direct reservations.
+    Unused lease numbers are given back to the region when nothing has
+    been reserved after them, otherwise they are recorded as a
+    SkippedRange.
+    '''
+
+    def __init__(self):
+        self._leases = {}
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._local = threading.local()
+
+    @contextmanager
+    def suspend(self):
+        '''
+        Disables leasing for the current thread.  Use this around
+        allocations made inside a transaction that may be rolled back,
+        since a lease reserved in that transaction would outlive it.
+        '''
+        self._local.suspended = True
+        try:
+            yield
+        finally:
+            self._local.suspended = False
+
+    def allocate(self, region, size):
+        '''
+        Returns the first number of a range of `size` numbers served from
+        the lease for the region, or None if the request should be
+        reserved from the region directly (the request is as large as a
+        lease, the region does not have a full lease left or leasing has
+        been suspended).
+        '''
+        lease_size = settings.SEQUENTIAL_LEASE_SIZE
+        if size >= lease_size or getattr(self._local, 'suspended', False):
+            return None
+        with self._lock:
+            self._check_pid()
+            lease = self._leases.get(region.pk)
+            if lease and lease.expired:
+                self._release(lease, 'expired')
+                lease = None
+            if lease and lease.remaining < size:
+                if not self._extend(lease, lease_size):
+                    self._release(lease, 'replaced')
+                    lease = None
+            if not lease:
+                lease = self._acquire(region, lease_size)
+                if not lease:
+                    return None
+            return lease.take(size)
+
+    def get_unserved(self, pool_id):
+        '''
+        Returns the number of leased numbers this process has not served
+        yet from the regions of the pool.  They are no longer counted in
+        the pool's remaining counter but can still be allocated here.
+        '''
+        with self._lock:
+            self._check_pid()
+            return sum(max(lease.remaining, 0)
+                       for lease in self._leases.values()
+                       if lease.pool_id == pool_id)
+
+    def release_all(self, reason='shutdown'):
+        '''
+        Gives back or records every lease held by this process.  Called at
+        interpreter exit so graceful worker shutdowns do not lose numbers
+        silently.
+        '''
+        with self._lock:
+            self._check_pid()
+            for lease in list(self._leases.values()):
+                try:
+                    self._release(lease, reason)
+                except Exception:
+                    logger.exception('Could not release the lease for '
+                                     'region %s.', lease.region)
+
+    def _acquire(self, region, lease_size):
+        '''
+        Reserves a new lease.  At least one number is always left in the
+        region so leasing never deactivates it; the tail of a region is
+        reserved directly by the generator.
+        '''
+        with transaction.atomic():
+            updated = SequentialRegion.objects.filter(
+                pk=region.pk,
+                active=True,
+                state__lte=F('end') - lease_size
+            ).update(state=F('state') + lease_size,
+                     modified_date=timezone.now())
+            if not updated:
+                return None
+            state = SequentialRegion.objects.values_list(
+                'state', flat=True).get(pk=region.pk)
+            capacity.adjust(region.pool_id, -lease_size)
+        lease = Lease(region, state - lease_size, state - 1,
+                      time.monotonic() + settings.SEQUENTIAL_LEASE_EXPIRY)
+        self._leases[region.pk] = lease
+        logger.debug('Leased %s to %s from region %s.', lease.next,
+                     lease.last, lease.region)
+        return lease
+
+    def _extend(self, lease, lease_size):
+        '''
+        Grows the lease in place if nothing has been reserved from the
+        region since the lease was taken.
+        '''
+        with transaction.atomic():
+            updated = SequentialRegion.objects.filter(
+                pk=lease.region_id,
+                active=True,
+                state=lease.last + 1,
+                state__lte=F('end') - lease_size
+            ).update(state=F('state') + lease_size,
+                     modified_date=timezone.now())
+            if updated:
+                capacity.adjust(lease.pool_id, -lease_size)
+        if updated:
+            lease.last += lease_size
+            lease.expires = time.monotonic() + \
+                settings.SEQUENTIAL_LEASE_EXPIRY
+        return bool(updated)
+
+    def _release(self, lease, reason):
+        '''
+        Gives the unused numbers back to the region if the lease is still
+        at the head of the region, otherwise records them as skipped.
+        '''
+        self._leases.pop(lease.region_id, None)
+        if lease.remaining <= 0:
+            return
+        with transaction.atomic():
+            returned = SequentialRegion.objects.filter(
+                pk=lease.region_id,
+                active=True,
+                state=lease.last + 1
+            ).update(state=lease.next, modified_date=timezone.now())
+            if returned:
+                capacity.adjust(lease.pool_id, lease.remaining)
+        if returned:
+            logger.debug('Returned %s to %s to region %s.', lease.next,
+                         lease.last, lease.region)
+        else:
+            logger.info('Skipping %s to %s in region %s (%s).', lease.next,
+                        lease.last, lease.region, reason)
+            SkippedRange.objects.create(pool=lease.pool,
+                                        region=lease.region,
+                                        first=lease.next,
+                                        last=lease.last,
+                                        reason=reason)
+
+    def _check_pid(self):
+        '''
+        Leases taken before a fork belong to the parent process; the child
+        forgets them so the same numbers are never served twice.
+        '''
+        if self._pid != os.getpid():
+            self._leases = {}
+            self._pid = os.getpid()
+
+
+leases = LeaseManager()
+atexit.register(leases.release_all)
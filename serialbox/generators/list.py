@@ -0,0 +1,50 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import logging
+
+from serialbox.generators.counter import CounterGenerator
+from serialbox.listfiles import get_list_file
+from serialbox.models import ListRegion
+
+logger = logging.getLogger(__name__)
+
+
+class ListGenerator(CounterGenerator):
+    '''
+    Generates list responses from a ListRegion.  Each request reserves the
+    next `size` records of the region's list file by advancing the
+    region's `current` counter with a single conditional UPDATE and reads
+    them straight out of the memory-mapped file.
+    '''
+    region_model = ListRegion
+
+    def generate(self, request, response, region, size):
+        '''
+        Adds a number_list with the next `size` numbers of the region's
+        list file to the response.  List numbers are returned exactly as
+        they were imported, so the encoding options of the request do not
+        apply.
+        '''
+        logger.debug('Processing list request.')
+        response.type = 'list'
+        response.encoding = 'decimal'
+        response.width = None
+        first, size = self._reserve(response, region, size)
+        number_list = get_list_file(region.file_path).read(first, size)
+        self.set_number_list(response, number_list)
@@ -0,0 +1,58 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import logging
+from functools import lru_cache
+
+from serialbox.generators.counter import CounterGenerator
+from serialbox.generators.feistel import FeistelPermutation
+from serialbox.models import RandomizedRegion
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=128)
+def get_permutation(size, key):
+    '''
+    Returns the permutation of a region, built once per region per process.
+    '''
+    return FeistelPermutation(size, key)
+
+
+class RandomizedGenerator(CounterGenerator):
+    '''
+    Generates random responses from a RandomizedRegion.  Each request
+    reserves the next `size` positions of the region's `current` counter
+    with a single conditional UPDATE and maps them through the region's
+    keyed Feistel permutation, so no number is issued twice and issued
+    numbers are never stored.
+    '''
+    region_model = RandomizedRegion
+
+    def generate(self, request, response, region, size):
+        '''
+        Adds a number_list with `size` unique numbers from the region to
+        the response.
+        '''
+        logger.debug('Processing randomized request.')
+        response.type = 'random'
+        first, size = self._reserve(response, region, size)
+        permutation = get_permutation(region.size, region.start)
+        number_list = [region.min + value for value in
+                       permutation.permute_many(first, size)]
+        self.set_number_list(response, number_list)
@@ -0,0 +1,107 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import importlib
+import threading
+
+from serialbox import serialbox_settings
+from serialbox.generators import logger
+from serialbox.rules import get_preprocessing_rules, get_postprocessing_rules
+
+#: The serialbox settings that, when changed, require the registry to be
+#: reloaded.
+RULE_SETTINGS = (
+    'GENERATOR_PREPROCESSING_RULES',
+    'GENERATOR_POSTPROCESSING_RULES',
+)
+
+
+class GeneratorRegistry(object):
+    '''
+    Resolves generator classes and their pre and post-processing rule
+    chains once per process.  Generators are still instantiated per
+    request since they hold per-request state, but creating one no longer
+    imports or instantiates any rules.
+    '''
+
+    def __init__(self):
+        self._classes = {}
+        self._rules = {}
+        self._lock = threading.Lock()
+
+    def get_class(self, path):
+        '''
+        Returns the generator class for the full dotted class name.
+        '''
+        try:
+            return self._classes[path]
+        except KeyError:
+            module_name, class_name = path.rsplit('.', 1)
+            cls = getattr(importlib.import_module(module_name), class_name)
+            with self._lock:
+                self._classes[path] = cls
+            return cls
+
+    def get_rules(self, generator):
+        '''
+        Returns a tuple of the pre and post-processing rule lists for the
+        class of the supplied generator instance.
+        '''
+        cls = generator.__class__
+        try:
+            rules = self._rules[cls]
+        except KeyError:
+            logger.debug('Loading the processing rules for %s.', cls)
+            settings_module = generator.get_settings_module()
+            rules = (
+                tuple(get_preprocessing_rules(generator, settings_module)),
+                tuple(get_postprocessing_rules(generator, settings_module))
+            )
+            with self._lock:
+                self._rules[cls] = rules
+        return list(rules[0]), list(rules[1])
+
+    def reload(self):
+        '''
+        Forgets every resolved class and rule chain so that they are loaded
+        again from the current settings.
+        '''
+        with self._lock:
+            self._classes = {}
+            self._rules = {}
+
+
+registry = GeneratorRegistry()
+
+# the values to fall back to when a rule setting is removed from the Django
+# settings, since serialbox_settings only applies its defaults on import
+_default_settings = {
+    setting: getattr(serialbox_settings, setting) for setting in RULE_SETTINGS
+}
+
+
+def reload_settings(setting, value, **kwargs):
+    '''
+    Receiver for Django's setting_changed signal (sent by override_settings
+    in tests) that refreshes the rule settings and reloads the registry.
+    '''
+    if setting in RULE_SETTINGS:
+        if value is None:
+            value = _default_settings[setting]
+        setattr(serialbox_settings, setting, value)
+        registry.reload()
@@ -17,8 +17,16 @@
     along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
 '''
 import logging
+import itertools
 
-from serialbox.generators import common
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from serialbox import capacity, serialbox_settings as settings
+from serialbox.discovery import pool_cache
+from serialbox.generators import common, errors, leasing
+from serialbox.models import SequentialRegion
 
 logger = logging.getLogger(__name__)
 
@@ -29,37 +37,171 @@ class SequentialGenerator(common.Generator):
     number pool responses that contain a first, last and fulfilled flag
     which indicates whether or not the supplied region was able to fulfill
     the original request.
+
+    Region state is never incremented in python and written back; the
+    range is reserved in the database so that concurrent workers can not
+    be handed overlapping ranges.  See the SEQUENTIAL_ALLOCATION_MODE
+    setting.
     '''
 
     def generate(self, request, response, region, size):
         '''
         Generates an Response model instance and add the number_list
         attribute which contains a list with the first and last number.
+        If the SEQUENTIAL_SPILLOVER setting is on and the request was
+        filled from more than one region, the number_list is a list of
+        [first, last] ranges instead.
         :param request: The inbound HTTP Request
         :param region: The region to use
         :param size: The size of the request
         '''
         logger.debug('Processing sequential request.')
         response.type = 'sequential'
-        size = self._enforce_boundaries(response, size, region)
-        number_list = [region.state]
-        if size > 1:
-            number_list.append(region.state + (size - 1))
-        region.state = region.state + size
+        first = None
+        if settings.SEQUENTIAL_ALLOCATION_MODE == 'lease':
+            first = leasing.leases.allocate(region, size)
+        if first is not None:
+            ranges = [(first, size)]
+        elif settings.SEQUENTIAL_SPILLOVER:
+            with transaction.atomic():
+                ranges = self._reserve_ranges(response, region, size)
+        else:
+            ranges = [self._reserve_from(response, region, size)]
+        if len(ranges) > 1:
+            number_list = [[first, first + (granted - 1)]
+                           for first, granted in ranges]
+        else:
+            first, size = ranges[0]
+            number_list = [first]
+            if size > 1:
+                number_list.append(first + (size - 1))
         logger.debug('Number list: %s', number_list)
         self.set_number_list(response, number_list)
 
-    def _enforce_boundaries(self, response, size, region):
+    def save_region(self, region):
+        '''
+        The state (and active flag) of the region was already written by
+        the reservation, saving the in-memory instance could overwrite a
+        concurrent reservation with a stale state.
+        '''
+        pass
+
+    def _reserve_from(self, response, region, size):
+        '''
+        Reserves a range from the region using the configured
+        SEQUENTIAL_ALLOCATION_MODE.
+        :return: A tuple of the first number and the size granted.
+        '''
+        if settings.SEQUENTIAL_ALLOCATION_MODE == 'select_for_update':
+            return self._reserve_locked(response, region, size)
+        return self._reserve(response, region, size)
+
+    def _reserve_ranges(self, response, region, size):
+        '''
+        Reserves from the region and, if it runs out, keeps reserving from
+        the next active sequential regions of the pool in order until the
+        request is filled.  Must be called inside a transaction so the
+        ranges are granted together or not at all.
+        :return: A list of tuples of the first number and the size granted.
+        '''
+        ranges = []
+        remaining = size
+        following = SequentialRegion.objects.filter(
+            pool_id=region.pool_id,
+            active=True,
+            order__gt=region.order
+        ).order_by('order')
+        # the queryset is only evaluated if the first region runs out
+        for current in itertools.chain([region], following):
+            try:
+                first, granted = self._reserve_from(response, current,
+                                                    remaining)
+            except errors.NoRegionException:
+                # exhausted by another request since it was looked up
+                continue
+            ranges.append((first, granted))
+            remaining -= granted
+            if not remaining:
+                break
+        if not ranges:
+            raise errors.NoRegionException()
+        response.size_granted = size - remaining
+        response.fulfilled = not remaining
+        return ranges
+
+    def _reserve(self, response, region, size):
+        '''
+        Reserves the range with a single conditional
+        ``UPDATE ... SET state = state + size WHERE state + size <= end + 1``.
+        The row stays locked until the transaction commits so the new state
+        can be read back safely.  If the region can not cover the full
+        request the locking reservation is used to grant the remainder.
+        :return: A tuple of the first number and the size granted.
+        '''
+        with transaction.atomic():
+            updated = SequentialRegion.objects.filter(
+                pk=region.pk,
+                active=True,
+                state__lte=F('end') + 1 - size
+            ).update(state=F('state') + size, modified_date=timezone.now())
+            if updated:
+                state, end = SequentialRegion.objects.values_list(
+                    'state', 'end').get(pk=region.pk)
+                region.state = state
+                capacity.adjust(region.pool_id, -size)
+                if state > end:
+                    self._deactivate(region)
+                return state - size, size
+        logger.debug('Region %s can not cover a request of %s, falling '
+                     'back to a locked reservation.', region, size)
+        return self._reserve_locked(response, region, size)
+
+    def _reserve_locked(self, response, region, size):
+        '''
+        Reserves the range by locking the region row with
+        ``SELECT ... FOR UPDATE`` and granting whatever is left in the
+        region if it can not fulfill the entire request.
+        :return: A tuple of the first number and the size granted.
+        '''
+        with transaction.atomic():
+            locked = self._lock_region(region)
+            remaining = locked.end - locked.state + 1
+            if not locked.active or remaining <= 0:
+                raise errors.NoRegionException()
+            if size >= remaining:
+                logger.debug('Size exceeded remaining count.')
+                response.fulfilled = (size == remaining)
+                size = remaining
+                response.size_granted = size
+                region.active = False
+            first = locked.state
+            region.state = first + size
+            SequentialRegion.objects.filter(pk=region.pk).update(
+                state=region.state,
+                active=region.active,
+                modified_date=timezone.now())
+            capacity.adjust(region.pool_id, -size)
+        if not region.active:
+            pool_cache.invalidate()
+        return first, size
+
+    def _lock_region(self, region):
+        '''
+        Returns a fresh copy of the region with its row locked for the rest
+        of the transaction.  Backends without ``SELECT ... FOR UPDATE``
+        (SQLite) take the write lock with a no-op update instead, otherwise
+        two readers would deadlock when both try to write.
+        '''
+        queryset = SequentialRegion.objects.filter(pk=region.pk)
+        if connection.features.has_select_for_update:
+            return queryset.select_for_update().get()
+        queryset.update(state=F('state'))
+        return queryset.get()
+
+    def _deactivate(self, region):
         '''
-        Makes sure the count does not exceed the amount remaining.
+        Marks an exhausted region as inactive.
         '''
-        remaining_count = region.end - region.state
-        logger.debug('Remaining count for region %s = %s', region,
-                     remaining_count)
-        if size >= remaining_count:
-            logger.debug('Size exceeded remaining count.')
-            region.active = False
-            response.fulfilled = (size == remaining_count)
-            size = remaining_count + 1
-            response.size_granted = size
-        return size
+        region.active = False
+        SequentialRegion.objects.filter(pk=region.pk).update(active=False)
+        pool_cache.invalidate()
@@ -0,0 +1,178 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from django.utils.translation import gettext as _
+
+from serialbox.encoding import DIGITS, encode_many, is_plain
+from serialbox.errors import GS1FormatException
+
+#: The GS1 output formats of the allocate API.
+FORMATS = ('sgtin-urn', 'sgtin-element', 'sscc', 'sscc-urn')
+
+#: Formats that use the indicator and item reference of the pool.
+SGTIN_FORMATS = ('sgtin-urn', 'sgtin-element')
+
+if numpy is not None:
+    _DIGIT_BYTES = numpy.frombuffer(DIGITS.encode('ascii'), dtype=numpy.uint8)
+
+
+def check_digit(digits):
+    '''
+    Returns the GS1 mod 10 check digit of a string of digits.  Weights of
+    3 and 1 alternate from the rightmost digit.
+    '''
+    return (10 - _weighted_sum(digits) % 10) % 10
+
+
+def _weighted_sum(digits, offset=0):
+    '''
+    The check digit sum of the digits when the rightmost of them is
+    `offset` positions left of the end of the number.
+    '''
+    return sum(int(digit) * (3 if (position + offset) % 2 == 0 else 1)
+               for position, digit in enumerate(reversed(digits)))
+
+
+class GS1Formatter(object):
+    '''
+    Formats serial numbers as the GS1 identifiers of a pool's
+    GS1Configuration.  The constant part of each identifier, and its share
+    of the check digit, is computed once; the serial part of a batch is
+    computed with vectorised numpy arithmetic when numpy is installed.
+    '''
+
+    def __init__(self, configuration, gs1_format):
+        self.gs1_format = gs1_format
+        prefix = configuration.company_prefix
+        if gs1_format in SGTIN_FORMATS:
+            body = (configuration.indicator + prefix +
+                    configuration.item_reference)
+            gtin = body + str(check_digit(body))
+            if gs1_format == 'sgtin-urn':
+                self.prefix = 'urn:epc:id:sgtin:%s.%s%s.' % (
+                    prefix, configuration.indicator,
+                    configuration.item_reference)
+            else:
+                self.prefix = '(01)%s(21)' % gtin
+        else:
+            # the serial reference fills the SSCC up to 17 digits
+            self.reference_width = 16 - len(prefix)
+            if gs1_format == 'sscc':
+                self.prefix = configuration.extension_digit + prefix
+                self.prefix_sum = _weighted_sum(self.prefix,
+                                                self.reference_width)
+            else:
+                self.prefix = 'urn:epc:id:sscc:%s.%s' % (
+                    prefix, configuration.extension_digit)
+
+    def format_many(self, numbers, encoding='decimal', width=None):
+        '''
+        Returns a list with the identifier of each of the numbers.  SGTIN
+        serial numbers are written in the encoding, SSCC serial references
+        are always zero padded decimal numbers.
+        '''
+        if self.gs1_format in SGTIN_FORMATS:
+            if is_plain(encoding, width):
+                serials = [str(number) for number in numbers]
+            else:
+                serials = encode_many(numbers, encoding, width)
+            prefix = self.prefix
+            return [prefix + serial for serial in serials]
+        if numpy is not None and len(numbers):
+            return self._format_sscc_vector(numbers)
+        return [self._format_sscc(number) for number in numbers]
+
+    def format_number_list(self, response):
+        '''
+        Returns the identifiers of every number in the response.  The
+        ranges of sequential responses are expanded.
+        '''
+        numbers = response.number_list
+        if response.type != 'sequential':
+            return self.format_many(numbers, response.encoding,
+                                    response.width)
+        ranges = numbers if numbers and isinstance(
+            numbers[0], (list, tuple)) else [numbers]
+        ret = []
+        for number_range in ranges:
+            if numpy is not None and self.gs1_format not in SGTIN_FORMATS:
+                values = numpy.arange(number_range[0], number_range[-1] + 1,
+                                      dtype=numpy.int64)
+            else:
+                values = range(number_range[0], number_range[-1] + 1)
+            ret += self.format_many(values, response.encoding,
+                                    response.width)
+        return ret
+
+    def _format_sscc(self, number):
+        try:
+            reference = self._check_reference(int(number))
+        except (TypeError, ValueError):
+            raise self._error(number)
+        reference = str(reference).zfill(self.reference_width)
+        if self.gs1_format == 'sscc-urn':
+            return self.prefix + reference
+        return '%s%s%s' % (self.prefix, reference,
+                           check_digit(self.prefix + reference))
+
+    def _format_sscc_vector(self, numbers):
+        '''
+        Writes the digits of every serial reference, and the check digit,
+        into one (count, digits) byte matrix and slices the rows out of a
+        single ascii string.
+        '''
+        try:
+            values = numpy.asarray(numbers, dtype=numpy.int64)
+        except (OverflowError, TypeError, ValueError):
+            raise self._error(numbers)
+        self._check_reference(int(values.min()))
+        self._check_reference(int(values.max()))
+        width = self.reference_width
+        sscc = self.gs1_format == 'sscc'
+        columns = width + 1 if sscc else width
+        matrix = numpy.empty((len(values), columns), dtype=numpy.uint8)
+        total = numpy.full(len(values), getattr(self, 'prefix_sum', 0),
+                           dtype=numpy.int64)
+        remaining = values.copy()
+        for position in range(width):
+            remaining, digits = numpy.divmod(remaining, 10)
+            matrix[:, width - 1 - position] = digits
+            if sscc:
+                total += digits * (3 if position % 2 == 0 else 1)
+        if sscc:
+            matrix[:, width] = (10 - total % 10) % 10
+        text = _DIGIT_BYTES[matrix].tobytes().decode('ascii')
+        prefix = self.prefix
+        return [prefix + text[i:i + columns]
+                for i in range(0, len(text), columns)]
+
+    def _check_reference(self, reference):
+        if not 0 <= reference < 10 ** self.reference_width:
+            raise self._error(reference)
+        return reference
+
+    def _error(self, number):
+        return GS1FormatException(
+            _('%s can not be used as the serial reference of an SSCC with '
+              'a %s digit company prefix.') % (
+                number, 16 - self.reference_width))
@@ -0,0 +1,168 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from serialbox import serialbox_settings as settings
+
+#: The header of a list file: a magic string, the record width and the
+#: number of records, padded to 32 bytes.
+HEADER = struct.Struct('<8sIQ12x')
+MAGIC = b'SBLIST01'
+
+#: The number of records written to a list file at a time.
+WRITE_CHUNK_SIZE = 10000
+
+
+class ListFileError(ValueError):
+    '''
+    Raised for list files that are damaged and values that can not be
+    stored in a list file.
+    '''
+    pass
+
+
+def get_path(path):
+    '''
+    Resolves a list file path against the LIST_REGION_ROOT setting.
+    '''
+    return os.path.join(settings.LIST_REGION_ROOT or '', path)
+
+
+def write_list_file(path, values, width):
+    '''
+    Writes the values to a list file with fixed-width records of `width`
+    bytes.  The values are written as they are consumed, so `values` may
+    be a generator over a file of any size.  The file is written next to
+    `path` and moved into place once complete.
+    :return: The number of records written.
+    '''
+    if width < 1:
+        raise ListFileError('The record width must be at least 1.')
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    count = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, width, 0))
+            chunk = []
+            for value in values:
+                chunk.append(_pack(value, width, count))
+                count += 1
+                if len(chunk) == WRITE_CHUNK_SIZE:
+                    f.write(b''.join(chunk))
+                    chunk = []
+            f.write(b''.join(chunk))
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, width, count))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def _pack(value, width, index):
+    try:
+        ret = value.encode('ascii')
+    except UnicodeEncodeError:
+        raise ListFileError('Record %s (%r) is not ASCII.' % (index, value))
+    if not ret or b'\x00' in ret or len(ret) > width:
+        raise ListFileError('Record %s (%r) must be between 1 and %s '
+                            'characters.' % (index, value, width))
+    return ret.ljust(width, b'\x00')
+
+
+class ListFile(object):
+    '''
+    A read only, memory-mapped list file.  Records are padded with NUL
+    bytes to the width of the file.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.signature = _signature(os.fstat(f.fileno()))
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ListFileError('%s is empty.' % path)
+        if len(self._mmap) < HEADER.size:
+            raise ListFileError('%s is not a list file.' % path)
+        magic, self.width, self.count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ListFileError('%s is not a list file.' % path)
+        if len(self._mmap) != HEADER.size + self.width * self.count:
+            raise ListFileError('%s is truncated.' % path)
+
+    def slice(self, first, size):
+        '''
+        Returns a memoryview of `size` records starting at record `first`
+        without copying them out of the map.
+        '''
+        if first < 0 or size < 0 or first + size > self.count:
+            raise IndexError('Records %s to %s are outside of %s.' % (
+                first, first + size - 1, self.path))
+        start = HEADER.size + first * self.width
+        return memoryview(self._mmap)[start:start + size * self.width]
+
+    def read(self, first, size):
+        '''
+        Returns `size` records starting at record `first` as strings.
+        '''
+        view = self.slice(first, size)
+        if numpy is not None:
+            # the S dtype drops the NUL padding of each record
+            return numpy.frombuffer(
+                view, dtype='S%d' % self.width).astype('U').tolist()
+        data = view.tobytes().decode('ascii')
+        width = self.width
+        return [data[i:i + width].rstrip('\x00')
+                for i in range(0, len(data), width)]
+
+
+def _signature(stat):
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+_files = {}
+_lock = threading.Lock()
+
+
+def get_list_file(path):
+    '''
+    Returns the ListFile at the path, resolved against LIST_REGION_ROOT.
+    Each file is mapped once per process and mapped again if it is
+    replaced on disk.
+    '''
+    path = get_path(path)
+    ret = _files.get(path)
+    if ret is not None and ret.signature == _signature(os.stat(path)):
+        return ret
+    ret = ListFile(path)
+    with _lock:
+        _files[path] = ret
+    return ret
@@ -0,0 +1,52 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2018 SerialLab Corp.  All rights reserved.
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+
+from serialbox.generators.registry import registry
+from serialbox.generators.sequential import SequentialGenerator
+
+
+class Command(BaseCommand):
+    help = _('Measures the per-request cost of creating a generator with '
+             'and without the generator registry.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10000,
+                            help=_('The number of generators to create.'))
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        def uncached():
+            registry.reload()
+            SequentialGenerator()
+
+        registry.reload()
+        SequentialGenerator()
+        cached = timeit.timeit(SequentialGenerator, number=iterations)
+        reloaded = timeit.timeit(uncached, number=iterations)
+        registry.reload()
+        self.stdout.write(
+            _('Without the registry: %.2f microseconds per generator.') %
+            (reloaded / iterations * 1e6))
+        self.stdout.write(
+            _('With the registry: %.2f microseconds per generator.') %
+            (cached / iterations * 1e6))
+        self.stdout.write(
+            _('Saved %.2f microseconds per request.') %
+            ((reloaded - cached) / iterations * 1e6))
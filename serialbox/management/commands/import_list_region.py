@@ -0,0 +1,106 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2018 SerialLab Corp.  All rights reserved.
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext as _
+
+from serialbox import listfiles
+from serialbox.models import ListRegion, Pool
+
+
+class Command(BaseCommand):
+    help = _('Streams the serial numbers in a column of a CSV file into a '
+             'list file and optionally creates a List Region for it.  The '
+             'CSV file is read row by row and never loaded into memory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file',
+                            help=_('The CSV file to import.'))
+        parser.add_argument('list_file',
+                            help=_('The list file to write.  Relative paths '
+                                   'are resolved against the '
+                                   'LIST_REGION_ROOT setting.'))
+        parser.add_argument('--column', type=int, default=0,
+                            help=_('The zero based index of the column '
+                                   'holding the serial numbers.'))
+        parser.add_argument('--skip-header', action='store_true',
+                            help=_('Skip the first row of the CSV file.'))
+        parser.add_argument('--delimiter', default=',',
+                            help=_('The CSV field delimiter.'))
+        parser.add_argument('--width', type=int,
+                            help=_('The record width of the list file.  '
+                                   'Defaults to the longest serial number, '
+                                   'which takes an extra pass over the CSV '
+                                   'file.'))
+        parser.add_argument('--pool',
+                            help=_('The machine name of the pool to create '
+                                   'a List Region in.'))
+        parser.add_argument('--machine-name',
+                            help=_('The machine name of the new region.'))
+        parser.add_argument('--readable-name',
+                            help=_('The name of the new region.  Defaults '
+                                   'to the machine name.'))
+
+    def handle(self, *args, **options):
+        pool = None
+        if options['pool']:
+            if not options['machine_name']:
+                raise CommandError(_('--machine-name is required with '
+                                     '--pool.'))
+            pool = Pool.objects.filter(machine_name=options['pool']).first()
+            if not pool:
+                raise CommandError(_('There is no pool with the machine '
+                                     'name %s.') % options['pool'])
+        width = options['width']
+        if width is None:
+            width = max((len(value) for value in self._values(options)),
+                        default=1)
+        path = listfiles.get_path(options['list_file'])
+        try:
+            count = listfiles.write_list_file(path, self._values(options),
+                                              width)
+        except listfiles.ListFileError as e:
+            raise CommandError(str(e))
+        self.stdout.write(_('Wrote %s serial numbers to %s.') % (count, path))
+        if pool:
+            region = ListRegion.objects.create(
+                pool=pool,
+                machine_name=options['machine_name'],
+                readable_name=(options['readable_name'] or
+                               options['machine_name']),
+                file_path=options['list_file'],
+                count=count)
+            self.stdout.write(_('Created list region %s.') %
+                              region.machine_name)
+
+    def _values(self, options):
+        '''
+        Yields the stripped serial numbers of the CSV file one at a time,
+        skipping blank rows.
+        '''
+        column = options['column']
+        with open(options['csv_file'], newline='') as f:
+            reader = csv.reader(f, delimiter=options['delimiter'])
+            if options['skip_header']:
+                next(reader, None)
+            for row in reader:
+                if not row or not ''.join(row).strip():
+                    continue
+                try:
+                    yield row[column].strip()
+                except IndexError:
+                    raise CommandError(_('Line %s has no column %s.') % (
+                        reader.line_num, column))
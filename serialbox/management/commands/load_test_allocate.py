@@ -0,0 +1,112 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2018 SerialLab Corp.  All rights reserved.
+import base64
+import http.client
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext as _
+
+from serialbox.benchmarks.runner import percentile
+
+
+class Command(BaseCommand):
+    help = _('Sends the same allocation request to one or more running '
+             'SerialBox servers with many requests in flight and reports '
+             'the throughput and latency of each, for example to compare '
+             'the WSGI allocate API with the async allocate API served '
+             'over ASGI by the same number of processes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', dest='targets',
+                            help=_('A NAME=URL pair of an allocation url to '
+                                   'test, for example wsgi=http://host:8000/'
+                                   'allocate/pool/10/.  May be repeated.'))
+        parser.add_argument('--requests', type=int, default=1000,
+                            help=_('The number of requests sent to each '
+                                   'target.'))
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help=_('The number of requests in flight at '
+                                   'once.'))
+        parser.add_argument('--username', help=_('A basic auth user name.'))
+        parser.add_argument('--password', default='',
+                            help=_('The basic auth password.'))
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['username']:
+            credentials = '%s:%s' % (options['username'],
+                                     options['password'])
+            headers['Authorization'] = 'Basic %s' % base64.b64encode(
+                credentials.encode()).decode()
+        if not options['targets']:
+            raise CommandError(_('Supply at least one --target.'))
+        for target in options['targets']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(_('Targets are NAME=URL pairs, not %s.') %
+                                   target)
+            result = self.load_test(url, headers, options['requests'],
+                                    options['concurrency'])
+            self.stdout.write(
+                _('%(name)s: %(requests)s requests, %(errors)s errors, '
+                  '%(throughput).1f requests/s, p50 %(p50).1f ms, '
+                  'p99 %(p99).1f ms') % dict(result, name=name))
+
+    def load_test(self, url, headers, requests, concurrency):
+        '''
+        Sends `requests` GET requests to the url, `concurrency` at a time,
+        each sender thread keeping its own persistent connection.
+        :return: A dictionary of the request and error counts, throughput
+            and p50 and p99 latencies in milliseconds.
+        '''
+        parts = urlsplit(url)
+        path = parts.path + ('?' + parts.query if parts.query else '')
+        connection_class = http.client.HTTPSConnection \
+            if parts.scheme == 'https' else http.client.HTTPConnection
+        local = threading.local()
+
+        def send(index):
+            connection = getattr(local, 'connection', None)
+            if connection is None:
+                connection = local.connection = connection_class(
+                    parts.netloc, timeout=60)
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                local.connection = None
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(send, range(requests)))
+        elapsed = time.perf_counter() - start
+        latencies = sorted(latency for latency, ok in results)
+        return {
+            'requests': requests,
+            'errors': sum(1 for latency, ok in results if not ok),
+            'throughput': requests / elapsed if elapsed else 0.0,
+            'p50': percentile(latencies, 50) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+        }
@@ -0,0 +1,39 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2018 SerialLab Corp.  All rights reserved.
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+
+from serialbox import capacity
+from serialbox.models import Pool
+
+
+class Command(BaseCommand):
+    help = _('Recalculates the remaining counter of each pool from the '
+             'active regions of the pool.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pool', action='append', dest='pools',
+                            help=_('The machine name of a pool to rebuild. '
+                                   'May be repeated.  Defaults to every '
+                                   'pool.'))
+
+    def handle(self, *args, **options):
+        pools = Pool.objects.all()
+        if options.get('pools'):
+            pools = pools.filter(machine_name__in=options['pools'])
+        capacity.rebuild(pools)
+        for pool in pools:
+            self.stdout.write(_('%s: %s remaining') % (pool.machine_name,
+                                                       pool.remaining))
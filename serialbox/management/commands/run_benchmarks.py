@@ -0,0 +1,95 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2018 SerialLab Corp.  All rights reserved.
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, \
+    teardown_test_environment
+from django.utils.translation import gettext as _
+
+from serialbox import audit
+from serialbox.benchmarks import runner
+from serialbox.benchmarks.scenarios import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = _('Times allocations through the generators and the allocate '
+             'API against a fresh test database built from the default '
+             'database settings, writes the p50 and p99 latencies and '
+             'grants per second of each scenario as JSON and fails if '
+             'any scenario falls too far behind the baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help=_('The name of a scenario to run.  May be '
+                                   'repeated.  Defaults to every '
+                                   'scenario.'))
+        parser.add_argument('--iterations', type=int,
+                            help=_('The number of timed allocations of '
+                                   'each scenario.  Defaults to the '
+                                   'iterations of the scenario.'))
+        parser.add_argument('--output',
+                            help=_('The file to write the JSON results '
+                                   'to.  Defaults to standard output.'))
+        parser.add_argument('--baseline', default=runner.BASELINE,
+                            help=_('The JSON baseline to compare the '
+                                   'results with.  Baselines hold '
+                                   'absolute timings, regenerate the '
+                                   'baseline on the host the comparison '
+                                   'runs on with --write-baseline.'))
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help=_('How far, as a fraction, a result may '
+                                   'fall behind the baseline.  Defaults '
+                                   'to 0.5.'))
+        parser.add_argument('--write-baseline', action='store_true',
+                            help=_('Write the results to the baseline '
+                                   'file instead of comparing them.'))
+        parser.add_argument('--keepdb', action='store_true',
+                            help=_('Keep the test database between runs.'))
+
+    def handle(self, *args, **options):
+        scenarios = SCENARIOS
+        if options.get('scenarios'):
+            names = set(options['scenarios'])
+            scenarios = [scenario for scenario in SCENARIOS
+                         if scenario.name in names]
+            unknown = names - set(scenario.name for scenario in scenarios)
+            if unknown:
+                raise CommandError(_('Unknown scenarios: %s') %
+                                   ', '.join(sorted(unknown)))
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True,
+                                           keepdb=options['keepdb'])
+        try:
+            results = runner.run(scenarios, options.get('iterations'))
+            audit.recorder.flush()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0,
+                                                keepdb=options['keepdb'])
+            teardown_test_environment()
+        if options.get('output'):
+            runner.dump(results, options['output'])
+        else:
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+        if options['write_baseline']:
+            runner.dump(results, options['baseline'])
+            return
+        failures = runner.compare(results, runner.load(options['baseline']),
+                                  options['tolerance'])
+        if failures:
+            raise CommandError(_('Benchmarks fell behind the baseline:\n%s')
+                               % '\n'.join(failures))
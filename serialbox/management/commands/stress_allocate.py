@@ -0,0 +1,89 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2018 SerialLab Corp.  All rights reserved.
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext as _
+
+from serialbox.benchmarks import runner, stress
+from serialbox.models import Pool
+
+
+class Command(BaseCommand):
+    help = _('Starts several processes that allocate from one pool at the '
+             'same time for a set duration, either through the generators '
+             'or through the allocate API, then checks every granted '
+             'number for duplicates and the pool\'s sequential regions '
+             'for numbers that were handed out to nobody.  Run it against '
+             'a pool nothing else is allocating from.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('pool', help=_('The machine name of the pool.'))
+        parser.add_argument('--processes', type=int, default=4,
+                            help=_('The number of allocating processes.  '
+                                   'Defaults to 4.'))
+        parser.add_argument('--duration', type=float, default=10.0,
+                            help=_('How long, in seconds, each process '
+                                   'allocates for.  Defaults to 10.'))
+        parser.add_argument('--size', type=int, default=1,
+                            help=_('The size of each allocation.  Defaults '
+                                   'to 1.'))
+        parser.add_argument('--url',
+                            help=_('The allocate API url of the pool, for '
+                                   'example http://localhost:8000/allocate/'
+                                   'my-pool/10/.  Defaults to calling the '
+                                   'generator in each process.'))
+        parser.add_argument('--username')
+        parser.add_argument('--password')
+        parser.add_argument('--retries', type=int, default=5,
+                            help=_('How many times an allocation that fails '
+                                   'with a database or server error is '
+                                   'retried.  Defaults to 5.'))
+        parser.add_argument('--lock-wait', type=float, default=10.0,
+                            help=_('Database writes that take at least this '
+                                   'many milliseconds are counted as lock '
+                                   'waits.  Defaults to 10.'))
+        parser.add_argument('--output',
+                            help=_('A file to write the JSON results to.'))
+
+    def handle(self, *args, **options):
+        if not Pool.objects.filter(machine_name=options['pool']).exists():
+            raise CommandError(_('There is no pool with the machine name '
+                                 '%s.') % options['pool'])
+        result = stress.run(
+            options['pool'], processes=options['processes'],
+            duration=options['duration'], size=options['size'],
+            url=options['url'], username=options['username'],
+            password=options['password'], retries=options['retries'],
+            lock_wait=options['lock_wait'] / 1000.0)
+        if options['output']:
+            runner.dump(result, options['output'])
+        self.stdout.write(
+            _('%(processes)s processes, %(allocations)s allocations of '
+              '%(numbers)s numbers in %(duration)s s: %(grants_per_second)s '
+              'grants/s, p50 %(p50_ms)s ms, p99 %(p99_ms)s ms, %(retries)s '
+              'retries, %(lock_waits)s lock waits (%(lock_wait_seconds)s s), '
+              '%(failures)s failed processes') % result)
+        for error in result['errors']:
+            self.stdout.write(_('Error: %s') % error)
+        if not result['allocations']:
+            raise CommandError(_('No numbers were allocated.'))
+        if result['overlaps'] or result['gaps']:
+            raise CommandError(
+                _('%s overlapping and %s missing ranges: %s') % (
+                    len(result['overlaps']), len(result['gaps']),
+                    json.dumps({'overlaps': result['overlaps'][:20],
+                                'gaps': result['gaps'][:20]})))
+        self.stdout.write(_('No overlapping or missing numbers.'))
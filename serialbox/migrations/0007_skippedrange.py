@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('serialbox', '0006_auto_20190128_1552'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkippedRange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True, db_index=True, help_text='The date and time that this record was created', verbose_name='Created Date')),
+                ('modified_date', models.DateTimeField(auto_now=True, db_index=True, help_text='The date and time that this record was modified last.', verbose_name='Last Modified')),
+                ('pool', models.CharField(help_text='The machine_name value of the Pool the numbers were reserved from.', max_length=100, verbose_name='Pool')),
+                ('region', models.CharField(help_text='The machine_name of the Region the numbers were reserved from.', max_length=100, verbose_name='Region')),
+                ('first', models.BigIntegerField(help_text='The first number of the skipped range.', verbose_name='First')),
+                ('last', models.BigIntegerField(help_text='The last number of the skipped range.', verbose_name='Last')),
+                ('reason', models.CharField(choices=[('expired', 'Lease Expired'), ('replaced', 'Lease Replaced'), ('shutdown', 'Worker Shutdown')], help_text='Why the numbers were skipped.', max_length=10, verbose_name='Reason')),
+            ],
+            options={
+                'verbose_name': 'Skipped Range',
+                'verbose_name_plural': 'Skipped Ranges',
+            },
+        ),
+    ]
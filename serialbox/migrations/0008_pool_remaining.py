@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+def count_remaining(apps, schema_editor):
+    '''
+    Fills the new remaining counter from the active regions defined by
+    serialbox itself.  FlavorPack regions are not known to this migration;
+    run the rebuild_pool_capacity command if you use them.
+    '''
+    Pool = apps.get_model('serialbox', 'Pool')
+    SequentialRegion = apps.get_model('serialbox', 'SequentialRegion')
+    RandomizedRegion = apps.get_model('serialbox', 'RandomizedRegion')
+    for pool in Pool.objects.all():
+        remaining = 0
+        for region in SequentialRegion.objects.filter(pool=pool,
+                                                      active=True):
+            remaining += max(region.end - region.state + 1, 0)
+        for region in RandomizedRegion.objects.filter(pool=pool,
+                                                      active=True):
+            remaining += region.remaining or 0
+        pool.remaining = remaining
+        pool.save(update_fields=['remaining'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('serialbox', '0007_skippedrange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pool',
+            name='remaining',
+            field=models.BigIntegerField(default=0, help_text='The number of numbers left in the active regions of this pool.  Maintained by the system as numbers are allocated and regions change.', verbose_name='Remaining'),
+        ),
+        migrations.RunPython(count_remaining, migrations.RunPython.noop),
+    ]
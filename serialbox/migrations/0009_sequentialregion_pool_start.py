@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('serialbox', '0008_pool_remaining'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sequentialregion',
+            index=models.Index(fields=['pool', 'start'], name='serialbox_seqregion_pool_start'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:12
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('serialbox', '0009_sequentialregion_pool_start'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListRegion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True, db_index=True, help_text='The date and time that this record was created', verbose_name='Created Date')),
+                ('modified_date', models.DateTimeField(auto_now=True, db_index=True, help_text='The date and time that this record was modified last.', verbose_name='Last Modified')),
+                ('readable_name', models.CharField(help_text='A human-readable name for use in GUIs and reports and such.', max_length=100, unique=True, verbose_name='Readable Name')),
+                ('machine_name', models.CharField(help_text='A url/api-friendly unique key for use in API calls and such.', max_length=100, unique=True, validators=[django.core.validators.RegexValidator('^[A-Za-z0-9]*$', 'Only numbers and letters are allowed. Invalid API Key.')], verbose_name='API Key')),
+                ('active', models.BooleanField(default=True, help_text='Whether or not this pool is active/in-use. If marked false the pool will no longer be able to be used in API calls, etc.', verbose_name='Active')),
+                ('order', models.IntegerField(blank=True, help_text='The order in which this region will be consumed as numbers are issued from the pool overall', null=True, verbose_name='Order')),
+                ('file_path', models.CharField(help_text='The path of the list file holding the numbers of the region.  Relative paths are resolved against the LIST_REGION_ROOT setting.', max_length=1000, verbose_name='File Path')),
+                ('count', models.BigIntegerField(blank=True, help_text='The number of numbers in the list file.  Read from the file when the region is created.', null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Count')),
+                ('current', models.BigIntegerField(blank=True, help_text='The position in the list file of the next number to issue.', null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Current')),
+                ('remaining', models.BigIntegerField(blank=True, help_text='The number of remaining serial numbers in this list region.', null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Remaining')),
+                ('pool', models.ForeignKey(blank=True, help_text='The Number Pool this region will belong to.', null=True, on_delete=django.db.models.deletion.CASCADE, to='serialbox.Pool', verbose_name='Number Pool')),
+            ],
+            options={
+                'verbose_name': 'List Region',
+                'verbose_name_plural': 'List Regions',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:14
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('serialbox', '0010_listregion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GS1Configuration',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True, db_index=True, help_text='The date and time that this record was created', verbose_name='Created Date')),
+                ('modified_date', models.DateTimeField(auto_now=True, db_index=True, help_text='The date and time that this record was modified last.', verbose_name='Last Modified')),
+                ('company_prefix', models.CharField(help_text='The GS1 company prefix, 6 to 12 digits.', max_length=12, validators=[django.core.validators.RegexValidator('^[0-9]{6,12}$', 'The company prefix must be 6 to 12 digits.')], verbose_name='Company Prefix')),
+                ('indicator', models.CharField(default='0', help_text='The indicator digit of the GTIN-14 used for SGTINs.', max_length=1, validators=[django.core.validators.RegexValidator('^[0-9]$', 'Only a single digit is allowed.')], verbose_name='Indicator Digit')),
+                ('item_reference', models.CharField(blank=True, default='', help_text='The item reference of the GTIN-14 used for SGTINs. Together with the company prefix it must be 12 digits long.', max_length=6, validators=[django.core.validators.RegexValidator('^[0-9]*$', 'Only digits are allowed.')], verbose_name='Item Reference')),
+                ('extension_digit', models.CharField(default='0', help_text='The extension digit used for SSCCs.', max_length=1, validators=[django.core.validators.RegexValidator('^[0-9]$', 'Only a single digit is allowed.')], verbose_name='Extension Digit')),
+                ('pool', models.OneToOneField(help_text='The pool the configuration applies to.', on_delete=django.db.models.deletion.CASCADE, related_name='gs1_configuration', to='serialbox.Pool', verbose_name='Pool')),
+            ],
+            options={
+                'verbose_name': 'GS1 Configuration',
+                'verbose_name_plural': 'GS1 Configurations',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('serialbox', '0011_gs1configuration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='responsetemplate',
+            name='content_type',
+            field=models.CharField(default='text/plain', help_text='The content type of the rendered template, for example application/xml.', max_length=100, verbose_name='Content Type'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('serialbox', '0012_responsetemplate_content_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='response',
+            name='created_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, help_text='The date and time that this record was created', verbose_name='Created Date'),
+        ),
+    ]
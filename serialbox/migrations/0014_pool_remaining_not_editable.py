@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('serialbox', '0013_response_created_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pool',
+            name='remaining',
+            field=models.BigIntegerField(default=0, editable=False, help_text='The number of numbers left in the active regions of this pool.  Maintained by the system as numbers are allocated and regions change.', verbose_name='Remaining'),
+        ),
+    ]
@@ -17,12 +17,16 @@
     along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
 '''
 import re
+import random
 
 from django.db import models
-from django.core.validators import RegexValidator
+from django.utils import timezone
+from django.core.validators import RegexValidator, MinValueValidator
 from django.utils.translation import gettext_lazy as _
 
 from serialbox import errors
+from serialbox.encoding import encode_number_list
+from serialbox.listfiles import get_list_file
 from django.core.exceptions import ValidationError
 from django.db.models.signals import pre_save
 
@@ -32,6 +36,9 @@ machine_name_validator = RegexValidator(
     _('Only numbers and letters are allowed. '
       'Invalid API Key.'))
 
+digit_validator = RegexValidator(
+    r'^[0-9]$', _('Only a single digit is allowed.'))
+
 
 class BaseModel(models.Model):
     created_date = models.DateTimeField(
@@ -94,9 +101,34 @@ class Pool(BaseModel):
             'requested from this pool at once.  Default of '
             '50000.'))
 
+    remaining = models.BigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Remaining'),
+        help_text=_(
+            'The number of numbers left in the active regions of this '
+            'pool.  Maintained by the system as numbers are allocated and '
+            'regions change.'))
+
     def __str__(self):
         return self.readable_name
 
+    def save(self, *args, **kwargs):
+        '''
+        Never writes the remaining counter of an existing pool.  The counter
+        is only changed by serialbox.capacity, in place, so saving a pool
+        loaded before an allocation must not write back the stale value.
+        '''
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in
+                                 self._meta.concrete_fields
+                                 if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields
+                                       if name != 'remaining']
+        super(Pool, self).save(*args, **kwargs)
+
     class Meta:
         verbose_name = _('Pool')
         verbose_name_plural = _('Pools')
@@ -286,6 +318,201 @@ class SequentialRegion(Region):
     class Meta(object):
         verbose_name = _('Sequential Region')
         verbose_name_plural = _('Sequential Regions')
+        indexes = [
+            # supports the lookup in check_sequential_region_boundaries
+            models.Index(fields=['pool', 'start'],
+                         name='serialbox_seqregion_pool_start'),
+        ]
+
+
+class RandomizedRegion(Region):
+    '''
+    A RandomizedRegion hands out every number between its minimum and
+    maximum exactly once, in an order that looks random.  The numbers are
+    a keyed permutation of the region (see
+    serialbox.generators.feistel) so the region only has to keep a counter
+    of how many numbers it has issued, never the numbers themselves.
+    '''
+    min = models.BigIntegerField(
+        default=1,
+        validators=[MinValueValidator(0)],
+        verbose_name=_('Minimum'),
+        help_text=_('The minimum value in the randomized region.'))
+    max = models.BigIntegerField(
+        default=9223372036854775807,
+        validators=[MinValueValidator(0)],
+        verbose_name=_('Maximum'),
+        help_text=_('The maximum value in the randomized region.'))
+    start = models.BigIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name=_('Start Number'),
+        help_text=_('The start number will fall somewhere in between the '
+                    'minimum and maximum numbers.  This number will be '
+                    'randomly selected by the system to assure the most '
+                    'randomized range possible'))
+    current = models.BigIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name=_('Current'),
+        help_text=_('The current number represents the next number in the '
+                    'generator.  The current number is used by the system as '
+                    'a state variable that, along with the start, can be '
+                    'used to re-position the random number generator where '
+                    'it left off.'))
+    remaining = models.BigIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name=_('Remaining'),
+        help_text=_('The number of remaining serial numbers in this '
+                    'randomized region.'))
+
+    @property
+    def size(self):
+        '''
+        The number of numbers in the region.
+        '''
+        return self.max - self.min + 1
+
+    def save(self, *args, **kwargs):
+        '''
+        Picks the start number, which keys the permutation, and sets the
+        counter and remaining count of new regions.
+        '''
+        if self.min > self.max:
+            raise errors.RegionBoundaryException(
+                _('The minimum of the region can not be greater than the '
+                  'maximum.'))
+        if self.start is None:
+            self.start = random.SystemRandom().randint(self.min, self.max)
+        if self.current is None:
+            self.current = 0
+        self.remaining = self.size - self.current
+        if not self.order:
+            order = RandomizedRegion.objects.filter(
+                pool=self.pool).aggregate(models.Max('order'))['order__max']
+            self.order = (order or 0) + 1
+        super(RandomizedRegion, self).save(*args, **kwargs)
+
+    class Meta(object):
+        verbose_name = _('Randomized Region')
+        verbose_name_plural = _('Randomized Regions')
+
+
+class ListRegion(Region):
+    '''
+    A ListRegion hands out pre-generated serial numbers, such as those
+    supplied by a trading partner, in the order they were imported.  The
+    numbers live in a memory-mapped list file of fixed-width records (see
+    serialbox.listfiles and the import_list_region command); the region
+    only keeps a counter of how many numbers it has issued.
+    '''
+    file_path = models.CharField(
+        max_length=1000,
+        verbose_name=_('File Path'),
+        help_text=_('The path of the list file holding the numbers of the '
+                    'region.  Relative paths are resolved against the '
+                    'LIST_REGION_ROOT setting.'))
+    count = models.BigIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name=_('Count'),
+        help_text=_('The number of numbers in the list file.  Read from '
+                    'the file when the region is created.'))
+    current = models.BigIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name=_('Current'),
+        help_text=_('The position in the list file of the next number to '
+                    'issue.'))
+    remaining = models.BigIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name=_('Remaining'),
+        help_text=_('The number of remaining serial numbers in this list '
+                    'region.'))
+
+    def save(self, *args, **kwargs):
+        '''
+        Reads the count of new regions from their list file and sets the
+        counter and remaining count.
+        '''
+        if self.count is None:
+            self.count = get_list_file(self.file_path).count
+        if self.current is None:
+            self.current = 0
+        self.remaining = self.count - self.current
+        if not self.order:
+            order = ListRegion.objects.filter(
+                pool=self.pool).aggregate(models.Max('order'))['order__max']
+            self.order = (order or 0) + 1
+        super(ListRegion, self).save(*args, **kwargs)
+
+    class Meta(object):
+        verbose_name = _('List Region')
+        verbose_name_plural = _('List Regions')
+
+
+class GS1Configuration(BaseModel):
+    '''
+    The GS1 company prefix and identifiers a pool's numbers are formatted
+    with when an allocation asks for EPC URNs or SSCCs.
+    '''
+    pool = models.OneToOneField(
+        Pool,
+        on_delete=models.CASCADE,
+        related_name='gs1_configuration',
+        verbose_name=_('Pool'),
+        help_text=_('The pool the configuration applies to.'))
+    company_prefix = models.CharField(
+        max_length=12,
+        verbose_name=_('Company Prefix'),
+        help_text=_('The GS1 company prefix, 6 to 12 digits.'),
+        validators=[RegexValidator(
+            r'^[0-9]{6,12}$',
+            _('The company prefix must be 6 to 12 digits.'))])
+    indicator = models.CharField(
+        max_length=1,
+        default='0',
+        verbose_name=_('Indicator Digit'),
+        help_text=_('The indicator digit of the GTIN-14 used for SGTINs.'),
+        validators=[digit_validator])
+    item_reference = models.CharField(
+        max_length=6,
+        blank=True,
+        default='',
+        verbose_name=_('Item Reference'),
+        help_text=_('The item reference of the GTIN-14 used for SGTINs. '
+                    'Together with the company prefix it must be 12 '
+                    'digits long.'),
+        validators=[RegexValidator(
+            r'^[0-9]*$', _('Only digits are allowed.'))])
+    extension_digit = models.CharField(
+        max_length=1,
+        default='0',
+        verbose_name=_('Extension Digit'),
+        help_text=_('The extension digit used for SSCCs.'),
+        validators=[digit_validator])
+
+    def clean(self):
+        if self.item_reference and \
+                len(self.company_prefix) + len(self.item_reference) != 12:
+            raise ValidationError(
+                _('The company prefix and item reference must be 12 digits '
+                  'long together.'))
+
+    def __str__(self):
+        return self.company_prefix
+
+    class Meta(object):
+        verbose_name = _('GS1 Configuration')
+        verbose_name_plural = _('GS1 Configurations')
 
 
 class ResponseTemplate(BaseModel):
@@ -306,6 +533,12 @@ class ResponseTemplate(BaseModel):
             'The template text using '
             'Jinja2 format markup.  For more info on Jinja templates '
             'see http://jinja.pocoo.org/'))
+    content_type = models.CharField(
+        max_length=100,
+        default='text/plain',
+        verbose_name=_('Content Type'),
+        help_text=_('The content type of the rendered template, for '
+                    'example application/xml.'))
     pool = models.ManyToManyField(
         Pool, verbose_name=_('Pools'), help_text=_(
             'This will associate a response '
@@ -326,6 +559,15 @@ class Response(BaseModel):
     '''
     Stores each response that the system has made.
     '''
+    # set when the response is made rather than when it is written, since
+    # the audit trail may write responses in batches some time later
+    created_date = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name=_('Created Date'),
+        help_text=_('The date and time that '
+                    'this record was created'),
+        db_index=True)
     TYPE_CHOICES = (
         ('sequential', 'Sequential'),
         ('random', 'Random'),
@@ -386,8 +628,35 @@ class Response(BaseModel):
         verbose_name=_('Remote Host'),
         help_text=_('The remote host which made the request.'))
 
+    #: The minimum number of characters of each encoded number.
+    width = None
+    #: The serialbox.gs1.GS1Formatter the numbers are returned with, if any.
+    gs1 = None
+
     def get_number_list(self):
-        return self.number_list
+        '''
+        Returns the numbers of the response in the response's encoding, or
+        as GS1 identifiers if a GS1 format was requested.
+        '''
+        if self.gs1:
+            return self.gs1.format_number_list(self)
+        return encode_number_list(self.number_list, self.encoding,
+                                  self.width)
+
+    def iter_numbers(self):
+        '''
+        Yields every number in the response, unencoded, one at a time.
+        Sequential responses only hold the first and last number of each
+        range, the ranges are expanded lazily.
+        '''
+        numbers = self.number_list
+        if self.type != 'sequential':
+            yield from numbers
+            return
+        ranges = numbers if numbers and isinstance(
+            numbers[0], (list, tuple)) else [numbers]
+        for number_range in ranges:
+            yield from range(number_range[0], number_range[-1] + 1)
 
     class Meta(object):
         verbose_name = _('Response')
@@ -397,4 +666,46 @@ class Response(BaseModel):
         return '{0}:{1}'.format(self.created_date)
 
 
+class SkippedRange(BaseModel):
+    '''
+    Records a range of numbers that was reserved from a region but never
+    handed out, for example the unused part of a worker lease that could
+    not be given back to its region.  Kept so auditors can account for
+    every number in a region.
+    '''
+    REASON_CHOICES = (
+        ('expired', 'Lease Expired'),
+        ('replaced', 'Lease Replaced'),
+        ('shutdown', 'Worker Shutdown'),
+    )
+    pool = models.CharField(
+        max_length=100,
+        verbose_name=_('Pool'),
+        help_text=_('The machine_name value of the Pool the numbers were '
+                    'reserved from.'))
+    region = models.CharField(
+        max_length=100,
+        verbose_name=_('Region'),
+        help_text=_('The machine_name of the Region the numbers were '
+                    'reserved from.'))
+    first = models.BigIntegerField(
+        verbose_name=_('First'),
+        help_text=_('The first number of the skipped range.'))
+    last = models.BigIntegerField(
+        verbose_name=_('Last'),
+        help_text=_('The last number of the skipped range.'))
+    reason = models.CharField(
+        max_length=10,
+        verbose_name=_('Reason'),
+        help_text=_('Why the numbers were skipped.'),
+        choices=REASON_CHOICES)
+
+    def __str__(self):
+        return '{0}:{1}-{2}'.format(self.region, self.first, self.last)
+
+    class Meta(object):
+        verbose_name = _('Skipped Range')
+        verbose_name_plural = _('Skipped Ranges')
+
+
 pre_save.connect(SequentialRegion.pre_save, SequentialRegion)
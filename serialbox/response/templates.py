@@ -0,0 +1,143 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import threading
+from itertools import chain
+
+from django.utils.translation import gettext as _
+from jinja2 import TemplateSyntaxError
+from jinja2.sandbox import SandboxedEnvironment
+from rest_framework.exceptions import ValidationError
+
+from serialbox.encoding import encode_number_list
+from serialbox.models import ResponseTemplate
+
+#: The Jinja2 environment ResponseTemplates are compiled in.  Templates
+#: are edited through the API, so they run sandboxed.
+environment = SandboxedEnvironment(trim_blocks=True, lstrip_blocks=True)
+
+#: The environment of templates with XML or HTML content types, which
+#: escapes every value the template writes.
+escaping_environment = SandboxedEnvironment(trim_blocks=True,
+                                            lstrip_blocks=True,
+                                            autoescape=True)
+
+
+def get_environment(content_type):
+    '''
+    Returns the environment a template of the content type is compiled in.
+    '''
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    if media_type.endswith(('xml', 'html')):
+        return escaping_environment
+    return environment
+
+
+class TemplateCache(object):
+    '''
+    Keeps each ResponseTemplate compiled once per process, in the
+    environment for its content type (see get_environment).  Compiled
+    templates are kept by primary key along with the `modified_date` of
+    the template they were compiled from and are compiled again when the
+    template has been changed since.
+    '''
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, response_template):
+        '''
+        Returns the compiled jinja2 Template of the ResponseTemplate.
+        '''
+        entry = self._templates.get(response_template.pk)
+        if entry and entry[0] == response_template.modified_date:
+            return entry[1]
+        template = get_environment(
+            response_template.content_type).from_string(
+            response_template.template_text)
+        with self._lock:
+            self._templates[response_template.pk] = (
+                response_template.modified_date, template)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates = {}
+
+
+#: Compiled templates by ResponseTemplate primary key.
+templates = TemplateCache()
+
+
+def get_response_template(pool, name):
+    '''
+    Returns the ResponseTemplate of the pool with the readable name,
+    compiled, as a tuple of the ResponseTemplate and its jinja2 Template.
+    Raises a validation error if the pool has no such template or it does
+    not compile.
+    '''
+    response_template = ResponseTemplate.objects.filter(
+        pool=pool, readable_name=name).first()
+    if not response_template:
+        raise ValidationError(
+            {'template': _('The pool %s has no response template named '
+                           '%s.') % (pool.machine_name, name)})
+    try:
+        return response_template, templates.get(response_template)
+    except TemplateSyntaxError as e:
+        raise ValidationError(
+            {'template': _('The response template %s does not compile: '
+                           '%s') % (name, e)})
+
+
+def get_context(response, chunks):
+    '''
+    Returns the template context of an allocation Response.  `numbers`
+    lazily yields every number of the response as text, taken from the
+    formatted chunks, so the template is rendered as the numbers are
+    produced.  `ranges` holds the [first, last] ranges of sequential
+    responses and is empty for other responses.
+    '''
+    ranges = []
+    if response.type == 'sequential':
+        number_list = encode_number_list(response.number_list,
+                                         response.encoding, response.width)
+        if number_list and not isinstance(number_list[0], (list, tuple)):
+            number_list = [number_list]
+        # a single number is stored as [first]
+        ranges = [[numbers[0], numbers[-1]] for numbers in number_list]
+    return {
+        'response': response,
+        'pool': response.pool,
+        'region': response.region,
+        'type': response.type,
+        'fulfilled': response.fulfilled,
+        'size_granted': response.size_granted,
+        'encoding': response.encoding,
+        'numbers': chain.from_iterable(chunks),
+        'ranges': ranges,
+    }
+
+
+def render(template, response, chunks):
+    '''
+    Renders the compiled template for the allocation Response piece by
+    piece with jinja2's `generate`.
+    '''
+    return template.generate(get_context(response, chunks))
@@ -16,7 +16,8 @@
     You should have received a copy of the GNU Affero General Public License
     along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
 '''
-from serialbox import discovery
+from serialbox import capacity
+from serialbox.generators.leasing import leases
 from serialbox.rules import errors, common, logger
 
 
@@ -33,7 +34,10 @@ class SizeLimitRule(common.PreprocessingRule):
     def _check_remaining(self, region, size):
         logger.info('Checking pool %s against the requested size of %s',
                     str(region.pool), size)
-        remaining = discovery.get_total_pool_size(region.pool)
+        # numbers leased by this process are off the pool counter but can
+        # still be served
+        remaining = capacity.get_remaining(region.pool) + \
+            leases.get_unserved(region.pool_id)
         if size > remaining:
             raise errors.SizeLimitRuleError(
                 'The requested size is '
@@ -13,10 +13,89 @@
 #
 # Copyright 2018 SerialLab Corp.  All rights reserved.
 
+from pydoc import locate
+
 from quartet_capture.rules import Step, Rule
-from quartet_capture.models import Task as DBTask
+from quartet_capture.models import Task as DBTask, Rule as DBRule
+
+from serialbox.caching import GenerationCache
+
+#: Compiled rules by rule id.
+rule_cache = GenerationCache('rules')
+
+
+class CompiledRule(object):
+    '''
+    A database rule with its parameters, steps and step parameters loaded
+    and its step classes imported.  Compiled rules are shared by every
+    task that runs the rule, so they are never modified once built.
+    '''
+
+    def __init__(self, db_rule):
+        # a fresh copy, the caller's instance may hold stale prefetches
+        self.db_rule = DBRule.objects.prefetch_related(
+            'ruleparameter_set',
+            'step_set__stepparameter_set'
+        ).get(pk=db_rule.pk)
+        self.step_classes = {
+            db_step.pk: locate(db_step.step_class)
+            for db_step in self.db_rule.step_set.all()
+        }
+
+    @property
+    def complete(self):
+        return all(self.step_classes.values())
+
+    def bind(self, db_task: DBTask):
+        '''
+        Returns an executable Rule for the task.
+        '''
+        return BoundRule(self, db_task)
+
+
+class BoundRule(Rule):
+    '''
+    A Rule built from a CompiledRule: only the rule context and the step
+    instances for the task are created, nothing is read from the database.
+    '''
+
+    def __init__(self, compiled: CompiledRule, task: DBTask):
+        self.compiled = compiled
+        super().__init__(compiled.db_rule, task)
+
+    def _load_step(self, db_step):
+        step = self.compiled.step_classes[db_step.pk]
+        step.db_step = db_step
+        params = {p.name: p.value for p in db_step.stepparameter_set.all()}
+        return step(self.db_task, **params)
+
+
+def get_rule(db_task: DBTask):
+    '''
+    Returns an executable Rule for the task's database rule.  The rule is
+    compiled once and, when the metadata cache is enabled, reused until a
+    rule, step or parameter is saved or deleted.  Rules with step classes
+    that can not be located are built the regular way so the task records
+    why.
+    '''
+    compiled = rule_cache.get(db_task.rule_id)
+    if compiled is None:
+        compiled = CompiledRule(db_task.rule)
+        if not compiled.complete:
+            return Rule(db_task.rule, db_task)
+        rule_cache.set(db_task.rule_id, compiled)
+    return compiled.bind(db_task)
+
+
+def invalidate_rule_cache(sender, **kwargs):
+    '''
+    Signal receiver that drops the compiled rules when a rule, step or any
+    of their parameters change.
+    '''
+    rule_cache.invalidate()
+
 
-def execute_rule_inline(message: bytes, db_task: DBTask):
+def execute_rule_inline(message: bytes, db_task: DBTask, save_task=True):
     '''
     Helper function that executes a rule inline and returns
     the context.  The celery task below essentially does the same thing
@@ -24,17 +103,22 @@ def execute_rule_inline(message: bytes, db_task: DBTask):
     When a message arrives, creates a record of the message and parses
     it using the appropriate parser.
     :param message_data: The data to be handled.
+    :param db_task: The task the rule is executed for.  Its status is set
+    to FINISHED or FAILED.
+    :param save_task: Set to False if the caller saves the task itself once
+    it is done with it.
     '''
     try:
         # create an executable task from a database rule
-        c_rule = Rule(db_task.rule, db_task)
+        c_rule = get_rule(db_task)
         # execute the rule
         c_rule.execute(message)
-        # return the context
-        db_task.STATUS = "FINISHED"
-        db_task.save()
+        db_task.status = DBTask.STATUS.FINISHED
     except:
-        db_task.STATUS = "FAILED"
-        db_task.save()
+        db_task.status = DBTask.STATUS.FAILED
         raise
+    finally:
+        if save_task:
+            db_task.save()
+    # return the context
     return c_rule
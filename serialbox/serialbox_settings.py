@@ -32,6 +32,16 @@ GENERATOR_PREPROCESSING_RULES = getattr(
             'serialbox.rules.limits.ActiveRule',
             'serialbox.rules.limits.SizeLimitRule',
             'serialbox.rules.limits.RequestThresholdLimitRule',
+        ],
+        'serialbox.generators.randomized.RandomizedGenerator': [
+            'serialbox.rules.limits.ActiveRule',
+            'serialbox.rules.limits.SizeLimitRule',
+            'serialbox.rules.limits.RequestThresholdLimitRule',
+        ],
+        'serialbox.generators.list.ListGenerator': [
+            'serialbox.rules.limits.ActiveRule',
+            'serialbox.rules.limits.SizeLimitRule',
+            'serialbox.rules.limits.RequestThresholdLimitRule',
         ]
     })
 
@@ -40,6 +50,63 @@ GENERATOR_POSTPROCESSING_RULES = getattr(
     'GENERATOR_POSTPROCESSING_RULES',
     {})
 
+# How the SequentialGenerator reserves ranges from a region.  `update`
+# reserves with a single conditional UPDATE and only locks the row when a
+# region can not fill the whole request; `select_for_update` always locks
+# the region row first; `lease` serves small requests from a block leased
+# by each worker process.
+SEQUENTIAL_ALLOCATION_MODE = getattr(
+    settings,
+    'SEQUENTIAL_ALLOCATION_MODE',
+    'update')
+
+# When True, a sequential request that runs past the end of a region is
+# filled from the next active sequential regions of the pool and the
+# response numbers become a list of [first, last] ranges.
+SEQUENTIAL_SPILLOVER = getattr(settings, 'SEQUENTIAL_SPILLOVER', False)
+
+# The number of serial numbers each worker leases from a region at once
+# when the `lease` allocation mode is used.
+SEQUENTIAL_LEASE_SIZE = getattr(settings, 'SEQUENTIAL_LEASE_SIZE', 100000)
+
+# The number of seconds a lease may be served from before its unused
+# numbers are given back or recorded as skipped.
+SEQUENTIAL_LEASE_EXPIRY = getattr(settings, 'SEQUENTIAL_LEASE_EXPIRY', 300)
+
+# The alias of a Django cache shared by all worker processes.  When set,
+# each process keeps pool and region metadata in memory and uses a
+# generation counter in this cache to notice changes made by other
+# processes.  The default of None leaves the metadata, response rule and
+# compiled rule caches off.
+METADATA_CACHE_ALIAS = getattr(settings, 'METADATA_CACHE_ALIAS', None)
+
+# How allocation responses are written to the Response audit table.
+# `async` queues them and writes them in batches from a background thread,
+# `sync` inserts each one inside the allocating transaction and `off`
+# does not record them.
+RESPONSE_AUDIT_MODE = getattr(settings, 'RESPONSE_AUDIT_MODE', 'async')
+
+# The number of queued responses that triggers an `async` audit write.
+RESPONSE_AUDIT_BATCH_SIZE = getattr(settings, 'RESPONSE_AUDIT_BATCH_SIZE',
+                                    500)
+
+# The most seconds an `async` audit record waits in the queue.
+RESPONSE_AUDIT_FLUSH_INTERVAL = getattr(settings,
+                                        'RESPONSE_AUDIT_FLUSH_INTERVAL', 1.0)
+
+# The directory that relative ListRegion file paths are resolved against.
+# Leave as None to resolve them against the working directory.
+LIST_REGION_ROOT = getattr(settings, 'LIST_REGION_ROOT', None)
+
+# The number of threads the async allocation view runs database work and
+# response rules on in each process.  Every thread holds its own database
+# connection.
+ASYNC_ALLOCATION_THREADS = getattr(settings, 'ASYNC_ALLOCATION_THREADS', 32)
+
+# Time the stages of each allocation into per-pool histograms, exported by
+# the metrics API, and return them in a Server-Timing header.
+STAGE_TIMING = getattr(settings, 'STAGE_TIMING', False)
+
 REST_FRAMEWORK = getattr(settings, 'REST_FRAMEWORK', {})
 REST_FRAMEWORK.update({
     'DEFAULT_RENDERER_CLASSES': (
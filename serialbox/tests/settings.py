@@ -85,6 +85,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # a file based test database lets the concurrency tests share
+        # the database between worker processes.
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
@@ -127,6 +132,9 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# write the response audit trail inside each test's transaction
+RESPONSE_AUDIT_MODE = 'sync'
+
 # import the django rest framework settings
 from serialbox.serialbox_settings import REST_FRAMEWORK
 
@@ -0,0 +1,299 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import time
+import logging
+import multiprocessing
+from unittest import mock, skipIf
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, RequestFactory
+
+from serialbox import capacity, serialbox_settings
+from serialbox.generators import leasing
+from serialbox.generators.sequential import SequentialGenerator
+from serialbox.models import Pool, SequentialRegion, SkippedRange
+
+logger = logging.getLogger(__name__)
+
+
+def _in_memory_database():
+    name = connection.settings_dict['NAME']
+    return connection.vendor == 'sqlite' and (
+        name == ':memory:' or 'mode=memory' in name)
+
+
+def _allocate(args):
+    '''
+    Runs in a worker process and allocates `count` ranges of `size`
+    from the pool.  Returns the granted ranges and the elapsed time.
+    '''
+    pool, size, count = args
+    generator = SequentialGenerator()
+    request = RequestFactory().get('/')
+    ranges = []
+    start = time.perf_counter()
+    try:
+        for i in range(count):
+            response = generator.get_response(request, size, pool)
+            numbers = response.get_number_list()
+            ranges.append((numbers[0], numbers[-1]))
+    finally:
+        connections.close_all()
+    return ranges, time.perf_counter() - start
+
+
+def create_pool(machine_name='allocpool', end=1000000, threshold=50000):
+    pool = Pool.objects.create(readable_name=machine_name,
+                               machine_name=machine_name,
+                               request_threshold=threshold)
+    region = SequentialRegion.objects.create(
+        readable_name='%s region' % machine_name,
+        machine_name='%sr1' % machine_name,
+        order=1,
+        start=1,
+        end=end,
+        pool=pool
+    )
+    return pool, region
+
+
+class SequentialAllocationTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100)
+        self.request = RequestFactory().get('/')
+
+    def _get_response(self, size):
+        return SequentialGenerator().get_response(self.request, size,
+                                                  'allocpool')
+
+    def test_allocate_range(self):
+        response = self._get_response(10)
+        self.assertEqual(response.get_number_list(), [1, 10])
+        response = self._get_response(10)
+        self.assertEqual(response.get_number_list(), [11, 20])
+        self.region.refresh_from_db()
+        self.assertEqual(self.region.state, 21)
+
+    def test_exhaust_region(self):
+        self._get_response(90)
+        response = self._get_response(10)
+        self.assertTrue(response.fulfilled)
+        self.assertEqual(response.get_number_list(), [91, 100])
+        self.region.refresh_from_db()
+        self.assertFalse(self.region.active)
+
+    def test_locked_partial_grant(self):
+        self._get_response(95)
+        # bypass the pre-processing size rule to force a partial grant
+        generator = SequentialGenerator()
+        generator.preprocessing_rules = []
+        response = generator.get_response(self.request, 10, 'allocpool')
+        self.assertFalse(response.fulfilled)
+        self.assertEqual(response.size_granted, 5)
+        self.assertEqual(response.get_number_list(), [96, 100])
+        self.region.refresh_from_db()
+        self.assertFalse(self.region.active)
+
+    def test_stale_region_instance(self):
+        '''
+        A region instance read before another allocation must not be able
+        to write its old state back.
+        '''
+        generator = SequentialGenerator()
+        stale = SequentialRegion.objects.get(pk=self.region.pk)
+        self._get_response(10)
+        first, size = generator._reserve(mock.Mock(), stale, 10)
+        self.assertEqual(first, 11)
+        generator.save_region(stale)
+        self.region.refresh_from_db()
+        self.assertEqual(self.region.state, 21)
+
+
+@mock.patch.object(serialbox_settings, 'SEQUENTIAL_SPILLOVER', True)
+class SpilloverAllocationTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100)
+        self.region2 = SequentialRegion.objects.create(
+            readable_name='allocpool region 2',
+            machine_name='allocpoolr2',
+            order=2,
+            start=201,
+            end=300,
+            pool=self.pool
+        )
+        self.request = RequestFactory().get('/')
+
+    def _get_response(self, size):
+        return SequentialGenerator().get_response(self.request, size,
+                                                  'allocpool')
+
+    def test_single_region(self):
+        response = self._get_response(10)
+        self.assertEqual(response.get_number_list(), [1, 10])
+        self.assertEqual(self._get_response(1).get_number_list(), [11])
+
+    def test_spill_into_next_region(self):
+        response = self._get_response(150)
+        self.assertTrue(response.fulfilled)
+        self.assertEqual(response.size_granted, 150)
+        self.assertEqual(response.get_number_list(), [[1, 100], [201, 250]])
+        self.region.refresh_from_db()
+        self.assertFalse(self.region.active)
+        self.assertEqual(self._get_response(10).get_number_list(),
+                         [251, 260])
+
+    def test_exhausted_region_instance(self):
+        '''
+        A region exhausted after it was looked up is skipped.
+        '''
+        SequentialRegion.objects.filter(pk=self.region.pk).update(
+            active=False)
+        generator = SequentialGenerator()
+        response = generator.allocate(self.request, 10, self.pool,
+                                      self.region)
+        self.assertEqual(response.get_number_list(), [201, 210])
+
+
+@skipIf(_in_memory_database(), 'Multi-process allocation needs a database '
+                               'shared between processes.')
+class ConcurrentAllocationTests(TransactionTestCase):
+    '''
+    Allocates from one pool with several processes and makes sure no two
+    grants overlap.
+    '''
+    processes = 4
+    requests_per_process = 50
+    size = 10
+
+    def _run(self):
+        create_pool()
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        args = [('allocpool', self.size, self.requests_per_process)] * \
+            self.processes
+        with context.Pool(self.processes) as pool:
+            results = pool.map(_allocate, args)
+        ranges = sorted(r for result in results for r in result[0])
+        total = self.processes * self.requests_per_process
+        self.assertEqual(len(ranges), total)
+        for previous, current in zip(ranges, ranges[1:]):
+            self.assertLess(previous[1], current[0],
+                            'Overlapping ranges %s and %s' % (previous,
+                                                              current))
+        self.assertEqual(ranges[0][0], 1)
+        self.assertEqual(ranges[-1][1], total * self.size)
+        elapsed = max(result[1] for result in results)
+        logger.info('%s grants per second using %s processes and the %s '
+                    'allocation mode.', round(total / elapsed),
+                    self.processes,
+                    serialbox_settings.SEQUENTIAL_ALLOCATION_MODE)
+
+    def test_update_allocation(self):
+        self._run()
+
+    def test_locked_allocation(self):
+        with mock.patch.object(serialbox_settings,
+                               'SEQUENTIAL_ALLOCATION_MODE',
+                               'select_for_update'):
+            self._run()
+
+
+@mock.patch.object(serialbox_settings, 'SEQUENTIAL_LEASE_SIZE', 100)
+@mock.patch.object(serialbox_settings, 'SEQUENTIAL_ALLOCATION_MODE', 'lease')
+class LeaseAllocationTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=1000)
+        self.request = RequestFactory().get('/')
+        leasing.leases._leases = {}
+
+    def tearDown(self):
+        leasing.leases._leases = {}
+
+    def _get_response(self, size):
+        return SequentialGenerator().get_response(self.request, size,
+                                                  'allocpool')
+
+    def _state(self):
+        self.region.refresh_from_db()
+        return self.region.state
+
+    def test_serve_from_lease(self):
+        self.assertEqual(self._get_response(10).get_number_list(), [1, 10])
+        self.assertEqual(self._state(), 101)
+        self.assertEqual(self._get_response(10).get_number_list(), [11, 20])
+        self.assertEqual(self._state(), 101)
+
+    def test_extend_lease(self):
+        self._get_response(95)
+        self.assertEqual(self._get_response(10).get_number_list(),
+                         [96, 105])
+        self.assertEqual(self._state(), 201)
+
+    def test_return_lease(self):
+        self._get_response(10)
+        leasing.leases.release_all()
+        self.assertEqual(self._state(), 11)
+        self.assertEqual(SkippedRange.objects.count(), 0)
+
+    def test_record_skipped_numbers(self):
+        self._get_response(10)
+        # another worker reserves directly after the lease
+        SequentialGenerator()._reserve(mock.Mock(), self.region, 100)
+        leasing.leases.release_all()
+        skipped = SkippedRange.objects.get()
+        self.assertEqual((skipped.first, skipped.last), (11, 100))
+        self.assertEqual(skipped.reason, 'shutdown')
+        self.assertEqual(self._state(), 201)
+
+    def test_expired_lease(self):
+        self._get_response(10)
+        SequentialGenerator()._reserve(mock.Mock(), self.region, 100)
+        with mock.patch.object(serialbox_settings, 'SEQUENTIAL_LEASE_EXPIRY',
+                               0):
+            leasing.leases._leases[self.region.pk].expires = 0
+            response = self._get_response(10)
+        self.assertEqual(response.get_number_list(), [201, 210])
+        skipped = SkippedRange.objects.get()
+        self.assertEqual((skipped.first, skipped.last, skipped.reason),
+                         (11, 100, 'expired'))
+
+    def test_size_limit_counts_unserved_lease(self):
+        SequentialRegion.objects.filter(pk=self.region.pk).update(end=105)
+        capacity.rebuild([self.pool])
+        self.assertEqual(self._get_response(10).get_number_list(), [1, 10])
+        # the pool counter only holds the 5 numbers outside the lease
+        self.assertEqual(capacity.get_remaining(self.pool), 5)
+        self.assertEqual(self._get_response(10).get_number_list(), [11, 20])
+        self.assertEqual(self._get_response(80).get_number_list(),
+                         [21, 100])
+
+    def test_large_request_bypasses_lease(self):
+        self.assertEqual(self._get_response(100).get_number_list(),
+                         [1, 100])
+        self.assertNotIn(self.region.pk, leasing.leases._leases)
+
+    def test_region_tail_is_reserved_directly(self):
+        SequentialGenerator()._reserve(mock.Mock(), self.region, 950)
+        self.assertEqual(self._get_response(10).get_number_list(),
+                         [951, 960])
+        self.assertNotIn(self.region.pk, leasing.leases._leases)
+        self.assertEqual(self._state(), 961)
@@ -0,0 +1,120 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import asyncio
+import base64
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import LiveServerTestCase, RequestFactory, \
+    TransactionTestCase
+from django.urls import reverse
+
+from serialbox.api import async_views
+from serialbox.management.commands.load_test_allocate import percentile
+from serialbox.models import SequentialRegion
+from serialbox.tests.test_allocation import create_pool
+
+
+def run(coroutine):
+    # asyncio.run needs python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def basic_auth(username, password):
+    credentials = '%s:%s' % (username, password)
+    return 'Basic %s' % base64.b64encode(credentials.encode()).decode()
+
+
+class AsyncAllocationTests(TransactionTestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100000, threshold=100000)
+        User.objects.create_superuser('async', 'async@local', 'async')
+        self.factory = RequestFactory()
+
+    def _allocate(self, size=10, password='async', **params):
+        request = self.factory.get(
+            reverse('allocate-numbers-async', args=['allocpool', size]),
+            dict(params, format='json'),
+            HTTP_AUTHORIZATION=basic_auth('async', password))
+        return async_views.allocate(request, pool='allocpool', size=str(size))
+
+    def test_allocate(self):
+        response = run(self._allocate())
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode())
+        self.assertEqual(data['numbers'], '[1, 10]')
+        self.assertEqual(data['size_granted'], 10)
+
+    def test_in_flight(self):
+        async def allocate_all():
+            return await asyncio.gather(*[self._allocate()
+                                          for i in range(20)])
+        responses = run(allocate_all())
+        ranges = sorted(json.loads(json.loads(
+            response.content.decode())['numbers']) for response in responses)
+        self.assertEqual(ranges, [[i, i + 9] for i in range(1, 200, 10)])
+        self.assertEqual(SequentialRegion.objects.get().state, 201)
+
+    def test_errors(self):
+        response = run(self._allocate(password='wrong'))
+        self.assertEqual(response.status_code, 401)
+        response = run(self._allocate(stream='xml'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(SequentialRegion.objects.get().state, 1)
+
+    def test_streamed(self):
+        response = run(self._allocate(size=3, stream='json'))
+        self.assertEqual(b''.join(response.streaming_content), b'[1,2,3]')
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+
+    def setUp(self):
+        create_pool(end=100000, threshold=100000)
+        User.objects.create_superuser('load', 'load@local', 'load')
+
+    def test_wsgi_and_async(self):
+        out = StringIO()
+        targets = [
+            '%s=%s%s' % (name, self.live_server_url,
+                         reverse(url_name, args=['allocpool', 5]))
+            for name, url_name in (('wsgi', 'allocate-numbers'),
+                                   ('async', 'allocate-numbers-async'))
+        ]
+        call_command('load_test_allocate', targets=targets, requests=10,
+                     concurrency=1, username='load', password='load',
+                     stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('wsgi: 10 requests, 0 errors'))
+        self.assertTrue(lines[1].startswith('async: 10 requests, 0 errors'))
+        self.assertEqual(SequentialRegion.objects.get().state, 101)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), 0.0)
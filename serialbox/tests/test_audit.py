@@ -0,0 +1,119 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import time
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, RequestFactory
+
+from serialbox import audit, serialbox_settings
+from serialbox.generators.sequential import SequentialGenerator
+from serialbox.models import Response
+from serialbox.tests.test_allocation import create_pool
+
+
+class SyncAuditTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100)
+        self.request = RequestFactory().get('/')
+
+    def test_response_recorded(self):
+        SequentialGenerator().get_response(self.request, 10, 'allocpool')
+        response = Response.objects.get()
+        self.assertEqual(response.pool, 'allocpool')
+        self.assertEqual(response.region, 'allocpoolr1')
+        self.assertEqual(response.size_granted, 10)
+        self.assertEqual(response.type, 'sequential')
+
+    def test_rolled_back_response_not_recorded(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                SequentialGenerator().get_response(self.request, 10,
+                                                   'allocpool')
+                raise RuntimeError()
+        self.assertFalse(Response.objects.exists())
+
+    @mock.patch.object(serialbox_settings, 'RESPONSE_AUDIT_MODE', 'off')
+    def test_off(self):
+        SequentialGenerator().get_response(self.request, 10, 'allocpool')
+        self.assertFalse(Response.objects.exists())
+
+
+@mock.patch.object(serialbox_settings, 'RESPONSE_AUDIT_MODE', 'async')
+@mock.patch.object(serialbox_settings, 'RESPONSE_AUDIT_FLUSH_INTERVAL', 60)
+class AsyncAuditTests(TransactionTestCase):
+
+    def setUp(self):
+        self.recorder = audit.ResponseRecorder()
+
+    def tearDown(self):
+        self.recorder.shutdown()
+
+    def _response(self):
+        return Response(pool='allocpool', region='allocpoolr1',
+                        size_granted=1, fulfilled=True, type='sequential',
+                        remote_host='testserver')
+
+    def _wait_for(self, count):
+        deadline = time.monotonic() + 10
+        while Response.objects.count() < count and \
+                time.monotonic() < deadline:
+            time.sleep(0.05)
+        return Response.objects.count()
+
+    @mock.patch.object(serialbox_settings, 'RESPONSE_AUDIT_BATCH_SIZE', 3)
+    def test_flush_on_batch_size(self):
+        for i in range(2):
+            self.recorder.record(self._response())
+        time.sleep(0.2)
+        # the thread waits for the interval
+        self.assertEqual(Response.objects.count(), 0)
+        # the request that fills the batch writes it
+        self.recorder.record(self._response())
+        self.assertEqual(Response.objects.count(), 3)
+        self.assertEqual(self.recorder._queue, [])
+
+    @mock.patch.object(serialbox_settings, 'RESPONSE_AUDIT_BATCH_SIZE', 2)
+    def test_queue_bounded_without_thread(self):
+        # as under a server that does not run python threads
+        with mock.patch.object(self.recorder, '_start'):
+            for i in range(5):
+                self.recorder.record(self._response())
+        self.assertEqual(Response.objects.count(), 4)
+        self.assertEqual(len(self.recorder._queue), 1)
+
+    def test_created_at_allocation(self):
+        response = self._response()
+        allocated = response.created_date
+        self.recorder.record(response)
+        time.sleep(0.1)
+        self.recorder.flush()
+        self.assertEqual(Response.objects.get().created_date, allocated)
+
+    def test_flush_on_shutdown(self):
+        self.recorder.record(self._response())
+        self.recorder.shutdown()
+        self.assertEqual(Response.objects.count(), 1)
+
+    def test_queued_after_commit(self):
+        with transaction.atomic():
+            self.recorder.record(self._response())
+            self.assertEqual(self.recorder._queue, [])
+        self.assertEqual(len(self.recorder._queue), 1)
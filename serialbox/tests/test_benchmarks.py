@@ -0,0 +1,64 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from django.test import TestCase
+
+from serialbox.benchmarks import runner
+from serialbox.benchmarks.scenarios import SCENARIOS
+
+
+class BenchmarkScenarioTests(TestCase):
+
+    def test_scenarios(self):
+        results = runner.run(SCENARIOS, iterations=2)
+        self.assertEqual(set(results['scenarios']),
+                         set(runner.load(runner.BASELINE)['scenarios']))
+        for name, result in results['scenarios'].items():
+            self.assertEqual(result['iterations'], 2, name)
+            self.assertGreater(result['grants_per_second'], 0, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'], name)
+            self.assertAlmostEqual(
+                result['numbers_per_second'] / result['size'],
+                result['grants_per_second'], delta=0.01, msg=name)
+
+
+class BenchmarkComparisonTests(TestCase):
+
+    def setUp(self):
+        self.baseline = {'scenarios': {'sequential-1': {
+            'p50_ms': 1.0, 'p99_ms': 2.0, 'grants_per_second': 100.0}}}
+
+    def _results(self, p50, p99, grants):
+        return {'scenarios': {
+            'sequential-1': {'p50_ms': p50, 'p99_ms': p99,
+                             'grants_per_second': grants},
+            'new': {'p50_ms': 10.0, 'p99_ms': 20.0,
+                    'grants_per_second': 1.0},
+        }}
+
+    def test_within_tolerance(self):
+        self.assertEqual(runner.compare(self._results(1.4, 2.9, 70.0),
+                                        self.baseline, 0.5), [])
+
+    def test_regressions(self):
+        failures = runner.compare(self._results(1.6, 3.1, 60.0),
+                                  self.baseline, 0.5)
+        self.assertEqual(len(failures), 3)
+        self.assertTrue(failures[0].startswith('sequential-1: p50_ms'))
+        self.assertTrue(failures[2].startswith(
+            'sequential-1: grants_per_second'))
@@ -0,0 +1,131 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory, override_settings
+
+from serialbox import discovery, serialbox_settings
+from serialbox.generators.registry import registry
+from serialbox.generators.sequential import SequentialGenerator
+from serialbox.rules.limits import ActiveRule, SizeLimitRule, \
+    RequestThresholdLimitRule
+from serialbox.models import Pool, SequentialRegion
+from serialbox.tests.test_allocation import create_pool
+
+
+@mock.patch.object(serialbox_settings, 'METADATA_CACHE_ALIAS', 'default')
+class PoolCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        discovery.pool_cache.invalidate()
+        self.pool, self.region = create_pool(end=100)
+
+    def test_cached_region_lookup(self):
+        pool = discovery.get_pool('allocpool')
+        discovery.get_region(pool)
+        with self.assertNumQueries(1):
+            self.assertEqual(discovery.get_pool('allocpool'), self.pool)
+            self.assertEqual(discovery.get_region(pool), self.region)
+
+    def test_cached_allocation(self):
+        generator = SequentialGenerator()
+        generator.preprocessing_rules = []
+        request = RequestFactory().get('/')
+        generator.get_response(request, 10, 'allocpool')
+        # one region fetch plus the reservation update, read back and pool
+        # counter update inside a savepoint, then the audit record
+        with self.assertNumQueries(7):
+            discovery.get_generator('allocpool')
+            response = generator.get_response(request, 10, 'allocpool')
+        self.assertEqual(response.get_number_list(), [11, 20])
+
+    def test_invalidate_on_save(self):
+        discovery.get_pool('allocpool')
+        Pool.objects.filter(pk=self.pool.pk).update(active=False)
+        self.assertIsNotNone(discovery.get_pool('allocpool'))
+        self.pool.active = False
+        self.pool.save()
+        self.assertIsNone(discovery.get_pool('allocpool'))
+
+    def test_invalidate_on_new_region(self):
+        discovery.get_region_refs(self.pool)
+        region = SequentialRegion.objects.create(
+            readable_name='allocpool region 2',
+            machine_name='allocpoolr2',
+            order=2,
+            start=1001,
+            end=2000,
+            pool=self.pool
+        )
+        self.assertEqual(len(discovery.get_region_refs(self.pool)), 2)
+        # deactivated elsewhere without a signal
+        SequentialRegion.objects.filter(pk=self.region.pk).update(
+            active=False)
+        self.assertEqual(discovery.get_region(self.pool), region)
+
+    def test_invalidate_on_exhausted_region(self):
+        discovery.get_region(self.pool)
+        SequentialGenerator().get_response(RequestFactory().get('/'), 100,
+                                           'allocpool')
+        self.assertEqual(discovery.get_region_refs(self.pool), [])
+
+    def test_generation_change(self):
+        '''
+        Another process bumping the generation drops the local entries.
+        '''
+        discovery.get_pool('allocpool')
+        Pool.objects.filter(pk=self.pool.pk).update(active=False)
+        cache.incr(discovery.pool_cache.key)
+        self.assertIsNone(discovery.get_pool('allocpool'))
+
+
+class GeneratorRegistryTests(TestCase):
+
+    def tearDown(self):
+        registry.reload()
+
+    def test_rules_loaded_once(self):
+        SequentialGenerator()
+        with mock.patch('serialbox.rules.importlib.import_module') as \
+                import_module:
+            generator = SequentialGenerator()
+        import_module.assert_not_called()
+        self.assertEqual([rule.__class__ for rule in
+                          generator.preprocessing_rules],
+                         [ActiveRule, SizeLimitRule,
+                          RequestThresholdLimitRule])
+
+    def test_reload_on_setting_change(self):
+        SequentialGenerator()
+        with override_settings(GENERATOR_PREPROCESSING_RULES={
+            'default': ['serialbox.rules.limits.ActiveRule']
+        }):
+            generator = SequentialGenerator()
+            self.assertEqual([rule.__class__ for rule in
+                              generator.preprocessing_rules], [ActiveRule])
+        self.assertEqual(len(SequentialGenerator().preprocessing_rules), 3)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_generators', iterations=10, stdout=out)
+        self.assertIn('With the registry', out.getvalue())
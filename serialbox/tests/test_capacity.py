@@ -0,0 +1,108 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from serialbox import capacity
+from serialbox.generators.sequential import SequentialGenerator
+from serialbox.models import Pool, SequentialRegion
+from serialbox.rules.errors import SizeLimitRuleError
+from serialbox.tests.test_allocation import create_pool
+
+
+class PoolCapacityTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100)
+
+    def _remaining(self):
+        return capacity.get_remaining(self.pool)
+
+    def test_region_changes(self):
+        self.assertEqual(self._remaining(), 100)
+        second = SequentialRegion.objects.create(
+            readable_name='second', machine_name='allocpoolr2', order=2,
+            start=101, end=150, pool=self.pool)
+        self.assertEqual(self._remaining(), 150)
+        second.end = 160
+        second.save()
+        self.assertEqual(self._remaining(), 160)
+        second.active = False
+        second.save()
+        self.assertEqual(self._remaining(), 100)
+        second.active = True
+        second.save()
+        second.delete()
+        self.assertEqual(self._remaining(), 100)
+
+    def test_allocation(self):
+        generator = SequentialGenerator()
+        request = RequestFactory().get('/')
+        generator.get_response(request, 10, self.pool.machine_name)
+        self.assertEqual(self._remaining(), 90)
+        # the size limit rule reads the counter
+        with self.assertRaises(SizeLimitRuleError):
+            generator.get_response(request, 91, self.pool.machine_name)
+        generator.get_response(request, 90, self.pool.machine_name)
+        self.assertEqual(self._remaining(), 0)
+
+    def test_save_keeps_counter(self):
+        pool = Pool.objects.get(pk=self.pool.pk)
+        SequentialGenerator().get_response(RequestFactory().get('/'), 10,
+                                           'allocpool')
+        # a full save of the copy loaded before the allocation
+        pool.readable_name = 'renamed'
+        pool.save()
+        self.assertEqual(self._remaining(), 90)
+        self.assertEqual(Pool.objects.get(pk=pool.pk).readable_name,
+                         'renamed')
+
+    def test_api_update_keeps_counter(self):
+        user = User.objects.create_superuser('pools', 'pools@local', 'pools')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.put(reverse('pool-modify', args=['allocpool']),
+                              {'readable_name': 'renamed',
+                               'remaining': 5}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['remaining'], 100)
+        self.assertEqual(self._remaining(), 100)
+
+    def test_rebuild(self):
+        Pool.objects.filter(pk=self.pool.pk).update(remaining=12345)
+        out = StringIO()
+        call_command('rebuild_pool_capacity', pool=['allocpool'], stdout=out)
+        self.assertEqual(self._remaining(), 100)
+        self.assertIn('allocpool: 100 remaining', out.getvalue())
+
+    def test_capacity_endpoint(self):
+        user = User.objects.create_user('capacity', password='capacity')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = reverse('pool-capacity', args=['allocpool'])
+        with self.assertNumQueries(1):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'machine_name': 'allocpool',
+                                         'remaining': 100})
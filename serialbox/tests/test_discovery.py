@@ -0,0 +1,124 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from unittest import mock
+
+from django.test import TestCase
+
+from serialbox import discovery
+from serialbox.models import ListRegion, RandomizedRegion, \
+    SequentialRegion
+from serialbox.tests.test_allocation import create_pool
+
+
+class RegionDiscoveryTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100)
+        self.region2 = SequentialRegion.objects.create(
+            readable_name='allocpool region 2',
+            machine_name='allocpoolr2',
+            order=2,
+            start=201,
+            end=300,
+            pool=self.pool
+        )
+
+    def test_region_models_computed_once(self):
+        discovery.get_all_regions()
+        with mock.patch.object(discovery.apps, 'get_models') as get_models:
+            self.assertEqual(discovery.get_all_regions(),
+                             [SequentialRegion, RandomizedRegion,
+                              ListRegion])
+        get_models.assert_not_called()
+
+    def test_get_region_single_query(self):
+        '''
+        With a single Region model the region is fetched directly.
+        '''
+        with mock.patch.object(discovery, 'get_all_regions',
+                               return_value=[SequentialRegion]):
+            with self.assertNumQueries(1):
+                self.assertEqual(discovery.get_region(self.pool),
+                                 self.region)
+
+    def test_get_region_mixed(self):
+        random_region = RandomizedRegion.objects.create(
+            readable_name='random', machine_name='random', order=2,
+            min=1, max=100, pool=self.pool)
+        SequentialRegion.objects.filter(pk=self.region2.pk).update(order=3)
+        with self.assertNumQueries(2):
+            self.assertEqual(discovery.get_region(self.pool), self.region)
+        self.region.active = False
+        self.region.save()
+        self.assertEqual(discovery.get_region(self.pool), random_region)
+
+    def test_get_region_union(self):
+        '''
+        With several Region models the lowest order region is found with
+        one UNION query and then fetched.
+        '''
+        SequentialRegion.objects.filter(pk=self.region.pk).update(
+            active=False)
+        with mock.patch.object(discovery, 'get_all_regions',
+                               return_value=[SequentialRegion,
+                                             SequentialRegion]):
+            with self.assertNumQueries(2):
+                self.assertEqual(discovery.get_region(self.pool),
+                                 self.region2)
+
+    def test_active_region_refs(self):
+        with self.assertNumQueries(1):
+            refs = discovery.get_active_region_refs(self.pool)
+        self.assertEqual(refs, [(SequentialRegion, self.region.pk),
+                                (SequentialRegion, self.region2.pk)])
+
+
+class RegionNameRegistryTests(TestCase):
+
+    def setUp(self):
+        discovery.region_names.clear()
+        self.pool, self.region = create_pool(end=100)
+
+    def test_lookup_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(discovery.region_names.get('allocpoolr1'),
+                             self.region)
+        self.assertIsNone(discovery.region_names.get('missing'))
+
+    def test_lookup_union(self):
+        discovery.region_names.clear()
+        with mock.patch.object(discovery, 'get_all_regions',
+                               return_value=[SequentialRegion,
+                                             SequentialRegion]):
+            with self.assertNumQueries(2):
+                self.assertEqual(discovery.region_names.get('allocpoolr1'),
+                                 self.region)
+            # the registry now knows the model and key
+            with self.assertNumQueries(1):
+                self.assertEqual(discovery.region_names.get('allocpoolr1'),
+                                 self.region)
+
+    def test_stale_entries(self):
+        # renamed behind the registry's back
+        SequentialRegion.objects.filter(pk=self.region.pk).update(
+            machine_name='renamed')
+        self.assertIsNone(discovery.region_names.get('allocpoolr1'))
+        self.assertEqual(discovery.region_names.get('renamed'), self.region)
+        self.region.delete()
+        self.assertIsNone(discovery.region_names.get('renamed'))
@@ -0,0 +1,115 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from serialbox import encoding
+from serialbox.models import Response
+from serialbox.tests.test_allocation import create_pool
+
+
+class EncodingTests(SimpleTestCase):
+
+    def test_encode(self):
+        self.assertEqual(encoding.encode(1000, 'base-36'), 'RS')
+        self.assertEqual(encoding.encode(1000, 'base-36', 6), '0000RS')
+        self.assertEqual(encoding.encode(255, 'hex'), 'FF')
+        self.assertEqual(encoding.encode(7, 'decimal', 3), '007')
+        self.assertEqual(encoding.encode(0, 'base-36'), '0')
+        # never truncated
+        self.assertEqual(encoding.encode(1000, 'decimal', 2), '1000')
+
+    def test_decode(self):
+        for name in encoding.BASES:
+            for number in (0, 35, 36, 10 ** 15, 2 ** 64):
+                self.assertEqual(
+                    encoding.decode(encoding.encode(number, name, 20), name),
+                    number)
+
+    def test_encode_many(self):
+        numbers = list(range(10 ** 12, 10 ** 12 + 5000)) + [0, 1]
+        for name in encoding.BASES:
+            for width in (None, 1, 10):
+                expected = [encoding.encode(n, name, width) for n in numbers]
+                self.assertEqual(encoding.encode_many(numbers, name, width),
+                                 expected)
+                with mock.patch.object(encoding, 'numpy', None):
+                    self.assertEqual(
+                        encoding.encode_many(numbers, name, width), expected)
+
+    def test_encode_many_non_integers(self):
+        for numbers in (['1'] * 100, [1.5] * 100, list(range(99)) + ['99'],
+                        ['1'], [1.0]):
+            self.assertRaises(ValueError, encoding.encode_many, numbers)
+            with mock.patch.object(encoding, 'numpy', None):
+                self.assertRaises(ValueError, encoding.encode_many, numbers)
+
+    def test_number_list(self):
+        self.assertEqual(encoding.encode_number_list([1, 10], 'hex', 4),
+                         ['0001', '000A'])
+        self.assertEqual(
+            encoding.encode_number_list([[1, 10], [35, 36]], 'base-36'),
+            [['1', 'A'], ['Z', '10']])
+        self.assertEqual(encoding.encode_number_list([1, 10], 'decimal'),
+                         [1, 10])
+
+
+class EncodedAllocationTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100000, threshold=100000)
+        user = User.objects.create_superuser('encode', 'encode@local',
+                                             'encode')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.url = reverse('allocate-numbers', args=['allocpool', '40'])
+
+    def test_sequential(self):
+        response = self.client.get(self.url, {'format': 'json',
+                                              'encoding': 'base-36',
+                                              'width': '4'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['numbers'], "['0001', '0014']")
+        self.assertEqual(response.data['encoding'], 'base-36')
+        self.assertEqual(Response.objects.get().encoding, 'base-36')
+
+    def test_streamed(self):
+        response = self.client.get(self.url, {'stream': 'json',
+                                              'encoding': 'hex'})
+        numbers = json.loads(b''.join(response.streaming_content).decode())
+        self.assertEqual(numbers, [format(n, 'X') for n in range(1, 41)])
+
+    def test_invalid(self):
+        for params in ({'encoding': 'base-64'}, {'width': '0'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_batch(self):
+        response = self.client.post(
+            reverse('allocate-batch'),
+            [{'pool': 'allocpool', 'size': 16, 'encoding': 'hex'}],
+            format='json')
+        self.assertEqual(response.data[0]['numbers'], "['1', '10']")
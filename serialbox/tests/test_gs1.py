@@ -0,0 +1,140 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from serialbox import gs1
+from serialbox.errors import GS1FormatException
+from serialbox.models import GS1Configuration, Response, SequentialRegion
+from serialbox.tests.test_allocation import create_pool
+
+
+class GS1FormatterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.configuration = GS1Configuration(
+            company_prefix='0614141', indicator='8', item_reference='12345',
+            extension_digit='1')
+
+    def _formatter(self, gs1_format):
+        return gs1.GS1Formatter(self.configuration, gs1_format)
+
+    def test_check_digit(self):
+        self.assertEqual(gs1.check_digit('8061414112345'), 8)
+        self.assertEqual(gs1.check_digit('10614141123456789'), 7)
+        self.assertEqual(gs1.check_digit('0'), 0)
+
+    def test_formats(self):
+        expected = {
+            'sgtin-urn': 'urn:epc:id:sgtin:0614141.812345.400',
+            'sgtin-element': '(01)80614141123458(21)400',
+            'sscc': '106141411234567897',
+            'sscc-urn': 'urn:epc:id:sscc:0614141.1123456789',
+        }
+        for gs1_format, value in expected.items():
+            number = 123456789 if gs1_format.startswith('sscc') else 400
+            self.assertEqual(
+                self._formatter(gs1_format).format_many([number]), [value])
+
+    def test_vectorised(self):
+        numbers = list(range(999990000, 1000000000)) + [0, 7]
+        for gs1_format in ('sscc', 'sscc-urn'):
+            formatter = self._formatter(gs1_format)
+            expected = [formatter._format_sscc(n) for n in numbers]
+            self.assertEqual(formatter.format_many(numbers), expected)
+            with mock.patch.object(gs1, 'numpy', None):
+                self.assertEqual(formatter.format_many(numbers), expected)
+        for value in self._formatter('sscc').format_many(numbers):
+            self.assertEqual(len(value), 18)
+            self.assertEqual(int(value[-1]), gs1.check_digit(value[:-1]))
+
+    def test_sgtin_encoding(self):
+        self.assertEqual(
+            self._formatter('sgtin-urn').format_many([255], 'hex', 4),
+            ['urn:epc:id:sgtin:0614141.812345.00FF'])
+
+    def test_serial_reference_too_large(self):
+        formatter = self._formatter('sscc')
+        for numbers in ([10 ** 9], [-1], ['SN1']):
+            with self.assertRaises(GS1FormatException):
+                formatter.format_many(numbers)
+            with mock.patch.object(gs1, 'numpy', None):
+                with self.assertRaises(GS1FormatException):
+                    formatter.format_many(numbers)
+
+
+class GS1AllocationTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100000, threshold=100000)
+        GS1Configuration.objects.create(
+            pool=self.pool, company_prefix='0614141', indicator='8',
+            item_reference='12345', extension_digit='1')
+        user = User.objects.create_superuser('gs1', 'gs1@local', 'gs1')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.url = reverse('allocate-numbers', args=['allocpool', '3'])
+
+    def test_sequential_range_expanded(self):
+        response = self.client.get(self.url, {'format': 'json',
+                                              'gs1': 'sgtin-urn'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['numbers'],
+            str(['urn:epc:id:sgtin:0614141.812345.%s' % n
+                 for n in range(1, 4)]))
+        self.assertEqual(Response.objects.get().size_granted, 3)
+
+    def test_streamed(self):
+        response = self.client.get(self.url, {'stream': 'json',
+                                              'gs1': 'sscc'})
+        numbers = json.loads(b''.join(response.streaming_content).decode())
+        self.assertEqual(numbers[0], '106141410000000019')
+        self.assertEqual(len(numbers), 3)
+
+    def test_batch(self):
+        response = self.client.post(
+            reverse('allocate-batch'),
+            [{'pool': 'allocpool', 'size': 2, 'gs1': 'sscc-urn'}],
+            format='json')
+        self.assertEqual(
+            response.data[0]['numbers'],
+            str(['urn:epc:id:sscc:0614141.1000000001',
+                 'urn:epc:id:sscc:0614141.1000000002']))
+
+    def test_invalid(self):
+        GS1Configuration.objects.filter(pool=self.pool).update(
+            item_reference='')
+        for params in ({'gs1': 'gtin'},
+                       {'gs1': 'sscc', 'encoding': 'hex'},
+                       {'gs1': 'sgtin-urn'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+        GS1Configuration.objects.all().delete()
+        response = self.client.get(self.url, {'gs1': 'sscc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # nothing was allocated
+        self.assertEqual(SequentialRegion.objects.get().state, 1)
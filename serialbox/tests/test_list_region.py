@@ -0,0 +1,216 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.test import SimpleTestCase, TestCase, RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from serialbox import capacity, discovery, listfiles, serialbox_settings
+from serialbox.generators.list import ListGenerator
+from serialbox.models import ListRegion, Pool
+
+
+class ListDirectoryMixin(object):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(serialbox_settings, 'LIST_REGION_ROOT',
+                                    self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super(ListDirectoryMixin, self).setUp()
+
+
+class ListFileTests(ListDirectoryMixin, SimpleTestCase):
+
+    def test_round_trip(self):
+        path = listfiles.get_path('serials.sbl')
+        values = ['SN%06d' % i for i in range(25000)] + ['X']
+        self.assertEqual(listfiles.write_list_file(path, iter(values), 8),
+                         25001)
+        self.assertEqual(os.path.getsize(path),
+                         listfiles.HEADER.size + 8 * 25001)
+        list_file = listfiles.get_list_file('serials.sbl')
+        self.assertEqual((list_file.width, list_file.count), (8, 25001))
+        self.assertEqual(list_file.read(24998, 3),
+                         ['SN024998', 'SN024999', 'X'])
+        self.assertEqual(bytes(list_file.slice(1, 1)), b'SN000001')
+        with mock.patch.object(listfiles, 'numpy', None):
+            self.assertEqual(list_file.read(0, 25001), values)
+        with self.assertRaises(IndexError):
+            list_file.read(25000, 2)
+
+    def test_mapped_once(self):
+        path = listfiles.get_path('serials.sbl')
+        listfiles.write_list_file(path, ['1', '2'], 1)
+        first = listfiles.get_list_file('serials.sbl')
+        self.assertIs(listfiles.get_list_file('serials.sbl'), first)
+        listfiles.write_list_file(path, ['3', '4', '5'], 1)
+        second = listfiles.get_list_file('serials.sbl')
+        self.assertIsNot(second, first)
+        self.assertEqual(second.read(0, 3), ['3', '4', '5'])
+
+    def test_invalid_values(self):
+        path = listfiles.get_path('serials.sbl')
+        for value in ('', 'TOOLONG', 'caf\xe9'):
+            with self.assertRaises(listfiles.ListFileError):
+                listfiles.write_list_file(path, ['OK', value], 4)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_damaged_file(self):
+        path = listfiles.get_path('serials.sbl')
+        listfiles.write_list_file(path, ['1', '2'], 1)
+        with open(path, 'ab') as f:
+            f.write(b'3')
+        with self.assertRaises(listfiles.ListFileError):
+            listfiles.get_list_file('serials.sbl')
+
+
+class ListGeneratorTests(ListDirectoryMixin, TestCase):
+
+    def setUp(self):
+        super(ListGeneratorTests, self).setUp()
+        listfiles.write_list_file(
+            listfiles.get_path('partner.sbl'),
+            ('urn:%04d' % i for i in range(1000)), 8)
+        self.pool = Pool.objects.create(readable_name='list',
+                                        machine_name='listpool',
+                                        request_threshold=100000)
+        self.region = ListRegion.objects.create(
+            readable_name='list region', machine_name='listr1',
+            file_path='partner.sbl', pool=self.pool)
+        self.request = RequestFactory().get('/')
+        self.generator = ListGenerator()
+
+    def _allocate(self, size, **kwargs):
+        return self.generator.get_response(self.request, size, 'listpool',
+                                           **kwargs)
+
+    def test_new_region(self):
+        self.assertEqual((self.region.count, self.region.current,
+                          self.region.remaining), (1000, 0, 1000))
+        self.assertEqual(capacity.get_remaining(self.pool), 1000)
+        self.assertIsInstance(discovery.get_generator('listpool'),
+                              ListGenerator)
+
+    def test_in_order_until_exhausted(self):
+        numbers = []
+        for size in (300, 300, 400):
+            response = self._allocate(size)
+            self.assertEqual(response.type, 'list')
+            numbers += response.get_number_list()
+        self.assertEqual(numbers, ['urn:%04d' % i for i in range(1000)])
+        region = ListRegion.objects.get(pk=self.region.pk)
+        self.assertEqual((region.current, region.remaining), (1000, 0))
+        self.assertFalse(region.active)
+        self.assertEqual(capacity.get_remaining(self.pool), 0)
+
+    def test_partial(self):
+        self.generator.preprocessing_rules = []
+        self._allocate(900)
+        response = self._allocate(200)
+        self.assertFalse(response.fulfilled)
+        self.assertEqual(response.get_number_list()[-1], 'urn:0999')
+        self.assertEqual(len(response.get_number_list()), 100)
+
+    def test_encoding_ignored(self):
+        response = self._allocate(2, encoding='hex', width=12)
+        self.assertEqual(response.encoding, 'decimal')
+        self.assertEqual(response.get_number_list(), ['urn:0000',
+                                                      'urn:0001'])
+
+
+class ListStreamingTests(ListDirectoryMixin, TestCase):
+
+    def setUp(self):
+        super(ListStreamingTests, self).setUp()
+        self.values = ['A1', '000123', 'say "hi"', '42']
+        listfiles.write_list_file(listfiles.get_path('stream.sbl'),
+                                  self.values, 8)
+        pool = Pool.objects.create(readable_name='list',
+                                   machine_name='listpool',
+                                   request_threshold=100000)
+        ListRegion.objects.create(readable_name='list region',
+                                  machine_name='listr1',
+                                  file_path='stream.sbl', pool=pool)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(
+            'lists', 'lists@local', 'lists'))
+        self.url = reverse('allocate-numbers', args=['listpool', 4])
+
+    def test_stream_json(self):
+        response = self.client.get(self.url, {'stream': 'json'})
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content).decode()),
+            self.values)
+
+    def test_stream_ndjson(self):
+        response = self.client.get(self.url, {'stream': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.values)
+
+
+class ImportListRegionTests(ListDirectoryMixin, TestCase):
+
+    def setUp(self):
+        super(ImportListRegionTests, self).setUp()
+        self.csv_file = os.path.join(self.directory, 'partner.csv')
+        with open(self.csv_file, 'w') as f:
+            f.write('gtin,serial\n')
+            for i in range(5000):
+                f.write('00312345678906,SN%d\n' % i)
+            f.write('\n')
+        self.pool = Pool.objects.create(readable_name='list',
+                                        machine_name='listpool')
+
+    def test_import(self):
+        out = StringIO()
+        call_command('import_list_region', self.csv_file, 'partner.sbl',
+                     column=1, skip_header=True, pool='listpool',
+                     machine_name='partner1', stdout=out)
+        region = ListRegion.objects.get(machine_name='partner1')
+        self.assertEqual((region.count, region.remaining), (5000, 5000))
+        list_file = listfiles.get_list_file(region.file_path)
+        # the width defaults to the longest serial number
+        self.assertEqual(list_file.width, 6)
+        self.assertEqual(list_file.read(4998, 2), ['SN4998', 'SN4999'])
+        self.assertIn('Created list region partner1', out.getvalue())
+
+    def test_errors(self):
+        with self.assertRaises(CommandError):
+            call_command('import_list_region', self.csv_file, 'partner.sbl',
+                         column=1, skip_header=True, width=4,
+                         stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('import_list_region', self.csv_file, 'partner.sbl',
+                         column=2, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('import_list_region', self.csv_file, 'partner.sbl',
+                         pool='nopool', machine_name='partner1',
+                         stdout=StringIO())
+        self.assertFalse(ListRegion.objects.exists())
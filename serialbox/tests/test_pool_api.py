@@ -0,0 +1,89 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from serialbox.models import RandomizedRegion, SequentialRegion
+from serialbox.tests.test_allocation import create_pool
+
+
+class PoolListQueryTests(APITestCase):
+
+    def setUp(self):
+        user = User.objects.create_superuser('pools', 'pools@local', 'pools')
+        self.client.force_authenticate(user=user)
+
+    def create_pools(self, first, last):
+        for i in range(first, last):
+            pool, region = create_pool('pool%s' % i)
+            SequentialRegion.objects.create(
+                readable_name='pool%s region 2' % i,
+                machine_name='pool%sr2' % i, order=2, start=2000001,
+                end=3000000, pool=pool, active=False)
+            RandomizedRegion.objects.create(
+                readable_name='pool%s random' % i,
+                machine_name='pool%srandom' % i, order=3, min=1, max=100,
+                pool=pool)
+
+    def count_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('pool-list'),
+                                       dict(params, format='json'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def test_constant_queries(self):
+        self.create_pools(0, 2)
+        few, data = self.count_queries()
+        self.create_pools(2, 40)
+        many, data = self.count_queries()
+        self.assertEqual(few, many)
+        self.assertEqual(len(data['results']), 20)
+        pool = data['results'][0]
+        self.assertEqual(pool['active_regions'], 2)
+        self.assertEqual(sorted(pool['sequentialregion_set']),
+                         [pool['machine_name'] + 'r1',
+                          pool['machine_name'] + 'r2'])
+
+    def test_constant_queries_related(self):
+        self.create_pools(0, 2)
+        few, data = self.count_queries(related='true')
+        self.create_pools(2, 40)
+        many, data = self.count_queries(related='true')
+        self.assertEqual(few, many)
+        pool = data['results'][0]
+        self.assertEqual(len(pool['sequentialregion_set']), 2)
+        # inherited from PoolSerializer, read from the annotation
+        self.assertEqual(pool['active_regions'], 2)
+
+    def test_detail(self):
+        self.create_pools(0, 1)
+        response = self.client.get(reverse('pool-detail', args=['pool0']),
+                                   {'format': 'json'})
+        self.assertEqual(response.data['active_regions'], 2)
+
+    def test_created_pool(self):
+        response = self.client.post(reverse('pool-create'), {
+            'readable_name': 'new', 'machine_name': 'new',
+            'request_threshold': 1000}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['active_regions'], 0)
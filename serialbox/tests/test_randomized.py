@@ -0,0 +1,126 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, RequestFactory
+
+from serialbox import capacity, discovery
+from serialbox.generators import feistel
+from serialbox.generators.errors import NoRegionException
+from serialbox.generators.randomized import RandomizedGenerator
+from serialbox.models import Pool, RandomizedRegion
+
+
+class FeistelPermutationTests(SimpleTestCase):
+
+    def test_bijection(self):
+        for size in (1, 2, 3, 17, 1000, 4097):
+            permutation = feistel.FeistelPermutation(size, 'key')
+            values = permutation.permute_many(0, size)
+            self.assertEqual(sorted(values), list(range(size)))
+            self.assertEqual(values, [permutation.permute(i)
+                                      for i in range(size)])
+
+    def test_python_fallback(self):
+        permutation = feistel.FeistelPermutation(2 ** 63 - 1, 7)
+        expected = permutation.permute_many(10 ** 12, 500)
+        with mock.patch.object(feistel, 'numpy', None):
+            self.assertEqual(permutation.permute_many(10 ** 12, 500),
+                             expected)
+
+    def test_keyed(self):
+        first = feistel.FeistelPermutation(10 ** 6, 1).permute_many(0, 100)
+        second = feistel.FeistelPermutation(10 ** 6, 2).permute_many(0, 100)
+        self.assertNotEqual(first, second)
+        self.assertNotEqual(first, sorted(first))
+
+    def test_bounds(self):
+        permutation = feistel.FeistelPermutation(10, 1)
+        with self.assertRaises(IndexError):
+            permutation.permute(10)
+        with self.assertRaises(IndexError):
+            permutation.permute_many(5, 6)
+
+
+class RandomizedGeneratorTests(TestCase):
+
+    def setUp(self):
+        self.pool = Pool.objects.create(readable_name='random',
+                                        machine_name='randompool',
+                                        request_threshold=100000)
+        self.region = RandomizedRegion.objects.create(
+            readable_name='random region', machine_name='randomr1',
+            min=1000, max=1999, pool=self.pool)
+        self.request = RequestFactory().get('/')
+        self.generator = RandomizedGenerator()
+
+    def _allocate(self, size):
+        return self.generator.get_response(self.request, size, 'randompool')
+
+    def test_new_region(self):
+        self.assertEqual(self.region.current, 0)
+        self.assertEqual(self.region.remaining, 1000)
+        self.assertTrue(1000 <= self.region.start <= 1999)
+        self.assertEqual(capacity.get_remaining(self.pool), 1000)
+        self.assertIsInstance(
+            discovery.get_generator('randompool'), RandomizedGenerator)
+
+    def test_unique_until_exhausted(self):
+        numbers = []
+        for size in (300, 300, 400):
+            response = self._allocate(size)
+            self.assertEqual(response.type, 'random')
+            self.assertEqual(len(response.get_number_list()), size)
+            numbers += response.get_number_list()
+        self.assertEqual(sorted(numbers), list(range(1000, 2000)))
+        region = RandomizedRegion.objects.get(pk=self.region.pk)
+        self.assertEqual((region.current, region.remaining), (1000, 0))
+        self.assertFalse(region.active)
+        self.assertEqual(capacity.get_remaining(self.pool), 0)
+
+    def test_partial(self):
+        self.generator.preprocessing_rules = []
+        self._allocate(900)
+        response = self._allocate(200)
+        self.assertFalse(response.fulfilled)
+        self.assertEqual(response.size_granted, 100)
+        self.assertEqual(len(response.get_number_list()), 100)
+        with self.assertRaises(Exception):
+            self._allocate(1)
+
+    def test_single_counter_update(self):
+        region = RandomizedRegion.objects.create(
+            readable_name='large', machine_name='randomr2', order=5,
+            min=1, max=10 ** 12, pool=self.pool)
+        self.generator.preprocessing_rules = []
+        self.generator.pool = self.pool
+        # the counter update and read back and the pool counter inside a
+        # savepoint, then the audit record
+        with self.assertNumQueries(6):
+            response = self.generator.allocate(self.request, 50000,
+                                               self.pool, region)
+        numbers = response.get_number_list()
+        self.assertEqual(len(set(numbers)), 50000)
+        self.assertTrue(all(1 <= n <= 10 ** 12 for n in numbers))
+
+    def test_exhausted_region(self):
+        RandomizedRegion.objects.filter(pk=self.region.pk).update(
+            current=1000, remaining=0)
+        with self.assertRaises(NoRegionException):
+            self.generator._reserve(None, self.region, 1)
@@ -0,0 +1,178 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from quartet_capture.models import Rule, Step as DBStep, Task, TaskParameter
+from quartet_capture.rules import Step, Rule as QuartetRule
+from rest_framework.test import APIClient
+
+from serialbox import discovery, serialbox_settings
+from serialbox.models import ResponseRule
+from serialbox.rules import steps
+from serialbox.tests.test_allocation import create_pool
+
+
+class EchoStep(Step):
+    '''
+    Returns the numbers it is given as the rule data.
+    '''
+
+    def execute(self, data, rule_context):
+        return {'echo': data}
+
+    @property
+    def declared_parameters(self):
+        return {}
+
+    def on_failure(self):
+        pass
+
+
+class FailingStep(EchoStep):
+
+    def execute(self, data, rule_context):
+        raise ValueError('failed')
+
+
+class ResponseRuleAllocationTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=1000)
+        self.rule = Rule.objects.create(name='echo')
+        self.step = DBStep.objects.create(
+            name='echo', rule=self.rule, order=1,
+            step_class='serialbox.tests.test_response_rules.EchoStep')
+        ResponseRule.objects.create(pool=self.pool, rule=self.rule,
+                                    content_type='json')
+        user = User.objects.create_superuser('rules', 'rules@local', 'rules')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.url = reverse('allocate-numbers', args=['allocpool', '10'])
+
+    def test_rule_response(self):
+        response = self.client.get(self.url, {'format': 'json', 'a': 'b'})
+        self.assertEqual(response.data, {'echo': [1, 10]})
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.STATUS.FINISHED)
+        self.assertEqual(
+            dict(TaskParameter.objects.filter(task=task).values_list(
+                'name', 'value')),
+            {'source': 'serialbox-allocate', 'pool': 'allocpool',
+             'size': '10', 'format': 'json', 'a': 'b'})
+
+    def test_rule_failure(self):
+        self.step.step_class = \
+            'serialbox.tests.test_response_rules.FailingStep'
+        self.step.save()
+        with self.assertRaises(ValueError):
+            self.client.get(self.url, {'format': 'json'})
+        self.assertEqual(Task.objects.get().status, Task.STATUS.FAILED)
+
+    def test_query_count(self):
+        '''
+        The statements per rule-backed allocation do not depend on the
+        number of task parameters: 13 for the allocation and its audit
+        record, 1 for the response rule and its rule, 1 for the task, 1 for
+        all of the task parameters, 5 to load and run the rule (the rule
+        with its parameters, steps and step parameters and the task message
+        the rule writes) and 1 to save the task status.
+        '''
+        with self.assertNumQueries(22):
+            self.client.get(self.url, {'format': 'json'})
+        with self.assertNumQueries(22):
+            self.client.get(self.url, {'format': 'json', 'a': 'b', 'c': 'd'})
+
+
+@mock.patch.object(serialbox_settings, 'METADATA_CACHE_ALIAS', 'default')
+class ResponseRuleCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        discovery.response_rule_cache.invalidate()
+        self.pool, self.region = create_pool(end=1000)
+        self.rule = Rule.objects.create(name='echo')
+
+    def test_miss_cached(self):
+        self.assertIsNone(discovery.get_response_rule(self.pool, 'json'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(discovery.get_response_rule(self.pool, 'json'))
+
+    def test_hit(self):
+        response_rule = ResponseRule.objects.create(
+            pool=self.pool, rule=self.rule, content_type='json')
+        self.assertEqual(discovery.get_response_rule(self.pool, 'json'),
+                         response_rule)
+        # only the rule itself is fetched, by primary key
+        with self.assertNumQueries(1):
+            ret = discovery.get_response_rule(self.pool, 'json')
+            self.assertEqual(ret.rule, self.rule)
+        self.assertIsNone(discovery.get_response_rule(self.pool, 'xml'))
+
+    def test_invalidated(self):
+        self.assertIsNone(discovery.get_response_rule(self.pool, 'json'))
+        response_rule = ResponseRule.objects.create(
+            pool=self.pool, rule=self.rule, content_type='json')
+        self.assertEqual(discovery.get_response_rule(self.pool, 'json'),
+                         response_rule)
+        response_rule.delete()
+        self.assertIsNone(discovery.get_response_rule(self.pool, 'json'))
+
+
+@mock.patch.object(serialbox_settings, 'METADATA_CACHE_ALIAS', 'default')
+class CompiledRuleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        steps.rule_cache.invalidate()
+        self.rule = Rule.objects.create(name='echo')
+        self.step = DBStep.objects.create(
+            name='echo', rule=self.rule, order=1,
+            step_class='serialbox.tests.test_response_rules.EchoStep')
+
+    def _execute(self):
+        task = Task.objects.create(rule=self.rule)
+        return steps.execute_rule_inline([1, 10], task).data
+
+    def test_compiled_once(self):
+        self.assertEqual(self._execute(), {'echo': [1, 10]})
+        with mock.patch.object(steps, 'locate') as locate:
+            self.assertEqual(self._execute(), {'echo': [1, 10]})
+        locate.assert_not_called()
+        # the task insert, the rule's task message and the status update
+        with self.assertNumQueries(3):
+            self._execute()
+
+    def test_invalidated(self):
+        self._execute()
+        self.step.step_class = \
+            'serialbox.tests.test_response_rules.FailingStep'
+        self.step.save()
+        with self.assertRaises(ValueError):
+            self._execute()
+
+    def test_missing_step_class(self):
+        self.step.step_class = 'serialbox.tests.NoSuchStep'
+        self.step.save()
+        with self.assertRaises(QuartetRule.StepNotFound):
+            self._execute()
+        self.assertIsNone(steps.rule_cache.get(self.rule.pk))
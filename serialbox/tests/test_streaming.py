@@ -0,0 +1,102 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import json
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from serialbox import capacity
+from serialbox.api import streaming
+from serialbox.models import Response
+from serialbox.tests.test_allocation import create_pool
+
+
+class StreamingAllocationTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=1000000, threshold=1000000)
+        user = User.objects.create_superuser('stream', 'stream@local',
+                                             'stream')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+
+    def _get(self, size, stream):
+        url = reverse('allocate-numbers', args=['allocpool', str(size)])
+        return self.client.get(url, {'stream': stream})
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_json(self):
+        response = self._get(5, 'json')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(self._content(response)), [1, 2, 3, 4, 5])
+        self.assertEqual(response['X-Serialbox-Region'], 'allocpoolr1')
+        self.assertEqual(response['X-Serialbox-Fulfilled'], 'true')
+        self.assertEqual(response['X-Serialbox-Size-Granted'], '5')
+
+    def test_csv_and_lines(self):
+        self.assertEqual(self._content(self._get(2, 'csv')),
+                         'number\r\n1\r\n2\r\n')
+        self.assertEqual(self._content(self._get(2, 'ndjson')), '3\n4\n')
+
+    def test_unknown_format(self):
+        response = self._get(5, 'yaml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(capacity.get_remaining(self.pool), 1000000)
+
+    def test_chunked(self):
+        content = ''.join(streaming.stream_json(range(2500)))
+        self.assertEqual(json.loads(content), list(range(2500)))
+        self.assertEqual(''.join(streaming.stream_json([])), '[]')
+
+    def test_iter_numbers(self):
+        response = Response(type='sequential')
+        response.number_list = [[1, 3], [10, 11]]
+        self.assertEqual(list(response.iter_numbers()), [1, 2, 3, 10, 11])
+        response.number_list = [7]
+        self.assertEqual(list(response.iter_numbers()), [7])
+        response = Response(type='list')
+        response.number_list = ['a', 'b']
+        self.assertEqual(list(response.iter_numbers()), ['a', 'b'])
+
+    def test_flat_memory(self):
+        '''
+        The memory needed to stream a response does not grow with its
+        size.
+        '''
+        def peak(size):
+            response = Response(type='sequential', pool='p', region='r',
+                                fulfilled=True, size_granted=size)
+            response.number_list = [1, size]
+            tracemalloc.start()
+            try:
+                for chunk in streaming.stream_json(response.iter_numbers()):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small, large = peak(10000), peak(200000)
+        self.assertLess(large, small * 2)
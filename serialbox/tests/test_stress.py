@@ -0,0 +1,139 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase
+
+from serialbox import serialbox_settings
+from serialbox.benchmarks import stress
+from serialbox.models import RandomizedRegion, SequentialRegion
+from serialbox.tests.test_allocation import create_pool
+
+
+class IntervalSweepTests(TestCase):
+
+    def test_get_intervals(self):
+        self.assertEqual(stress.get_intervals('sequential', [1, 10]),
+                         [(1, 10)])
+        self.assertEqual(stress.get_intervals('sequential', [7]), [(7, 7)])
+        self.assertEqual(
+            stress.get_intervals('sequential', [[1, 10], [21, 30]]),
+            [(1, 10), (21, 30)])
+        self.assertEqual(stress.get_intervals('random', [5, 3]),
+                         [(5, 5), (3, 3)])
+
+    def test_sweep(self):
+        overlaps, merged = stress.sweep([(11, 20), (1, 10), (15, 25),
+                                         (40, 50), (50, 50)])
+        self.assertEqual(overlaps, [(15, 20), (50, 50)])
+        self.assertEqual(merged, [(1, 25), (40, 50)])
+
+    def test_sweep_strings(self):
+        overlaps, merged = stress.sweep([('b', 'b'), ('a', 'a'), (1, 1),
+                                         ('b', 'b')])
+        self.assertEqual(overlaps, [('b', 'b')])
+        self.assertEqual(merged, [(1, 1), ('a', 'a'), ('b', 'b')])
+
+    def test_find_gaps(self):
+        merged = [(1, 10), (15, 20), (31, 40)]
+        self.assertEqual(stress.find_gaps(merged, 1, 40),
+                         [(11, 14), (21, 30)])
+        self.assertEqual(stress.find_gaps(merged, 5, 45),
+                         [(11, 14), (21, 30), (41, 45)])
+        self.assertEqual(stress.find_gaps(merged, 16, 18), [])
+        self.assertEqual(stress.find_gaps([], 1, 3), [(1, 3)])
+
+
+class StressTests(TransactionTestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=10 ** 9, threshold=10 ** 9)
+
+    def test_sequential(self):
+        result = stress.run('allocpool', processes=3, duration=0.5, size=10)
+        self.assertGreater(result['allocations'], 0)
+        self.assertEqual(result['numbers'], result['allocations'] * 10)
+        self.assertEqual(result['overlaps'], [])
+        self.assertEqual(result['gaps'], [])
+        self.assertEqual(result['failures'], 0)
+        self.assertEqual(SequentialRegion.objects.get().state,
+                         result['numbers'] + 1)
+
+    @mock.patch.object(serialbox_settings, 'SEQUENTIAL_ALLOCATION_MODE',
+                       'lease')
+    @mock.patch.object(serialbox_settings, 'SEQUENTIAL_LEASE_SIZE', 100)
+    def test_leases(self):
+        result = stress.run('allocpool', processes=3, duration=0.5, size=7)
+        self.assertGreater(result['allocations'], 0)
+        self.assertEqual(result['overlaps'], [])
+        self.assertEqual(result['gaps'], [])
+
+    def test_exhausted(self):
+        SequentialRegion.objects.filter(pk=self.region.pk).update(end=500)
+        result = stress.run('allocpool', processes=3, duration=2, size=10)
+        self.assertEqual(result['numbers'], 500)
+        self.assertEqual(result['failures'], 3)
+        self.assertEqual(result['overlaps'], [])
+        self.assertEqual(result['gaps'], [])
+
+    def test_randomized(self):
+        self.region.delete()
+        RandomizedRegion.objects.create(
+            readable_name='random', machine_name='random', order=1, min=1,
+            max=10 ** 6, pool=self.pool)
+        result = stress.run('allocpool', processes=3, duration=0.5, size=10)
+        self.assertGreater(result['allocations'], 0)
+        self.assertEqual(result['overlaps'], [])
+
+    def test_gap_detected(self):
+        # numbers the region handed out before the run look as though they
+        # were handed out to nobody during it
+        SequentialRegion.objects.filter(pk=self.region.pk).update(state=51)
+        with mock.patch.object(stress, 'get_sequential_states',
+                               return_value={self.region.pk: ('allocpoolr1',
+                                                              1)}):
+            result = stress.run('allocpool', processes=2, duration=0.2)
+        self.assertEqual(result['gaps'], [(1, 50)])
+        self.assertEqual(result['overlaps'], [])
+
+
+class StressApiTests(LiveServerTestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=10 ** 9, threshold=10 ** 9)
+        User.objects.create_superuser('stress', 'stress@local', 'stress')
+
+    def test_allocate_api(self):
+        result = stress.run(
+            'allocpool', processes=2, duration=0.5, size=10,
+            url='%s/allocate/allocpool/10/' % self.live_server_url,
+            username='stress', password='stress')
+        self.assertGreater(result['allocations'], 0)
+        self.assertEqual(result['failures'], 0)
+        self.assertEqual(result['overlaps'], [])
+        self.assertEqual(result['gaps'], [])
+
+    def test_unauthorized(self):
+        result = stress.run(
+            'allocpool', processes=2, duration=0.5,
+            url='%s/allocate/allocpool/10/' % self.live_server_url)
+        self.assertEqual(result['allocations'], 0)
+        self.assertEqual(result['failures'], 2)
+        self.assertEqual(result['retries'], 0)
@@ -0,0 +1,119 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from jinja2.exceptions import SecurityError
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from serialbox.models import ResponseTemplate, SequentialRegion
+from serialbox.response import templates
+from serialbox.tests.test_allocation import create_pool
+
+XML_TEMPLATE = '''{% macro number(value) %}<sn>{{ value }}</sn>{% endmacro %}
+<allocation pool="{{ pool }}" granted="{{ size_granted }}">
+{% for first, last in ranges %}
+<range first="{{ first }}" last="{{ last }}"/>
+{% endfor %}
+{% for value in numbers %}
+{{ number(value) }}
+{% endfor %}
+</allocation>
+'''
+
+
+class ResponseTemplateTests(TestCase):
+
+    def setUp(self):
+        templates.templates.clear()
+        self.pool, self.region = create_pool(end=100000, threshold=100000)
+        self.template = ResponseTemplate.objects.create(
+            readable_name='xml', description='XML', template_text=XML_TEMPLATE,
+            content_type='application/xml')
+        self.template.pool.add(self.pool)
+        user = User.objects.create_superuser('tmpl', 'tmpl@local', 'tmpl')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.url = reverse('allocate-numbers', args=['allocpool', '3'])
+
+    def _render(self, **params):
+        params.setdefault('template', 'xml')
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_render(self):
+        response, content = self._render(encoding='hex', width='2')
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        self.assertEqual(response['X-Serialbox-Size-Granted'], '3')
+        self.assertEqual(content, '<allocation pool="allocpool" '
+                                  'granted="3">\n'
+                                  '<range first="01" last="03"/>\n'
+                                  '<sn>01</sn>\n<sn>02</sn>\n<sn>03</sn>\n'
+                                  '</allocation>')
+
+    def test_single_number(self):
+        self.url = reverse('allocate-numbers', args=['allocpool', '1'])
+        self.assertEqual(self._render()[1], '<allocation pool="allocpool" '
+                                            'granted="1">\n'
+                                            '<range first="1" last="1"/>\n'
+                                            '<sn>1</sn>\n'
+                                            '</allocation>')
+
+    def test_compiled_once(self):
+        compiled = templates.templates.get(self.template)
+        self.assertIs(templates.templates.get(
+            ResponseTemplate.objects.get(pk=self.template.pk)), compiled)
+        self.template.template_text = '{{ numbers|join(",") }}'
+        self.template.save()
+        self.assertIsNot(templates.templates.get(self.template), compiled)
+        self.assertEqual(self._render()[1], '1,2,3')
+
+    def test_invalid(self):
+        ResponseTemplate.objects.filter(pk=self.template.pk).update(
+            template_text='{% for %}')
+        for params in ({'template': 'xml'}, {'template': 'missing'},
+                       {'template': 'xml', 'stream': 'json'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+        # nothing was allocated
+        self.assertEqual(SequentialRegion.objects.get().state, 1)
+
+    def test_escaped_for_xml(self):
+        self.template.template_text = '{{ numbers|join(",") }}'
+        self.template.save()
+        self.assertEqual(self._render()[1], '1,2,3')
+        escaping = templates.get_environment('application/xml')
+        self.assertIs(escaping, templates.get_environment(
+            'application/epcis+xml; charset=utf-8'))
+        self.assertEqual(
+            escaping.from_string('<sn>{{ value }}</sn>').render(
+                value='A<1>&"'),
+            '<sn>A&lt;1&gt;&amp;&#34;</sn>')
+        self.assertEqual(
+            templates.get_environment('text/plain').from_string(
+                '{{ value }}').render(value='A<1>'), 'A<1>')
+
+    def test_sandboxed(self):
+        template = templates.get_environment('text/plain').from_string(
+            "{{ ''.__class__.__mro__ }}")
+        with self.assertRaises(SecurityError):
+            template.render()
@@ -0,0 +1,90 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from serialbox import serialbox_settings, timing
+from serialbox.tests.test_allocation import create_pool
+
+
+class HistogramTests(SimpleTestCase):
+
+    def setUp(self):
+        self.histograms = timing.StageHistograms()
+
+    def test_export(self):
+        for seconds in (0.0001, 0.003, 0.003, 20):
+            self.histograms.observe('pool"1', 'generate', seconds)
+        text = self.histograms.export()
+        labels = 'pool="pool\\"1",stage="generate"'
+        self.assertIn('# TYPE serialbox_allocation_stage_seconds histogram',
+                      text)
+        self.assertIn('serialbox_allocation_stage_seconds_bucket{%s,'
+                      'le="0.0005"} 1' % labels, text)
+        self.assertIn('serialbox_allocation_stage_seconds_bucket{%s,'
+                      'le="0.005"} 3' % labels, text)
+        self.assertIn('serialbox_allocation_stage_seconds_bucket{%s,'
+                      'le="+Inf"} 4' % labels, text)
+        self.assertIn('serialbox_allocation_stage_seconds_count{%s} 4' %
+                      labels, text)
+
+    def test_off(self):
+        request = object()
+        with mock.patch.object(serialbox_settings, 'STAGE_TIMING', False):
+            self.assertIs(timing.stage(request, 'generate'),
+                          timing.NULL_STAGE)
+            self.assertIsNone(timing.get_timings(request))
+
+
+class StageTimingTests(TestCase):
+
+    def setUp(self):
+        timing.histograms.clear()
+        create_pool(end=100000, threshold=100000)
+        user = User.objects.create_superuser('timing', 'timing@local',
+                                             'timing')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.url = reverse('allocate-numbers', args=['allocpool', '10'])
+
+    def test_server_timing(self):
+        with mock.patch.object(serialbox_settings, 'STAGE_TIMING', True):
+            response = self.client.get(self.url, {'format': 'json'})
+        stages = [entry.split(';')[0] for entry in
+                  response['Server-Timing'].split(', ')]
+        self.assertEqual(stages, ['lookup', 'pool', 'region',
+                                  'preprocessing', 'generate',
+                                  'postprocessing', 'save_region', 'audit',
+                                  'response_rule_lookup', 'total'])
+        for stage in stages:
+            self.assertEqual(timing.histograms.get('allocpool', stage).count,
+                             1)
+        metrics = self.client.get(reverse('metrics'))
+        self.assertEqual(metrics['Content-Type'],
+                         'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn(b'stage="generate",le="+Inf"} 1', metrics.content)
+
+    def test_off(self):
+        response = self.client.get(self.url, {'format': 'json'})
+        self.assertNotIn('Server-Timing', response)
+        self.assertIsNone(timing.histograms.get('allocpool', 'generate'))
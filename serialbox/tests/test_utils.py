@@ -0,0 +1,57 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+from django.test import TestCase
+
+from serialbox.errors import RegionBoundaryException
+from serialbox.models import SequentialRegion
+from serialbox.tests.test_allocation import create_pool
+from serialbox.utils import check_sequential_region_boundaries
+
+
+class RegionBoundaryTests(TestCase):
+
+    def setUp(self):
+        self.pool, self.region = create_pool(end=100)
+        self.region.start = 50
+        self.region.save()
+
+    def _region(self, start, end):
+        return SequentialRegion(readable_name='new', machine_name='new',
+                                pool=self.pool, order=5, start=start,
+                                end=end)
+
+    def test_overlaps(self):
+        for start, end in ((60, 70), (90, 200), (1, 50), (1, 500)):
+            with self.assertRaises(RegionBoundaryException):
+                check_sequential_region_boundaries(self._region(start, end))
+        check_sequential_region_boundaries(self._region(1, 49))
+        check_sequential_region_boundaries(self._region(101, 200))
+        # a region never overlaps itself
+        check_sequential_region_boundaries(self.region)
+
+    def test_between_regions(self):
+        SequentialRegion.objects.create(
+            readable_name='second', machine_name='second', pool=self.pool,
+            order=2, start=201, end=300)
+        for start, end in ((150, 250), (1, 400), (250, 260), (100, 150)):
+            with self.assertRaises(RegionBoundaryException):
+                check_sequential_region_boundaries(self._region(start, end))
+        with self.assertNumQueries(1):
+            check_sequential_region_boundaries(self._region(101, 200))
+        check_sequential_region_boundaries(self._region(301, 400))
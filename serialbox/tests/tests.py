@@ -381,3 +381,29 @@ class PoolTests(APITestCase):
         with self.assertRaises(BarcodeConverter.BarcodeNotValid):
             response = self.client.get(url, {'format': 'xml'})
             logger.debug(response.content)
+
+    def test_batch_allocate(self):
+        '''
+        Allocate from the same pool twice in one batch request.
+        '''
+        url = reverse('allocate-batch')
+        data = [{'pool': 'utpool1', 'size': 10},
+                {'pool': 'utpool1', 'size': 5, 'region': 'utr1'}]
+        response = self.client.post(url, data, format='json')
+        logger.debug(response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['numbers'] for r in response.data],
+                         ['[1, 10]', '[11, 15]'])
+
+    def test_batch_allocate_rollback(self):
+        '''
+        A failed entry should roll back every allocation in the batch.
+        '''
+        url = reverse('allocate-batch')
+        data = [{'pool': 'utpool1', 'size': 10},
+                {'pool': 'fffff', 'size': 5}]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        url = reverse('allocate-numbers', args=['utpool1', '10'])
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.data['numbers'], '[1, 10]')
@@ -0,0 +1,223 @@
+'''
+    Copyright 2018 SerialLab, CORP
+
+    This file is part of SerialBox.
+
+    SerialBox is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    SerialBox is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
+'''
+import threading
+import time
+from bisect import bisect_left
+
+from serialbox import serialbox_settings as settings
+
+#: The upper bounds, in seconds, of the stage duration histogram buckets.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0)
+
+METRIC = 'serialbox_allocation_stage_seconds'
+
+
+class Histogram(object):
+    '''
+    A Prometheus style histogram of durations.  Counts are kept per bucket
+    and made cumulative when exported.
+    '''
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class StageHistograms(object):
+    '''
+    The stage duration histograms of this process, by pool machine name
+    and stage name.
+    '''
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, pool, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get((pool, stage))
+            if histogram is None:
+                histogram = self._histograms[(pool, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    def get(self, pool, stage):
+        return self._histograms.get((pool, stage))
+
+    def clear(self):
+        with self._lock:
+            self._histograms = {}
+
+    def export(self):
+        '''
+        Returns the histograms in the Prometheus text exposition format.
+        '''
+        lines = [
+            '# HELP %s The time spent in each stage of an allocation.' %
+            METRIC,
+            '# TYPE %s histogram' % METRIC,
+        ]
+        with self._lock:
+            items = sorted((key, (list(histogram.counts), histogram.sum,
+                                  histogram.count))
+                           for key, histogram in self._histograms.items())
+        for (pool, stage), (counts, total, count) in items:
+            labels = 'pool="%s",stage="%s"' % (_escape(pool), stage)
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append('%s_bucket{%s,le="%s"} %d' % (
+                    METRIC, labels, bound, cumulative))
+            lines.append('%s_sum{%s} %r' % (METRIC, labels, total))
+            lines.append('%s_count{%s} %d' % (METRIC, labels, count))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+#: The stage duration histograms of this process.
+histograms = StageHistograms()
+
+
+class Timings(object):
+    '''
+    The stages of one request, in the order they finished.  Stages are
+    added to the histograms of the pool when the timings are flushed.
+    '''
+
+    def __init__(self):
+        self.pool = None
+        self.started = time.perf_counter()
+        self.stages = []
+        self._flushed = 0
+
+    def add(self, stage, seconds):
+        self.stages.append((stage, seconds))
+
+    def flush(self):
+        '''
+        Adds the stages that finished since the last flush to the
+        histograms of the current pool.
+        '''
+        pool = self.pool or ''
+        for stage, seconds in self.stages[self._flushed:]:
+            histograms.observe(pool, stage, seconds)
+        self._flushed = len(self.stages)
+
+    def server_timing(self):
+        '''
+        Returns the stages as the value of a Server-Timing header.
+        '''
+        return ', '.join('%s;dur=%.3f' % (stage, seconds * 1000)
+                         for stage, seconds in self.stages)
+
+
+class Stage(object):
+    '''
+    Times the block of a ``with`` statement as a stage of the timings.
+    '''
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *args):
+        self.timings.add(self.name, time.perf_counter() - self.started)
+
+
+class NullStage(object):
+    '''
+    A stage that does nothing, used when stage timing is off.
+    '''
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+def get_timings(request):
+    '''
+    Returns the timings of the request, starting them if they have not
+    been, or None if the STAGE_TIMING setting is off.
+    '''
+    if not settings.STAGE_TIMING:
+        return None
+    ret = getattr(request, '_serialbox_timings', None)
+    if ret is None:
+        ret = Timings()
+        request._serialbox_timings = ret
+    return ret
+
+
+def stage(request, name):
+    '''
+    Returns a context manager that times its block as the named stage of
+    the request.  Costs a single setting lookup when stage timing is off.
+    '''
+    if not settings.STAGE_TIMING:
+        return NULL_STAGE
+    return Stage(get_timings(request), name)
+
+
+def set_pool(request, pool):
+    '''
+    Sets the machine name of the pool the request's stages are recorded
+    under.
+    '''
+    if settings.STAGE_TIMING:
+        get_timings(request).pool = pool
+
+
+def flush(request):
+    '''
+    Adds the finished stages of the request to the pool histograms.
+    '''
+    if settings.STAGE_TIMING:
+        get_timings(request).flush()
+
+
+def finish(request, response):
+    '''
+    Records the total time of the request, adds its stages to the pool
+    histograms and its Server-Timing header to the HTTP response.
+    '''
+    if not settings.STAGE_TIMING:
+        return response
+    timings = get_timings(request)
+    timings.add('total', time.perf_counter() - timings.started)
+    timings.flush()
+    response['Server-Timing'] = timings.server_timing()
+    return response
@@ -17,7 +17,6 @@
     along with SerialBox.  If not, see <http://www.gnu.org/licenses/>.
 '''
 from django.utils.translation import gettext_lazy as _
-from django.apps import apps
 
 from serialbox import models as sb_models
 from serialbox.errors import RegionBoundaryException
@@ -29,39 +28,40 @@ def check_sequential_region_boundaries(region):
     and checks to make sure that the start and end are not within
     the boundaries of another region.
 
+    Regions of a pool never overlap, so the only region that can overlap
+    the new range is the one with the highest start at or below the new
+    end.  It is found with a single (pool, start) index lookup, and the
+    new range overlaps it if that region ends at or after the new start.
+    This catches ranges that start, end or lie entirely within another
+    region as well as ranges that contain another region.
+
     ## Return ##
     Returns nothing if the boundaries check out fine.  Otherwise it will raise
-    a
+    a RegionBoundaryException.
     '''
+    _check_sane(region)
+    preceding = sb_models.SequentialRegion.objects.filter(
+        pool=region.pool,
+        start__lte=region.end
+    ).exclude(pk=region.pk).order_by('-start').values_list(
+        'end', flat=True).first()
+    if preceding is not None and preceding >= region.start:
+        raise RegionBoundaryException()
+
+
+def _check_sane(region):
     if region.start >= region.end:
         raise RegionBoundaryException(_('The start of the range can not be '
                                         'greater or equal to the end value.'))
-    regions = sb_models.SequentialRegion.objects.filter(
-        pool=region.pool).exclude(pk=region.pk)
-    if regions.count() > 0:
-        for current_region in regions:
-            if region.start >= current_region.start and \
-                    region.start <= current_region.end:
-                raise RegionBoundaryException()
 
 
 def get_region_by_machine_name(machine_name):
     '''
-    Searches through all of the models marked as concrete_region
-    within all of the loaded SerialBox app and then returns the model with
-    the unique machine_name supplied.  Returns the Region model instance or
-    None if none is found.
-
-    TODO: set up caching for regions by name once they've been looked up
+    Returns the Region model instance, of any concrete Region model within
+    the loaded SerialBox apps, with the unique machine_name supplied or
+    None if none is found.  Names are resolved through the
+    serialbox.discovery.region_names registry so a known name costs a
+    single query.
     '''
-    ret = None
-    for app in apps.get_app_configs():
-        models = app.get_models()
-        for model in models:
-            if issubclass(model, sb_models.Region):
-                try:
-                    ret = model.objects.get(machine_name=machine_name)
-                    break
-                except model.DoesNotExist:
-                    pass
-    return ret
+    from serialbox.discovery import region_names
+    return region_names.get(machine_name)
@@ -20,6 +20,9 @@ def get_package_data(package):
     return {package: filepaths}
 
 
+package_data = get_package_data('serialbox')
+package_data['serialbox'].append(os.path.join('benchmarks', 'baseline.json'))
+
 readme = open('README.rst').read()
 
 setup(
@@ -32,12 +35,16 @@ setup(
     author='SerialLab Corp',
     author_email='slab@serial-lab.com',
     packages=find_packages(),
-    package_data=get_package_data('serialbox'),
+    package_data=package_data,
     install_requires=['django', 'djangorestframework',
                       'djangorestframework-csv',
                       'djangorestframework-xml', 'Markdown', 'decorator',
                       'six',
-                      'docutils'],
+                      'docutils', 'asgiref', 'jinja2'],
+    extras_require={
+        # vectorised encoding, feistel batches and gs1 check digits
+        'fast': ['numpy'],
+    },
     zip_safe=False,
     classifiers=[
         'License :: OSI Approved :: GNU Affero General Public License v3 or later (AGPLv3+)',